@@ -0,0 +1,291 @@
+import asyncio
+import os
+import time
+from collections import OrderedDict, deque
+from contextlib import asynccontextmanager
+from datetime import datetime, timezone
+
+from dotenv import load_dotenv
+
+from app import deadline, importer, pipeline
+from app.database import get_db, sql_timestamp
+from app.metrics import SAVES_TOTAL, CallbackMetric, Counter, Histogram
+from app.scrapers import fetch
+from app.thumbnails import prefetch
+
+load_dotenv()
+
+# Admission control for the scrape + classify part of a save.
+#
+# At most SAVE_CONCURRENCY saves scrape and classify at once, and at most
+# SAVE_PER_USER of them belong to one user. Everyone else waits in a bounded
+# queue (SAVE_QUEUE_MAX) that is served round-robin across users, so one
+# user pasting twenty links gets one slot in turn instead of the whole pipe.
+#
+# A save that can't get a slot within SAVE_ADMIT_WAIT_SECONDS (or what is left
+# of its deadline budget, if that is shorter) — or finds the queue full — is
+# not dropped: the route replies "we're busy, we'll save this shortly" and
+# defer() writes it to deferred_saves. A background worker drains that table
+# through the same limiter, SAVE_DEFERRED_CONCURRENCY at a time so deferred
+# work never takes every slot from live saves. Rows survive a restart; a save
+# that keeps failing is dropped after SAVE_DEFERRED_MAX_ATTEMPTS.
+
+SAVE_CONCURRENCY = int(os.getenv("SAVE_CONCURRENCY", "8"))
+SAVE_PER_USER = int(os.getenv("SAVE_PER_USER", "2"))
+SAVE_QUEUE_MAX = int(os.getenv("SAVE_QUEUE_MAX", "64"))
+SAVE_ADMIT_WAIT_SECONDS = float(os.getenv("SAVE_ADMIT_WAIT_SECONDS", "3"))
+SAVE_DEFERRED_CONCURRENCY = int(os.getenv("SAVE_DEFERRED_CONCURRENCY", "2"))
+SAVE_DEFERRED_MAX_ATTEMPTS = int(os.getenv("SAVE_DEFERRED_MAX_ATTEMPTS", "3"))
+# The worker also wakes this often to pick up rows left over from a restart
+SAVE_DEFERRED_POLL_SECONDS = int(os.getenv("SAVE_DEFERRED_POLL_SECONDS", "30"))
+
+ADMISSION_TOTAL = Counter(
+    "save_admission_total",
+    "Save admission decisions (admitted, queued, busy_queue_full, busy_timeout)",
+    ("outcome",),
+)
+ADMISSION_WAIT_SECONDS = Histogram(
+    "save_admission_wait_seconds", "Time a save waited in the admission queue before getting a slot",
+)
+
+
+class Busy(Exception):
+    """No pipeline slot could be had in time; the caller should defer the save."""
+
+
+class _Limiter:
+    """Global + per-user concurrency cap with a round-robin wait queue across users."""
+
+    def __init__(self, limit: int, per_user: int, queue_max: int):
+        self.limit = limit
+        self.per_user = per_user
+        self.queue_max = queue_max
+        self.in_flight = 0
+        self.by_user: dict[int, int] = {}
+        self.queues: OrderedDict[int, deque] = OrderedDict()   # user → waiting futures
+        self.queued = 0
+
+    def _can_run(self, user_id: int) -> bool:
+        return self.in_flight < self.limit and self.by_user.get(user_id, 0) < self.per_user
+
+    def _grant(self, user_id: int):
+        self.in_flight += 1
+        self.by_user[user_id] = self.by_user.get(user_id, 0) + 1
+
+    def _dispatch(self):
+        while self.in_flight < self.limit:
+            for user_id, queue in self.queues.items():
+                if self.by_user.get(user_id, 0) < self.per_user:
+                    break
+            else:
+                return                                  # every waiting user is at their cap
+            fut = queue.popleft()
+            self.queued -= 1
+            if queue:
+                self.queues.move_to_end(user_id)        # back of the line for this user's next one
+            else:
+                del self.queues[user_id]
+            if fut.done():
+                continue                                # cancelled waiter that hasn't cleaned up yet
+            self._grant(user_id)
+            fut.set_result(None)
+
+    def _forget(self, user_id: int, fut):
+        queue = self.queues.get(user_id)
+        if queue is not None and fut in queue:
+            queue.remove(fut)
+            self.queued -= 1
+            if not queue:
+                del self.queues[user_id]
+
+    async def acquire(self, user_id: int, timeout: float | None):
+        """Wait up to `timeout` seconds (None: forever) for a slot; raises Busy."""
+        # Every state change ends in _dispatch(), so nobody still queued could
+        # run now; a user with no queue of their own skips the line
+        if user_id not in self.queues and self._can_run(user_id):
+            self._grant(user_id)
+            ADMISSION_TOTAL.inc("admitted")
+            return
+        if self.queued >= self.queue_max:
+            ADMISSION_TOTAL.inc("busy_queue_full")
+            raise Busy("admission queue full")
+        started = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        self.queues.setdefault(user_id, deque()).append(fut)
+        self.queued += 1
+        self._dispatch()
+        try:
+            await asyncio.wait_for(fut, timeout)
+        except (TimeoutError, asyncio.CancelledError) as e:
+            if fut.done() and not fut.cancelled():
+                self.release(user_id)                   # granted just as we gave up
+            self._forget(user_id, fut)
+            if isinstance(e, TimeoutError):
+                ADMISSION_TOTAL.inc("busy_timeout")
+                raise Busy(f"no slot within {timeout:.1f}s") from None
+            raise
+        ADMISSION_TOTAL.inc("queued")
+        ADMISSION_WAIT_SECONDS.observe(time.monotonic() - started)
+
+    def release(self, user_id: int):
+        self.in_flight -= 1
+        left = self.by_user.get(user_id, 0) - 1
+        if left > 0:
+            self.by_user[user_id] = left
+        else:
+            self.by_user.pop(user_id, None)
+        self._dispatch()
+
+    def snapshot(self) -> dict:
+        return {
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "queued_users": len(self.queues),
+            "limit": self.limit,
+            "per_user": self.per_user,
+        }
+
+
+_limiter = _Limiter(SAVE_CONCURRENCY, SAVE_PER_USER, SAVE_QUEUE_MAX)
+
+
+@asynccontextmanager
+async def slot(user_id: int, timeout: float | None = SAVE_ADMIT_WAIT_SECONDS):
+    """Hold a pipeline slot for the block. Raises Busy if none frees up in time;
+    the wait is also capped by the current deadline budget."""
+    await _limiter.acquire(user_id, None if timeout is None else deadline.timeout(timeout))
+    try:
+        yield
+    finally:
+        _limiter.release(user_id)
+
+
+def snapshot() -> dict:
+    """Limiter and deferred-queue state, for /health/admission."""
+    conn = get_db(readonly=True)
+    deferred = conn.execute("SELECT COUNT(*) AS n FROM deferred_saves").fetchone()["n"]
+    conn.close()
+    return {**_limiter.snapshot(), "deferred": deferred}
+
+
+CallbackMetric(
+    "save_admission_in_flight", "Saves currently holding a pipeline slot", (),
+    lambda: [((), _limiter.in_flight)],
+)
+CallbackMetric(
+    "save_admission_queued", "Saves waiting for a pipeline slot", (),
+    lambda: [((), _limiter.queued)],
+)
+
+
+# ── Deferred saves ─────────────────────────────────────────────────────────
+
+_task: asyncio.Task | None = None
+_wake: asyncio.Event | None = None
+
+
+def _insert_deferred(user_id: int, url: str, channel: str):
+    conn = get_db()
+    conn.execute(
+        """INSERT INTO deferred_saves (user_id, url, channel, created_at)
+           VALUES (?, ?, ?, ?)
+           ON CONFLICT (user_id, url) DO NOTHING""",
+        (user_id, url, channel, sql_timestamp(datetime.now(timezone.utc))),
+    )
+    conn.commit()
+    conn.close()
+
+
+async def defer(user_id: int, url: str, channel: str):
+    """Queue a save the pipeline had no room for; the worker picks it up shortly."""
+    await asyncio.to_thread(_insert_deferred, user_id, url, channel)
+    print(f"[ADMISSION] Deferred {url} for user {user_id} ({channel})")
+    if _wake is not None:
+        _wake.set()
+
+
+def _finish(row_id: int):
+    conn = get_db()
+    conn.execute("DELETE FROM deferred_saves WHERE id = ?", (row_id,))
+    conn.commit()
+    conn.close()
+
+
+def _failed(row: dict):
+    conn = get_db()
+    if row["attempts"] + 1 >= SAVE_DEFERRED_MAX_ATTEMPTS:
+        conn.execute("DELETE FROM deferred_saves WHERE id = ?", (row["id"],))
+        print(f"[ADMISSION] Giving up on deferred {row['url']} after {row['attempts'] + 1} attempts")
+    else:
+        conn.execute("UPDATE deferred_saves SET attempts = attempts + 1 WHERE id = ?", (row["id"],))
+    conn.commit()
+    conn.close()
+
+
+async def _process(row: dict) -> str:
+    """Scrape, classify and insert one deferred save. Returns the outcome name."""
+    if pipeline.is_saved(row["user_id"], row["url"]):
+        return "duplicate"
+    async with slot(row["user_id"], timeout=None):
+        link, outcome = await importer.process_url(row["url"], weak_summary="Saved link.")
+    if link is None:
+        return outcome
+    inserted = await asyncio.to_thread(
+        pipeline.insert_link,
+        row["user_id"], link["url"], link["platform"], link["extracted_text"], link["summary"],
+        link["category"], link["thumbnail_url"], link["tags"],
+        etag=link["etag"], last_modified=link["last_modified"],
+    )
+    if not inserted:
+        return "duplicate"
+    prefetch(link["thumbnail_url"])
+    return outcome
+
+
+async def drain() -> int:
+    """Process every deferred save currently queued. Returns how many were handled."""
+    conn = get_db(readonly=True)
+    rows = [dict(r) for r in conn.execute(
+        "SELECT id, user_id, url, channel, attempts FROM deferred_saves ORDER BY id"
+    ).fetchall()]
+    conn.close()
+    semaphore = asyncio.Semaphore(SAVE_DEFERRED_CONCURRENCY)
+
+    async def one(row: dict):
+        async with semaphore:
+            try:
+                outcome = await _process(row)
+            except Exception as e:
+                print(f"[ADMISSION] Deferred {row['url']} failed: {e}")
+                await asyncio.to_thread(_failed, row)
+                return
+        await asyncio.to_thread(_finish, row["id"])
+        SAVES_TOTAL.inc(row["channel"], f"deferred_{outcome}")
+
+    with fetch.priority(fetch.PRIORITY_PREFETCH):
+        await asyncio.gather(*(one(r) for r in rows))
+    return len(rows)
+
+
+async def _loop():
+    while True:
+        _wake.clear()
+        try:
+            handled = await drain()
+            if handled:
+                print(f"[ADMISSION] Processed {handled} deferred save(s)")
+        except Exception as e:
+            print(f"[ADMISSION] Deferred worker failed: {e}")
+        try:
+            await asyncio.wait_for(_wake.wait(), SAVE_DEFERRED_POLL_SECONDS)
+        except TimeoutError:
+            pass
+
+
+def start_worker():
+    """Start the deferred-save worker (no-op if already running)."""
+    global _task, _wake
+    if _task is not None:
+        return
+    _wake = asyncio.Event()
+    _task = asyncio.get_running_loop().create_task(_loop())
@@ -1,20 +1,41 @@
+import asyncio
 import json
 import time
 import httpx
-import google.generativeai as genai
 from dotenv import load_dotenv
 import os
 
+from app import deadline
+from app.metrics import LLM_SECONDS, LLM_BATCH_SIZE
+from app.tracing import add_span
+
 load_dotenv(override=True)
 
-genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+# Endpoint overrides let the load-test harness point the app at local stand-ins
+GEMINI_API_ENDPOINT = os.getenv("GEMINI_API_ENDPOINT", "")
+GROQ_API_URL = os.getenv("GROQ_API_URL", "https://api.groq.com/openai/v1/chat/completions")
+
+_genai = None
 
-PROMPT_TEMPLATE = """You are a content analyzer. Given the following text extracted from a social media post or article, return a JSON object with exactly three keys:
-- "category": one of these values ONLY: Fitness, Coding, Tech, Food, Travel, Design, Business, Gaming, Other
-- "summary": a one-sentence summary, maximum 25 words
-- "tags": a JSON array of 3 to 5 lowercase keyword strings that best describe the content (e.g. ["yoga", "morning routine", "flexibility", "beginners"]). These are used for search — pick specific, meaningful words a user would search for.
 
-Category guidance:
+def _gemini():
+    """Import and configure the Gemini SDK on first use — it takes ~1s to import,
+    which is a big slice of a cold start on a sleeping free-tier host."""
+    global _genai
+    if _genai is None:
+        import google.generativeai as genai
+        if GEMINI_API_ENDPOINT:
+            genai.configure(
+                api_key=os.getenv("GEMINI_API_KEY"),
+                transport="rest",
+                client_options={"api_endpoint": GEMINI_API_ENDPOINT},
+            )
+        else:
+            genai.configure(api_key=os.getenv("GEMINI_API_KEY"))
+        _genai = genai
+    return _genai
+
+_CATEGORY_GUIDANCE = """Category guidance:
 - Coding: programming tutorials, coding projects, developer tools, coding challenges
 - Tech: smartphones, gadgets, hardware reviews, AI news, software news, science/technology
 - Fitness: gym, workout, yoga, running, diet, health
@@ -23,30 +44,51 @@ Category guidance:
 - Design: UI/UX, graphic design, art, aesthetics, brand/logo, animation
 - Business: entrepreneurship, startups, marketing, finance, investing, productivity, career
 - Gaming: video games, esports, gaming hardware, game reviews, game trailers
-- Other: anything that does not fit above
+- Other: anything that does not fit above"""
+
+PROMPT_TEMPLATE = """You are a content analyzer. Given the following text extracted from a social media post or article, return a JSON object with exactly three keys:
+- "category": one of these values ONLY: Fitness, Coding, Tech, Food, Travel, Design, Business, Gaming, Other
+- "summary": a one-sentence summary, maximum 25 words
+- "tags": a JSON array of 3 to 5 lowercase keyword strings that best describe the content (e.g. ["yoga", "morning routine", "flexibility", "beginners"]). These are used for search — pick specific, meaningful words a user would search for.
+
+""" + _CATEGORY_GUIDANCE + """
 
 Text to analyze:
 {text}
 
 Return ONLY the JSON object, no markdown, no code fences, no explanation."""
 
+BATCH_PROMPT_TEMPLATE = """You are a content analyzer. Below are several texts extracted from social media posts or articles, each introduced by a line "### item <id>". Return a JSON array with one object per item, each with exactly four keys:
+- "id": the item's id, as a string
+- "category": one of these values ONLY: Fitness, Coding, Tech, Food, Travel, Design, Business, Gaming, Other
+- "summary": a one-sentence summary, maximum 25 words
+- "tags": a JSON array of 3 to 5 lowercase keyword strings that best describe the content. These are used for search — pick specific, meaningful words a user would search for.
+
+""" + _CATEGORY_GUIDANCE + """
+
+Classify every item independently.
+
+{items}
+
+Return ONLY the JSON array, no markdown, no code fences, no explanation."""
+
 VALID_CATEGORIES = ["Fitness", "Coding", "Tech", "Food", "Travel", "Design", "Business", "Gaming", "Other"]
 
 # Try these Gemini models in order
 GEMINI_MODELS = ["gemini-2.0-flash", "gemini-1.5-flash", "gemini-2.0-flash-lite"]
 
 
-def parse_ai_response(response_text: str) -> dict:
-    """Parse AI response text into category + summary dict."""
+def _strip_fences(response_text: str) -> str:
     text = response_text.strip()
 
     # Remove markdown code fences if present
     if text.startswith("```"):
         lines = text.split("\n")
         text = "\n".join(lines[1:-1]).strip()
+    return text
 
-    result = json.loads(text)
 
+def _validate_result(result: dict) -> dict:
     category = result.get("category", "Other")
     if category not in VALID_CATEGORIES:
         category = "Other"
@@ -65,61 +107,132 @@ def parse_ai_response(response_text: str) -> dict:
     return {"category": category, "summary": summary, "tags": tags}
 
 
-async def try_gemini(text: str) -> dict | None:
-    """Try Gemini API with multiple models. Returns result or None if all fail."""
+def parse_ai_response(response_text: str) -> dict:
+    """Parse AI response text into category + summary dict."""
+    return _validate_result(json.loads(_strip_fences(response_text)))
+
+
+def parse_batch_response(response_text: str, ids: list[str]) -> dict[str, dict]:
+    """Parse a batch reply into {id: result}. Items that are missing, unknown or
+    have neither a category nor a summary are left out, for the caller to retry."""
+    items = json.loads(_strip_fences(response_text))
+    if isinstance(items, dict):
+        # Some models wrap the array ({"items": [...]}) or key it by id ({"1": {...}})
+        wrapped = next((v for v in items.values() if isinstance(v, list)), None)
+        items = wrapped if wrapped is not None else [
+            {**v, "id": k} for k, v in items.items() if isinstance(v, dict)
+        ]
+    wanted = set(ids)
+    results: dict[str, dict] = {}
+    for item in items if isinstance(items, list) else []:
+        if not isinstance(item, dict):
+            continue
+        item_id = str(item.get("id", ""))
+        if item_id not in wanted or item_id in results:
+            continue
+        if not item.get("category") and not item.get("summary"):
+            continue
+        results[item_id] = _validate_result(item)
+    return results
+
+
+def _record_llm(provider: str, model: str, outcome: str, started: float):
+    elapsed = time.perf_counter() - started
+    LLM_SECONDS.observe(elapsed, provider, model, outcome)
+    add_span(f"{provider}_{model}", started, elapsed)
+
+
+async def _call_gemini(prompt: str, parse):
+    """Send `prompt` to Gemini, trying each model in turn. Returns parse(reply) or None."""
     for model_name in GEMINI_MODELS:
+        if deadline.expired():
+            print("[AI] Out of time, skipping Gemini")
+            break
+        started = time.perf_counter()
         try:
             print(f"[AI] Trying Gemini model: {model_name}")
-            model = genai.GenerativeModel(model_name)
-            response = model.generate_content(PROMPT_TEMPLATE.format(text=text))
+            model = _gemini().GenerativeModel(model_name)
+            # The SDK call is blocking: always run it off the loop, and let the
+            # deadline budget (when there is one) cut it short
+            left = deadline.remaining()
+            if left is None:
+                response = await asyncio.to_thread(model.generate_content, prompt)
+            else:
+                response = await asyncio.wait_for(
+                    asyncio.to_thread(model.generate_content, prompt, request_options={"timeout": left}),
+                    left,
+                )
             print(f"[AI] Gemini response: {response.text[:200]}")
-            return parse_ai_response(response.text)
+            result = parse(response.text)
+            _record_llm("gemini", model_name, "ok", started)
+            return result
         except Exception as e:
             error_msg = str(e)
             print(f"[AI] Gemini {model_name} failed: {error_msg[:150]}")
             if "quota" in error_msg.lower() or "429" in error_msg:
-                time.sleep(0.5)
+                _record_llm("gemini", model_name, "rate_limited", started)
+                await asyncio.sleep(0.5)
                 continue
             else:
+                _record_llm("gemini", model_name, "error", started)
                 break
     return None
 
 
-async def try_groq(text: str) -> dict | None:
-    """Try Groq API (free Llama). Returns result or None if fails."""
+async def _call_groq(prompt: str, parse, max_tokens: int = 150):
+    """Send `prompt` to Groq. Returns parse(reply) or None."""
     groq_key = os.getenv("GROQ_API_KEY", "")
     if not groq_key:
         print("[AI] No GROQ_API_KEY set, skipping Groq")
         return None
+    if deadline.expired():
+        print("[AI] Out of time, skipping Groq")
+        return None
 
+    started = time.perf_counter()
     try:
         print("[AI] Trying Groq (Llama)...")
-        async with httpx.AsyncClient(timeout=15.0) as client:
+        async with httpx.AsyncClient(timeout=deadline.timeout(15.0)) as client:
             response = await client.post(
-                "https://api.groq.com/openai/v1/chat/completions",
+                GROQ_API_URL,
                 headers={
                     "Authorization": f"Bearer {groq_key}",
                     "Content-Type": "application/json",
                 },
                 json={
                     "model": "llama-3.1-8b-instant",
-                    "messages": [{"role": "user", "content": PROMPT_TEMPLATE.format(text=text)}],
+                    "messages": [{"role": "user", "content": prompt}],
                     "temperature": 0.3,
-                    "max_tokens": 150,
+                    "max_tokens": max_tokens,
                 },
             )
             response.raise_for_status()
             data = response.json()
             reply = data["choices"][0]["message"]["content"]
             print(f"[AI] Groq response: {reply[:200]}")
-            return parse_ai_response(reply)
+            result = parse(reply)
+            _record_llm("groq", "llama-3.1-8b-instant", "ok", started)
+            return result
     except Exception as e:
         print(f"[AI] Groq failed: {e}")
+        outcome = "rate_limited" if "429" in str(e) else "error"
+        _record_llm("groq", "llama-3.1-8b-instant", outcome, started)
         return None
 
 
+async def try_gemini(text: str) -> dict | None:
+    """Try Gemini API with multiple models. Returns result or None if all fail."""
+    return await _call_gemini(PROMPT_TEMPLATE.format(text=text), parse_ai_response)
+
+
+async def try_groq(text: str) -> dict | None:
+    """Try Groq API (free Llama). Returns result or None if fails."""
+    return await _call_groq(PROMPT_TEMPLATE.format(text=text), parse_ai_response)
+
+
 async def try_keyword_fallback(text: str) -> dict:
     """Simple keyword-based categorization when all AI APIs fail."""
+    started = time.perf_counter()
     text_lower = text.lower()
 
     keyword_map = {
@@ -162,11 +275,16 @@ async def try_keyword_fallback(text: str) -> dict:
     summary = first_sentence if first_sentence else "Saved link."
 
     print(f"[AI] Keyword fallback: category={best_category} (score={best_score})")
+    _record_llm("keyword", "-", "ok", started)
     return {"category": best_category, "summary": summary, "tags": best_category.lower()}
 
 
 async def categorize_and_summarize(text: str) -> dict:
-    """Categorize and summarize text. Tries Gemini → Groq → keyword fallback."""
+    """Categorize and summarize text. Tries Gemini → Groq → keyword fallback.
+
+    Inside a deadline.budget() each provider's timeout comes from what is left,
+    and providers are skipped once it is spent — the keyword fallback is
+    instant, so a save always gets a category in time."""
     clean_text = text.strip()
     if len(clean_text) < 5:
         return {"category": "Other", "summary": "Saved link.", "tags": ""}
@@ -183,3 +301,88 @@ async def categorize_and_summarize(text: str) -> dict:
 
     # Last resort: keyword matching
     return await try_keyword_fallback(clean_text)
+
+
+# ── Micro-batching ─────────────────────────────────────────────────────────
+# Bulk imports and background refreshes classify many texts at once. Sending
+# each with the full PROMPT_TEMPLATE wastes prompt tokens and per-request quota,
+# so classify_batched() collects texts for up to LLM_BATCH_WINDOW_MS (or until
+# LLM_BATCH_MAX are waiting) and sends them as one BATCH_PROMPT_TEMPLATE request.
+# Items the reply leaves out or garbles are retried alone through
+# categorize_and_summarize(). Interactive saves don't use this — they shouldn't
+# wait for a window to close.
+
+LLM_BATCH_ENABLED = os.getenv("LLM_BATCH_ENABLED", "1") == "1"
+LLM_BATCH_WINDOW_MS = float(os.getenv("LLM_BATCH_WINDOW_MS", "250"))
+LLM_BATCH_MAX = int(os.getenv("LLM_BATCH_MAX", "8"))
+# Long captions are cut so one item can't crowd out the rest of the batch
+LLM_BATCH_ITEM_CHARS = int(os.getenv("LLM_BATCH_ITEM_CHARS", "1500"))
+
+
+class _Batcher:
+    def __init__(self):
+        self._pending: list[tuple[str, asyncio.Future]] = []
+        self._timer: asyncio.TimerHandle | None = None
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, text: str) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._pending.append((text, fut))
+        if len(self._pending) >= LLM_BATCH_MAX:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(LLM_BATCH_WINDOW_MS / 1000, self._flush)
+        return fut
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, []
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._run(batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: list[tuple[str, asyncio.Future]]):
+        LLM_BATCH_SIZE.observe(len(batch))
+        results: dict[str, dict] = {}
+        if len(batch) > 1:
+            ids = [str(i + 1) for i in range(len(batch))]
+            items = "\n\n".join(
+                f"### item {item_id}\n{text[:LLM_BATCH_ITEM_CHARS]}" for item_id, (text, _) in zip(ids, batch)
+            )
+            prompt = BATCH_PROMPT_TEMPLATE.format(items=items)
+            parse = lambda reply: parse_batch_response(reply, ids)  # noqa: E731
+            results = (
+                await _call_gemini(prompt, parse)
+                or await _call_groq(prompt, parse, max_tokens=120 * len(batch))
+                or {}
+            )
+            print(f"[AI] Batch of {len(batch)}: {len(results)} classified, {len(batch) - len(results)} to retry alone")
+
+        async def settle(item_id: str, text: str, fut: asyncio.Future):
+            try:
+                result = results.get(item_id) or await categorize_and_summarize(text)
+            except Exception as e:
+                if not fut.done():
+                    fut.set_exception(e)
+                return
+            if not fut.done():
+                fut.set_result(result)
+
+        await asyncio.gather(*(
+            settle(str(i + 1), text, fut) for i, (text, fut) in enumerate(batch)
+        ))
+
+
+_batcher = _Batcher()
+
+
+async def classify_batched(text: str) -> dict:
+    """categorize_and_summarize() for background and bulk work, sent in micro-batches."""
+    clean_text = text.strip()
+    if not LLM_BATCH_ENABLED or len(clean_text) < 5:
+        return await categorize_and_summarize(clean_text)
+    return await _batcher.submit(clean_text)
@@ -0,0 +1,222 @@
+import argparse
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import shutil
+
+from starlette.datastructures import Headers
+from starlette.exceptions import HTTPException
+from starlette.staticfiles import StaticFiles
+
+# Fingerprinted, precompressed static assets.
+#
+# `python -m app.assets build` copies every file under app/static to
+# app/static/dist/<name>.<hash>.<ext>, writes .gz and .br variants next to the
+# compressible ones, and records source → hashed name in dist/manifest.json.
+# Templates call asset_url("style.css"), which resolves through the manifest,
+# so a changed file gets a new URL and the old one can be cached forever.
+#
+# AssetFiles serves /static: hashed files with an immutable one-year
+# Cache-Control and the best precompressed variant the client accepts;
+# everything else (and any template rendered without a build) falls back to
+# the plain file with Cache-Control: no-cache, revalidated via ETag.
+#
+# Startup runs build_if_stale(), so a deploy that skips the build step still
+# gets fingerprinted URLs. ASSET_FINGERPRINTING=0 serves the plain files —
+# handy while editing CSS without restarting.
+
+ASSET_FINGERPRINTING = os.getenv("ASSET_FINGERPRINTING", "1") == "1"
+
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+DIST_DIR = os.path.join(STATIC_DIR, "dist")
+MANIFEST_PATH = os.path.join(DIST_DIR, "manifest.json")
+STATIC_URL = "/static"
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+REVALIDATE = "no-cache"
+
+COMPRESSIBLE_EXTENSIONS = (".css", ".js", ".svg", ".html", ".json", ".txt", ".xml", ".map")
+
+_manifest: dict[str, str] | None = None
+
+
+def brotli_module():
+    """The brotli bindings if installed (Brotli or brotlicffi — same API), else None."""
+    try:
+        import brotli
+        return brotli
+    except ImportError:
+        pass
+    try:
+        import brotlicffi
+        return brotlicffi
+    except ImportError:
+        return None
+
+
+# ── Build ──────────────────────────────────────────────────────────────────
+
+def _sources() -> dict[str, str]:
+    """{relative path with forward slashes: absolute path} for every source asset."""
+    out = {}
+    for root, dirs, files in os.walk(STATIC_DIR):
+        dirs[:] = [d for d in dirs if os.path.join(root, d) != DIST_DIR]
+        for name in files:
+            path = os.path.join(root, name)
+            out[os.path.relpath(path, STATIC_DIR).replace(os.sep, "/")] = path
+    return out
+
+
+def _hashed_name(rel: str, data: bytes) -> str:
+    stem, ext = os.path.splitext(rel)
+    return f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}{ext}"
+
+
+def _write(path: str, data: bytes):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+def build() -> dict[str, str]:
+    """Fingerprint and precompress app/static into app/static/dist. Returns the manifest."""
+    global _manifest
+    brotli = brotli_module()
+    manifest: dict[str, str] = {}
+    keep = {"manifest.json"}
+    for rel, path in sorted(_sources().items()):
+        with open(path, "rb") as f:
+            data = f.read()
+        hashed = manifest[rel] = _hashed_name(rel, data)
+        target = os.path.join(DIST_DIR, hashed)
+        keep.add(hashed)
+        if not os.path.exists(target):
+            _write(target, data)
+        if not rel.endswith(COMPRESSIBLE_EXTENSIONS):
+            continue
+        variants = [(".gz", lambda d: gzip.compress(d, compresslevel=9, mtime=0))]
+        if brotli is not None:
+            variants.append((".br", lambda d: brotli.compress(d, quality=11)))
+        for suffix, compress in variants:
+            if os.path.exists(target + suffix):
+                keep.add(hashed + suffix)
+                continue
+            packed = compress(data)
+            if len(packed) < len(data):
+                _write(target + suffix, packed)
+                keep.add(hashed + suffix)
+
+    # Old fingerprints from previous builds
+    for root, _, files in os.walk(DIST_DIR):
+        for name in files:
+            path = os.path.join(root, name)
+            if os.path.relpath(path, DIST_DIR).replace(os.sep, "/") not in keep:
+                os.remove(path)
+    _write(MANIFEST_PATH, json.dumps(manifest, indent=2, sort_keys=True).encode())
+    _manifest = manifest
+    return manifest
+
+
+def build_if_stale() -> bool:
+    """Rebuild when a source file changed since the last build. Returns True if it rebuilt."""
+    current = _load_manifest()
+    for rel, path in _sources().items():
+        with open(path, "rb") as f:
+            hashed = _hashed_name(rel, f.read())
+        if current.get(rel) != hashed or not os.path.exists(os.path.join(DIST_DIR, hashed)):
+            build()
+            return True
+    return False
+
+
+def clean():
+    global _manifest
+    shutil.rmtree(DIST_DIR, ignore_errors=True)
+    _manifest = None
+
+
+# ── Lookup ─────────────────────────────────────────────────────────────────
+
+def _load_manifest() -> dict[str, str]:
+    global _manifest
+    if _manifest is None:
+        try:
+            with open(MANIFEST_PATH) as f:
+                _manifest = json.load(f)
+        except (OSError, ValueError):
+            _manifest = {}
+    return _manifest
+
+
+def asset_url(name: str) -> str:
+    """URL for a file under app/static — fingerprinted once built, plain otherwise."""
+    hashed = _load_manifest().get(name) if ASSET_FINGERPRINTING else None
+    if hashed:
+        return f"{STATIC_URL}/dist/{hashed}"
+    return f"{STATIC_URL}/{name}"
+
+
+# ── Serving ────────────────────────────────────────────────────────────────
+
+def accepted_encodings(accept_encoding: str) -> set[str]:
+    """Content codings an Accept-Encoding header allows (q=0 excluded)."""
+    accepted = set()
+    for part in accept_encoding.split(","):
+        coding, _, params = part.strip().partition(";")
+        if params.strip().replace(" ", "") in ("q=0", "q=0.0", "q=0.00", "q=0.000"):
+            continue
+        accepted.add(coding.strip().lower())
+    return accepted
+
+
+class AssetFiles(StaticFiles):
+    """StaticFiles with cache headers, and precompressed variants for dist/ files."""
+
+    async def get_response(self, path: str, scope):
+        fingerprinted = path.replace(os.sep, "/").startswith("dist/") and not path.endswith("manifest.json")
+        response = None
+        if fingerprinted and not path.endswith((".gz", ".br")):
+            accepted = accepted_encodings(Headers(scope=scope).get("accept-encoding", ""))
+            for coding, suffix in (("br", ".br"), ("gzip", ".gz")):
+                if coding not in accepted:
+                    continue
+                try:
+                    response = await super().get_response(path + suffix, scope)
+                except HTTPException:
+                    continue
+                response.headers["content-encoding"] = coding
+                media_type, _ = mimetypes.guess_type(path)
+                if media_type:
+                    if media_type.startswith("text/"):
+                        media_type += "; charset=utf-8"
+                    response.headers["content-type"] = media_type
+                break
+        if response is None:
+            response = await super().get_response(path, scope)
+        response.headers["cache-control"] = IMMUTABLE if fingerprinted else REVALIDATE
+        response.headers["vary"] = "Accept-Encoding"
+        return response
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Fingerprint and precompress app/static.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("build", help="write app/static/dist and its manifest")
+    sub.add_parser("clean", help="remove app/static/dist")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        manifest = build()
+        extra = "" if brotli_module() else " (brotli not installed — gzip variants only)"
+        print(f"[ASSETS] Built {len(manifest)} asset(s) into {DIST_DIR}{extra}")
+    elif args.command == "clean":
+        clean()
+        print(f"[ASSETS] Removed {DIST_DIR}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import gzip
+import os
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.assets import brotli_module, accepted_encodings
+
+# Response compression for HTML and JSON.
+#
+# Compresses a response when the client accepts it, its content type is
+# text-like, it is at least COMPRESS_MIN_BYTES, and it arrives as a single body
+# message. Streamed responses (the chat NDJSON stream, exports) pass through
+# untouched: compressing them would hold each line in the compressor's buffer
+# and undo the point of streaming. Static files are precompressed at build
+# time by app.assets and already carry Content-Encoding, so they pass too.
+#
+# Brotli is preferred when installed and accepted; gzip otherwise.
+
+COMPRESS_MIN_BYTES = int(os.getenv("COMPRESS_MIN_BYTES", "1024"))
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+# Dynamic responses: brotli 4–5 is about gzip 6 in speed with a smaller result
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "5"))
+
+COMPRESSIBLE_TYPES = (
+    "text/html", "text/plain", "text/css", "text/csv", "text/xml",
+    "application/json", "application/javascript", "application/xml", "image/svg+xml",
+)
+
+
+def _pick_encoding(accept_encoding: str) -> str | None:
+    accepted = accepted_encodings(accept_encoding)
+    if "br" in accepted and brotli_module() is not None:
+        return "br"
+    if "gzip" in accepted:
+        return "gzip"
+    return None
+
+
+def _compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli_module().compress(body, quality=COMPRESS_BROTLI_QUALITY)
+    return gzip.compress(body, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+
+class CompressionMiddleware:
+    def __init__(self, app, minimum_size: int = COMPRESS_MIN_BYTES):
+        self.app = app
+        self.minimum_size = minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        encoding = _pick_encoding(Headers(scope=scope).get("accept-encoding", ""))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        passthrough = False
+
+        async def send_wrapper(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+            if message["type"] == "http.response.start":
+                start_message = message      # held until the first body says whether to compress
+                return
+            if message["type"] != "http.response.body":
+                await send(message)          # e.g. the test client's http.response.debug
+                return
+
+            body = message.get("body", b"")
+            headers = MutableHeaders(raw=start_message["headers"])
+            content_type = headers.get("content-type", "").split(";")[0].strip().lower()
+            if (
+                message.get("more_body", False)
+                or len(body) < self.minimum_size
+                or "content-encoding" in headers
+                or content_type not in COMPRESSIBLE_TYPES
+            ):
+                passthrough = True
+                await send(start_message)
+                await send(message)
+                return
+
+            compressed = _compress(body, encoding)
+            headers["content-encoding"] = encoding
+            headers["content-length"] = str(len(compressed))
+            headers.add_vary_header("Accept-Encoding")
+            await send(start_message)
+            await send({"type": "http.response.body", "body": compressed})
+
+        await self.app(scope, receive, send_wrapper)
@@ -1,12 +1,32 @@
+import asyncio
 import sqlite3
 import os
+import threading
+import time
+from datetime import datetime
 from dotenv import load_dotenv
 
+from app.metrics import DB_QUERY_SECONDS, current_route
+
 load_dotenv()
 
-DB_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "social_saver.db")
+DB_PATH = os.getenv(
+    "SQLITE_PATH",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "social_saver.db"),
+)
 DATABASE_URL = os.getenv("DATABASE_URL")  # Set on Render → PostgreSQL; absent locally → SQLite
 
+# SQLite connection handling:
+#   "wal"    — WAL journal + tuned pragmas; reads come from a pool of query-only
+#              connections, writes go through one shared writer connection
+#              (default — readers never wait on a writer, writers never collide)
+#   "legacy" — a fresh rollback-journal connection per get_db() call (the old behaviour)
+SQLITE_MODE = os.getenv("SQLITE_MODE", "wal")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+SQLITE_READ_POOL_SIZE = int(os.getenv("SQLITE_READ_POOL_SIZE", "4"))
+SQLITE_CACHE_KB = int(os.getenv("SQLITE_CACHE_KB", "16384"))
+SQLITE_MMAP_BYTES = int(os.getenv("SQLITE_MMAP_BYTES", str(128 * 1024 * 1024)))
+
 
 # ── PostgreSQL compatibility wrappers ──────────────────────────────────────
 # Makes psycopg2 look like sqlite3 so the rest of the codebase needs no changes.
@@ -17,7 +37,11 @@ class _PGCursorWrapper:
         self._cur = cur
 
     def execute(self, sql, params=()):
-        self._cur.execute(sql.replace("?", "%s"), params or ())
+        started = time.perf_counter()
+        try:
+            self._cur.execute(sql.replace("?", "%s"), params or ())
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, current_route.get())
         return self
 
     def fetchone(self):
@@ -34,9 +58,22 @@ class _PGConnectionWrapper:
 
     def execute(self, sql, params=()):
         cur = self._conn.cursor()
-        cur.execute(sql.replace("?", "%s"), params or ())
+        started = time.perf_counter()
+        try:
+            cur.execute(sql.replace("?", "%s"), params or ())
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, current_route.get())
         return cur  # RealDictCursor — supports .fetchone() / .fetchall()
 
+    def executemany(self, sql, seq_of_params):
+        cur = self._conn.cursor()
+        started = time.perf_counter()
+        try:
+            cur.executemany(sql.replace("?", "%s"), seq_of_params)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, current_route.get())
+        return cur
+
     def cursor(self):
         return _PGCursorWrapper(self._conn.cursor())
 
@@ -47,10 +84,183 @@ class _PGConnectionWrapper:
         self._conn.close()
 
 
+class _TimedSQLiteConnection(sqlite3.Connection):
+    """sqlite3 connection that records execute() latency per route."""
+    def execute(self, sql, params=()):
+        started = time.perf_counter()
+        try:
+            return super().execute(sql, params)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, current_route.get())
+
+    def executemany(self, sql, seq_of_params):
+        started = time.perf_counter()
+        try:
+            return super().executemany(sql, seq_of_params)
+        finally:
+            DB_QUERY_SECONDS.observe(time.perf_counter() - started, current_route.get())
+
+
+# ── SQLite WAL mode ────────────────────────────────────────────────────────
+# WAL lets readers run while a write is in progress. SQLite still allows only
+# one writer at a time, so instead of many connections racing for the write
+# lock (and failing with "database is locked" once busy_timeout runs out),
+# every write in this process shares one connection behind a lock, owned by
+# one thread at a time.
+#
+# Waiting for that lock blocks, so write connections are never opened on the
+# event-loop thread: async code runs its write helpers with asyncio.to_thread()
+# and only the worker thread waits. get_db() raises if called for a write on
+# the loop, and on a second write handle in the thread that already holds one
+# (it would share — and could roll back — the first one's transaction).
+
+def _sqlite_connect(query_only: bool = False) -> sqlite3.Connection:
+    conn = sqlite3.connect(
+        DB_PATH,
+        factory=_TimedSQLiteConnection,
+        timeout=SQLITE_BUSY_TIMEOUT_MS / 1000,
+        check_same_thread=False,
+    )
+    conn.row_factory = sqlite3.Row
+    if SQLITE_MODE == "wal":
+        conn.execute("PRAGMA journal_mode = WAL")
+        conn.execute("PRAGMA synchronous = NORMAL")      # durable at checkpoints; safe with WAL
+        conn.execute(f"PRAGMA cache_size = -{SQLITE_CACHE_KB}")
+        conn.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_BYTES}")
+        conn.execute("PRAGMA temp_store = MEMORY")
+    conn.execute("PRAGMA foreign_keys = ON")
+    if query_only:
+        conn.execute("PRAGMA query_only = ON")
+    return conn
+
+
+class _SQLiteHandle:
+    """What get_db() hands out in WAL mode: the sqlite3 API, with close()
+    returning the connection to its owner instead of closing it. Must be
+    closed explicitly (or used as a context manager)."""
+
+    def __init__(self, conn: sqlite3.Connection, release):
+        self._conn = conn
+        self._release = release
+
+    def execute(self, sql, params=()):
+        return self._conn.execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        return self._conn.executemany(sql, seq_of_params)
+
+    def cursor(self):
+        return self._conn.cursor()
+
+    def commit(self):
+        self._conn.commit()
+
+    def rollback(self):
+        self._conn.rollback()
+
+    def close(self):
+        if self._release is None:
+            return
+        if self._conn.in_transaction:
+            self._conn.rollback()      # uncommitted work is discarded, as with a real close()
+        release, self._release = self._release, None
+        release(self._conn)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        # Not released here: __del__ may run on any thread, at any time. A leak
+        # is a bug in the caller, so say so loudly instead of hiding it.
+        if self._release is not None:
+            print("[DB] Connection handle garbage-collected without close()")
+
+
+def _on_event_loop() -> bool:
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class _Writer:
+    """One shared write connection, held by one thread at a time."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._owner: int | None = None
+        self._conn: sqlite3.Connection | None = None
+
+    def acquire(self) -> _SQLiteHandle:
+        if _on_event_loop():
+            raise RuntimeError("write connection requested on the event loop; run the write with asyncio.to_thread()")
+        me = threading.get_ident()
+        if self._owner == me:
+            raise RuntimeError("this thread already holds the write connection; pass it down instead")
+        # Same contract as SQLite's own write lock: wait up to the busy timeout
+        if not self._lock.acquire(timeout=SQLITE_BUSY_TIMEOUT_MS / 1000):
+            raise sqlite3.OperationalError("database is locked (writer connection busy)")
+        self._owner = me
+        try:
+            if self._conn is None:
+                self._conn = _sqlite_connect()
+        except BaseException:
+            self._release(None)
+            raise
+        return _SQLiteHandle(self._conn, self._release)
+
+    def _release(self, conn: sqlite3.Connection | None):
+        self._owner = None
+        self._lock.release()
+
+
+class _ReadPool:
+    """Query-only connections, reused LIFO; extra ones are opened under load and
+    closed on release once the pool is full."""
+
+    def __init__(self, size: int):
+        self._size = size
+        self._idle: list[sqlite3.Connection] = []
+        self._lock = threading.Lock()
+
+    def acquire(self) -> _SQLiteHandle:
+        with self._lock:
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = _sqlite_connect(query_only=True)
+        return _SQLiteHandle(conn, self._release)
+
+    def _release(self, conn: sqlite3.Connection):
+        with self._lock:
+            if len(self._idle) < self._size:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+
+_writer = _Writer()
+_read_pool = _ReadPool(SQLITE_READ_POOL_SIZE)
+
+
 # ── Public API ─────────────────────────────────────────────────────────────
 
-def get_db():
-    """Return a DB connection — PostgreSQL on Render, SQLite locally."""
+def sql_timestamp(dt: datetime) -> str:
+    """Timestamp literal that compares correctly against both SQLite DATETIME and PG TIMESTAMP."""
+    return dt.strftime("%Y-%m-%d %H:%M:%S")
+
+
+def get_db(readonly: bool = False):
+    """Return a DB connection — PostgreSQL on Render, SQLite locally.
+
+    Pass readonly=True for connections that only SELECT; in SQLite WAL mode they
+    come from the read pool instead of queueing for the single writer. Always
+    close() the connection before the next await. A write connection in WAL
+    mode must be opened off the event loop (asyncio.to_thread).
+    """
     if DATABASE_URL:
         import psycopg2
         import psycopg2.extras
@@ -60,21 +270,66 @@ def get_db():
         )
         return _PGConnectionWrapper(conn)
     # Local development — SQLite
-    conn = sqlite3.connect(DB_PATH)
+    if SQLITE_MODE == "wal":
+        return _read_pool.acquire() if readonly else _writer.acquire()
+    conn = sqlite3.connect(DB_PATH, factory=_TimedSQLiteConnection)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA foreign_keys = ON")
     return conn
 
 
-def init_db():
-    """Create tables if they don't exist. Safe to re-run on every startup."""
+def iter_rows(sql: str, params=(), chunk_size: int = 500):
+    """Yield lists of up to `chunk_size` rows (dicts) without loading the whole result.
+
+    PostgreSQL: a server-side named cursor, so rows stay on the server until fetched.
+    SQLite: fetchmany() on a plain cursor, which steps the statement lazily.
+    The connection is opened on first iteration and closed when the generator
+    finishes or is closed, and may be advanced from different threads (Starlette
+    iterates sync generators in its threadpool), one step at a time.
+    """
     if DATABASE_URL:
-        # PostgreSQL — use direct psycopg2 with autocommit (avoids cursor-lifecycle issues)
         import psycopg2
+        import psycopg2.extras
         conn = psycopg2.connect(DATABASE_URL)
-        conn.autocommit = True
-        cur = conn.cursor()
-        cur.execute("""
+        try:
+            with conn.cursor(name="iter_rows", cursor_factory=psycopg2.extras.RealDictCursor) as cur:
+                cur.itersize = chunk_size
+                cur.execute(sql.replace("?", "%s"), params or ())
+                while True:
+                    rows = cur.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield [dict(r) for r in rows]
+        finally:
+            conn.close()
+        return
+
+    conn = _sqlite_connect(query_only=True)
+    try:
+        cur = conn.execute(sql, params)
+        while True:
+            rows = cur.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield [dict(r) for r in rows]
+    finally:
+        conn.close()
+
+
+# ── Migrations ─────────────────────────────────────────────────────────────
+# Each entry is (version, description, PostgreSQL statements, SQLite statements).
+# init_db() applies only the entries newer than the version recorded in
+# schema_version, so a normal boot costs one SELECT. Append new entries at the
+# end — never edit one that has already shipped.
+#
+# Version 1 re-runs the pre-versioning DDL (all IF NOT EXISTS / tolerated ALTERs)
+# so existing databases adopt the table without manual steps.
+
+MIGRATIONS = [
+    (
+        1, "base schema",
+        [
+            """
             CREATE TABLE IF NOT EXISTS users (
                 id SERIAL PRIMARY KEY,
                 name TEXT,
@@ -82,9 +337,9 @@ def init_db():
                 password_hash TEXT NOT NULL,
                 created_at TIMESTAMP DEFAULT NOW()
             )
-        """)
-        cur.execute("ALTER TABLE users ADD COLUMN IF NOT EXISTS name TEXT")
-        cur.execute("""
+            """,
+            "ALTER TABLE users ADD COLUMN IF NOT EXISTS name TEXT",
+            """
             CREATE TABLE IF NOT EXISTS saved_links (
                 id SERIAL PRIMARY KEY,
                 user_id INTEGER NOT NULL REFERENCES users(id),
@@ -97,56 +352,303 @@ def init_db():
                 tags TEXT,
                 saved_at TIMESTAMP DEFAULT NOW()
             )
-        """)
-        cur.execute("ALTER TABLE saved_links ADD COLUMN IF NOT EXISTS tags TEXT")
-        cur.execute(
-            "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_url ON saved_links (user_id, original_url)"
-        )
-        cur.close()
-        conn.close()
+            """,
+            "ALTER TABLE saved_links ADD COLUMN IF NOT EXISTS tags TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_url ON saved_links (user_id, original_url)",
+        ],
+        [
+            """
+            CREATE TABLE IF NOT EXISTS users (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT,
+                whatsapp_number TEXT NOT NULL UNIQUE,
+                password_hash TEXT NOT NULL,
+                created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+            )
+            """,
+            "ALTER TABLE users ADD COLUMN name TEXT",
+            """
+            CREATE TABLE IF NOT EXISTS saved_links (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                original_url TEXT NOT NULL,
+                platform TEXT NOT NULL,
+                extracted_text TEXT,
+                ai_summary TEXT,
+                category TEXT,
+                thumbnail_url TEXT,
+                tags TEXT,
+                saved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                FOREIGN KEY (user_id) REFERENCES users(id)
+            )
+            """,
+            "ALTER TABLE saved_links ADD COLUMN tags TEXT",
+            "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_url ON saved_links (user_id, original_url)",
+        ],
+    ),
+    (
+        2, "refresh bookkeeping — HTTP validators from the last fetch + when it happened",
+        [
+            "ALTER TABLE saved_links ADD COLUMN IF NOT EXISTS etag TEXT",
+            "ALTER TABLE saved_links ADD COLUMN IF NOT EXISTS last_modified TEXT",
+            "ALTER TABLE saved_links ADD COLUMN IF NOT EXISTS refreshed_at TIMESTAMP",
+        ],
+        [
+            "ALTER TABLE saved_links ADD COLUMN etag TEXT",
+            "ALTER TABLE saved_links ADD COLUMN last_modified TEXT",
+            "ALTER TABLE saved_links ADD COLUMN refreshed_at DATETIME",
+        ],
+    ),
+    (
+        3, "webhook idempotency keys (Twilio MessageSid)",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS webhook_messages (
+                message_sid TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                reply TEXT,
+                created_at TIMESTAMP NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_webhook_messages_created ON webhook_messages (created_at)",
+        ],
+        [
+            """
+            CREATE TABLE IF NOT EXISTS webhook_messages (
+                message_sid TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                reply TEXT,
+                created_at DATETIME NOT NULL
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_webhook_messages_created ON webhook_messages (created_at)",
+        ],
+    ),
+    (
+        4, "per-user facet counters (category / platform / month), backfilled",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS user_link_stats (
+                user_id INTEGER NOT NULL,
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, dimension, value)
+            )
+            """,
+            """
+            INSERT INTO user_link_stats (user_id, dimension, value, count)
+            SELECT user_id, 'category', COALESCE(category, 'Other'), COUNT(*)
+            FROM saved_links GROUP BY user_id, COALESCE(category, 'Other')
+            """,
+            """
+            INSERT INTO user_link_stats (user_id, dimension, value, count)
+            SELECT user_id, 'platform', COALESCE(platform, 'unknown'), COUNT(*)
+            FROM saved_links GROUP BY user_id, COALESCE(platform, 'unknown')
+            """,
+            """
+            INSERT INTO user_link_stats (user_id, dimension, value, count)
+            SELECT user_id, 'month', to_char(saved_at, 'YYYY-MM'), COUNT(*)
+            FROM saved_links GROUP BY user_id, to_char(saved_at, 'YYYY-MM')
+            """,
+        ],
+        [
+            """
+            CREATE TABLE IF NOT EXISTS user_link_stats (
+                user_id INTEGER NOT NULL,
+                dimension TEXT NOT NULL,
+                value TEXT NOT NULL,
+                count INTEGER NOT NULL,
+                PRIMARY KEY (user_id, dimension, value)
+            )
+            """,
+            """
+            INSERT INTO user_link_stats (user_id, dimension, value, count)
+            SELECT user_id, 'category', COALESCE(category, 'Other'), COUNT(*)
+            FROM saved_links GROUP BY user_id, COALESCE(category, 'Other')
+            """,
+            """
+            INSERT INTO user_link_stats (user_id, dimension, value, count)
+            SELECT user_id, 'platform', COALESCE(platform, 'unknown'), COUNT(*)
+            FROM saved_links GROUP BY user_id, COALESCE(platform, 'unknown')
+            """,
+            """
+            INSERT INTO user_link_stats (user_id, dimension, value, count)
+            SELECT user_id, 'month', strftime('%Y-%m', saved_at), COUNT(*)
+            FROM saved_links GROUP BY user_id, strftime('%Y-%m', saved_at)
+            """,
+        ],
+    ),
+    (
+        5, "raw extracted_text moves to compressed link_text; short display_text stays inline",
+        # Existing rows are moved in batches by app.textstore's backfill, not here
+        [
+            """
+            CREATE TABLE IF NOT EXISTS link_text (
+                link_id INTEGER PRIMARY KEY REFERENCES saved_links(id) ON DELETE CASCADE,
+                body BYTEA NOT NULL
+            )
+            """,
+            "ALTER TABLE saved_links ADD COLUMN IF NOT EXISTS display_text TEXT",
+        ],
+        [
+            """
+            CREATE TABLE IF NOT EXISTS link_text (
+                link_id INTEGER PRIMARY KEY,
+                body BLOB NOT NULL,
+                FOREIGN KEY (link_id) REFERENCES saved_links(id) ON DELETE CASCADE
+            )
+            """,
+            "ALTER TABLE saved_links ADD COLUMN display_text TEXT",
+        ],
+    ),
+    (
+        6, "normalized tag index (link_tags); existing links are indexed by app.tags' backfill",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS link_tags (
+                link_id INTEGER NOT NULL REFERENCES saved_links(id) ON DELETE CASCADE,
+                user_id INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (link_id, tag)
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_link_tags_user_tag ON link_tags (user_id, tag)",
+        ],
+        [
+            """
+            CREATE TABLE IF NOT EXISTS link_tags (
+                link_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                tag TEXT NOT NULL,
+                PRIMARY KEY (link_id, tag),
+                FOREIGN KEY (link_id) REFERENCES saved_links(id) ON DELETE CASCADE
+            )
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_link_tags_user_tag ON link_tags (user_id, tag)",
+        ],
+    ),
+    (
+        7, "saves deferred by admission control, processed by app.admission's worker",
+        [
+            """
+            CREATE TABLE IF NOT EXISTS deferred_saves (
+                id SERIAL PRIMARY KEY,
+                user_id INTEGER NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+                url TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at TIMESTAMP NOT NULL,
+                UNIQUE (user_id, url)
+            )
+            """,
+        ],
+        [
+            """
+            CREATE TABLE IF NOT EXISTS deferred_saves (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                user_id INTEGER NOT NULL,
+                url TEXT NOT NULL,
+                channel TEXT NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                created_at DATETIME NOT NULL,
+                UNIQUE (user_id, url),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            )
+            """,
+        ],
+    ),
+    (
+        8, "when each link is next due for a refresh (indexed), backfilled with the default intervals",
+        # Weak "User-categorized as …" rows are retried after 6 hours, the rest
+        # after 7 days — REFRESH_WEAK_RETRY_HOURS / REFRESH_STALE_DAYS defaults
+        [
+            "ALTER TABLE saved_links ADD COLUMN IF NOT EXISTS next_refresh_at TIMESTAMP",
+            """
+            UPDATE saved_links SET next_refresh_at = COALESCE(refreshed_at, saved_at) + CASE
+                WHEN ai_summary LIKE 'User-categorized as %' THEN INTERVAL '6 hours'
+                ELSE INTERVAL '7 days' END
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_saved_links_next_refresh ON saved_links (next_refresh_at)",
+        ],
+        [
+            "ALTER TABLE saved_links ADD COLUMN next_refresh_at DATETIME",
+            """
+            UPDATE saved_links SET next_refresh_at = datetime(COALESCE(refreshed_at, saved_at), CASE
+                WHEN ai_summary LIKE 'User-categorized as %' THEN '+6 hours'
+                ELSE '+7 days' END)
+            """,
+            "CREATE INDEX IF NOT EXISTS ix_saved_links_next_refresh ON saved_links (next_refresh_at)",
+        ],
+    ),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+
+# pg_advisory_lock key that serializes init_db() across processes
+_MIGRATION_LOCK_KEY = 0x534F4349   # "SOCI"
+
+
+def init_db():
+    """Bring the schema up to SCHEMA_VERSION. Cheap when already current."""
+    if DATABASE_URL:
+        # PostgreSQL — direct psycopg2. DDL is transactional here, so each
+        # migration commits together with its schema_version row: one that
+        # fails halfway rolls back whole and is retried cleanly on next boot.
+        import psycopg2
+        conn = psycopg2.connect(DATABASE_URL)
+        cur = conn.cursor()
+        try:
+            # Workers booting together migrate one at a time; the others then
+            # find the schema current. The lock is released when conn closes.
+            cur.execute("SELECT pg_advisory_lock(%s)", (_MIGRATION_LOCK_KEY,))
+            cur.execute("""
+                CREATE TABLE IF NOT EXISTS schema_version (
+                    version INTEGER PRIMARY KEY,
+                    applied_at TIMESTAMP DEFAULT NOW()
+                )
+            """)
+            conn.commit()
+            cur.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version")
+            current = cur.fetchone()[0]
+            for version, description, pg_statements, _ in MIGRATIONS:
+                if version <= current:
+                    continue
+                print(f"[DB] Applying migration {version}: {description}")
+                for sql in pg_statements:
+                    cur.execute(sql)
+                cur.execute("INSERT INTO schema_version (version) VALUES (%s)", (version,))
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            cur.close()
+            conn.close()
         return
 
     # SQLite (local development)
     conn = get_db()
     cursor = conn.cursor()
-
     cursor.execute("""
-        CREATE TABLE IF NOT EXISTS users (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            name TEXT,
-            whatsapp_number TEXT NOT NULL UNIQUE,
-            password_hash TEXT NOT NULL,
-            created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+        CREATE TABLE IF NOT EXISTS schema_version (
+            version INTEGER PRIMARY KEY,
+            applied_at DATETIME DEFAULT CURRENT_TIMESTAMP
         )
     """)
-    try:
-        cursor.execute("ALTER TABLE users ADD COLUMN name TEXT")
-    except Exception:
-        pass
-
-    cursor.execute("""
-        CREATE TABLE IF NOT EXISTS saved_links (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            original_url TEXT NOT NULL,
-            platform TEXT NOT NULL,
-            extracted_text TEXT,
-            ai_summary TEXT,
-            category TEXT,
-            thumbnail_url TEXT,
-            tags TEXT,
-            saved_at DATETIME DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users(id)
-        )
-    """)
-    try:
-        cursor.execute("ALTER TABLE saved_links ADD COLUMN tags TEXT")
-    except Exception:
-        pass
-
-    cursor.execute(
-        "CREATE UNIQUE INDEX IF NOT EXISTS uq_user_url ON saved_links (user_id, original_url)"
-    )
+    current = cursor.execute("SELECT COALESCE(MAX(version), 0) FROM schema_version").fetchone()[0]
+    for version, description, _, sqlite_statements in MIGRATIONS:
+        if version <= current:
+            continue
+        print(f"[DB] Applying migration {version}: {description}")
+        for sql in sqlite_statements:
+            try:
+                cursor.execute(sql)
+            except sqlite3.OperationalError as e:
+                # SQLite has no ADD COLUMN IF NOT EXISTS — a pre-versioning DB may already have it
+                if "duplicate column" not in str(e):
+                    raise
+        cursor.execute("INSERT OR IGNORE INTO schema_version (version) VALUES (?)", (version,))
+        conn.commit()
 
-    conn.commit()
     conn.close()
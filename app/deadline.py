@@ -0,0 +1,80 @@
+import contextvars
+import os
+import time
+from contextlib import contextmanager
+
+# Request-scoped time budget for a save.
+#
+# Twilio gives the webhook 15 seconds to answer. The webhook and chat routes
+# open a budget() around the save; everything below it — the outbound
+# scheduler, each scraper strategy, each LLM provider — sizes its timeout from
+# what is left via timeout(), and skips a fallback once expired(), returning
+# the best partial result it has instead of overrunning the window.
+#
+# reserve() keeps time back for a later stage: the scrape runs inside
+# reserve(LLM_RESERVE_SECONDS), so a slow platform can't eat the time the
+# classifier needs. Outside any budget (refreshes, imports, thumbnails)
+# remaining() is None and every timeout falls back to its default.
+#
+# Like fetch.priority(), the deadline lives in a ContextVar, so tasks started
+# inside a budget (the single-flight scrape / classify tasks) inherit it.
+
+SAVE_BUDGET_SECONDS = float(os.getenv("SAVE_BUDGET_SECONDS", "12"))
+LLM_RESERVE_SECONDS = float(os.getenv("LLM_RESERVE_SECONDS", "4"))
+# A stage with less than this left is skipped rather than started
+MIN_STAGE_SECONDS = float(os.getenv("DEADLINE_MIN_STAGE_SECONDS", "0.5"))
+
+_deadline: contextvars.ContextVar[float | None] = contextvars.ContextVar("save_deadline", default=None)
+
+
+class DeadlineExceeded(Exception):
+    """The request's budget ran out before this step could start."""
+
+
+@contextmanager
+def _set(at: float):
+    token = _deadline.set(at)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+@contextmanager
+def budget(seconds: float = SAVE_BUDGET_SECONDS):
+    """Give work inside this block at most `seconds`. Never extends an outer budget."""
+    at = time.monotonic() + seconds
+    current = _deadline.get()
+    with _set(at if current is None else min(at, current)):
+        yield
+
+
+@contextmanager
+def reserve(seconds: float):
+    """Hold `seconds` of the current budget back for whatever runs after this block."""
+    current = _deadline.get()
+    if current is None:
+        yield
+        return
+    with _set(current - seconds):
+        yield
+
+
+def remaining() -> float | None:
+    """Seconds left in the current budget (>= 0), or None outside one."""
+    current = _deadline.get()
+    if current is None:
+        return None
+    return max(0.0, current - time.monotonic())
+
+
+def expired() -> bool:
+    """True when too little of the budget is left to start another stage."""
+    left = remaining()
+    return left is not None and left < MIN_STAGE_SECONDS
+
+
+def timeout(default: float) -> float:
+    """`default`, cut down to what is left of the budget."""
+    left = remaining()
+    return default if left is None else min(default, left)
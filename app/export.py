@@ -0,0 +1,114 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from html import escape
+
+from app import textstore
+from app.database import iter_rows
+
+# Streaming export of a user's library.
+#
+# Each generator pulls rows from iter_rows() a chunk at a time and yields one
+# encoded string per chunk, so memory stays flat however many links a user has.
+# Rows come out ordered by category (NULL sorts as "Other", the name it is shown
+# under) so the bookmarks file can open one folder per category without
+# buffering. The full text is joined in from link_text and decompressed one
+# chunk at a time.
+
+EXPORT_CHUNK_SIZE = 500
+
+EXPORT_COLUMNS = [
+    "id", "original_url", "platform", "category", "ai_summary", "tags",
+    "thumbnail_url", "extracted_text", "saved_at",
+]
+
+FORMATS = {
+    # format → (media type, file extension)
+    "csv": ("text/csv; charset=utf-8", "csv"),
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "html": ("text/html; charset=utf-8", "html"),
+}
+
+
+def _chunks(user_id: int):
+    sql = (
+        f"SELECT {', '.join('s.' + c for c in EXPORT_COLUMNS)}, t.body AS text_body "
+        f"FROM saved_links s LEFT JOIN link_text t ON t.link_id = s.id WHERE s.user_id = ? "
+        f"ORDER BY COALESCE(s.category, 'Other'), s.saved_at DESC, s.id"
+    )
+    for rows in iter_rows(sql, (user_id,), EXPORT_CHUNK_SIZE):
+        for row in rows:
+            row["extracted_text"] = textstore.resolve(row.pop("text_body"), row["extracted_text"])
+        yield rows
+
+
+def _saved_at_str(value) -> str:
+    if isinstance(value, datetime):
+        return value.isoformat(sep=" ", timespec="seconds")
+    return value or ""
+
+
+def _unix_time(value) -> int:
+    if not isinstance(value, datetime):
+        try:
+            value = datetime.fromisoformat(str(value))
+        except ValueError:
+            return 0
+    if value.tzinfo is None:
+        value = value.replace(tzinfo=timezone.utc)   # saved_at is stored in UTC
+    return int(value.timestamp())
+
+
+def export_csv(user_id: int):
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(EXPORT_COLUMNS)
+    yield buf.getvalue()
+    for rows in _chunks(user_id):
+        buf.seek(0)
+        buf.truncate()
+        for row in rows:
+            row["saved_at"] = _saved_at_str(row["saved_at"])
+            writer.writerow([row[c] for c in EXPORT_COLUMNS])
+        yield buf.getvalue()
+
+
+def export_ndjson(user_id: int):
+    for rows in _chunks(user_id):
+        yield "".join(
+            json.dumps({**row, "saved_at": _saved_at_str(row["saved_at"])}, ensure_ascii=False) + "\n"
+            for row in rows
+        )
+
+
+def export_html(user_id: int):
+    """Netscape bookmark file — imports into Chrome, Firefox, Safari and most read-later apps."""
+    yield (
+        "<!DOCTYPE NETSCAPE-Bookmark-file-1>\n"
+        '<META HTTP-EQUIV="Content-Type" CONTENT="text/html; charset=UTF-8">\n'
+        "<TITLE>Social Saver</TITLE>\n<H1>Social Saver</H1>\n<DL><p>\n"
+    )
+    current = None
+    for rows in _chunks(user_id):
+        parts = []
+        for row in rows:
+            category = row["category"] or "Other"
+            if category != current:
+                if current is not None:
+                    parts.append("    </DL><p>\n")
+                parts.append(f"    <DT><H3>{escape(category)}</H3>\n    <DL><p>\n")
+                current = category
+            title = row["ai_summary"] or row["original_url"]
+            parts.append(
+                f'        <DT><A HREF="{escape(row["original_url"])}" '
+                f'ADD_DATE="{_unix_time(row["saved_at"])}" '
+                f'TAGS="{escape(row["tags"] or "")}">{escape(title)}</A>\n'
+            )
+        yield "".join(parts)
+    if current is not None:
+        yield "    </DL><p>\n"
+    yield "</DL><p>\n"
+
+
+EXPORTERS = {"csv": export_csv, "ndjson": export_ndjson, "html": export_html}
@@ -0,0 +1,147 @@
+import asyncio
+import os
+from datetime import datetime, timedelta, timezone
+
+from dotenv import load_dotenv
+
+from app.database import get_db, sql_timestamp
+
+load_dotenv()
+
+# Idempotency keys for the WhatsApp webhook.
+#
+# Twilio retries a webhook that is slow to answer, with the same MessageSid.
+# The first delivery claims the sid (status "processing"); once it has a reply
+# the row becomes "done" and stores the TwiML, so a repeat delivery gets the
+# same reply back without scraping or calling the LLM again. A repeat that
+# arrives while the first is still working waits briefly for it, then answers
+# "still processing". Keys expire after IDEMPOTENCY_TTL_HOURS and are deleted
+# in batches by a background sweep.
+
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+# A "processing" claim older than this belongs to a worker that died — let a retry take it over
+IDEMPOTENCY_STALE_SECONDS = int(os.getenv("IDEMPOTENCY_STALE_SECONDS", "120"))
+# How long a repeat delivery waits for the in-flight one before answering "still processing"
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "5"))
+IDEMPOTENCY_SWEEP_INTERVAL = int(os.getenv("IDEMPOTENCY_SWEEP_INTERVAL", "600"))
+IDEMPOTENCY_SWEEP_BATCH = int(os.getenv("IDEMPOTENCY_SWEEP_BATCH", "500"))
+
+_task: asyncio.Task | None = None
+
+
+def _now() -> datetime:
+    return datetime.now(timezone.utc)
+
+
+def claim(message_sid: str) -> bool:
+    """Try to take ownership of a delivery. True if the caller should process it."""
+    conn = get_db()
+    now = _now()
+    cur = conn.execute(
+        """INSERT INTO webhook_messages (message_sid, status, created_at)
+           VALUES (?, 'processing', ?)
+           ON CONFLICT (message_sid) DO NOTHING""",
+        (message_sid, sql_timestamp(now)),
+    )
+    claimed = cur.rowcount == 1
+    if not claimed:
+        # Take over a claim whose worker never finished
+        cur = conn.execute(
+            """UPDATE webhook_messages SET created_at = ?
+               WHERE message_sid = ? AND status = 'processing' AND created_at < ?""",
+            (
+                sql_timestamp(now),
+                message_sid,
+                sql_timestamp(now - timedelta(seconds=IDEMPOTENCY_STALE_SECONDS)),
+            ),
+        )
+        claimed = cur.rowcount == 1
+    conn.commit()
+    conn.close()
+    return claimed
+
+
+def complete(message_sid: str, reply: str):
+    """Store the reply for a processed delivery so repeats can replay it."""
+    conn = get_db()
+    conn.execute(
+        "UPDATE webhook_messages SET status = 'done', reply = ? WHERE message_sid = ?",
+        (reply, message_sid),
+    )
+    conn.commit()
+    conn.close()
+
+
+def release(message_sid: str):
+    """Drop a claim after a failure so Twilio's retry processes the message from scratch."""
+    conn = get_db()
+    conn.execute(
+        "DELETE FROM webhook_messages WHERE message_sid = ? AND status = 'processing'",
+        (message_sid,),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _cached_reply(message_sid: str) -> str | None:
+    conn = get_db(readonly=True)
+    row = conn.execute(
+        "SELECT status, reply FROM webhook_messages WHERE message_sid = ?", (message_sid,)
+    ).fetchone()
+    conn.close()
+    if row and row["status"] == "done":
+        return row["reply"]
+    return None
+
+
+async def wait_for_reply(message_sid: str) -> str | None:
+    """Poll for the reply of an in-flight delivery for up to IDEMPOTENCY_WAIT_SECONDS."""
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        reply = _cached_reply(message_sid)
+        if reply is not None or loop.time() >= deadline:
+            return reply
+        await asyncio.sleep(0.25)
+
+
+# ── Expiry sweep ───────────────────────────────────────────────────────────
+
+def purge_expired() -> int:
+    """Delete expired keys, IDEMPOTENCY_SWEEP_BATCH rows per statement so the
+    table is never locked for long. Returns the number of rows removed."""
+    cutoff = sql_timestamp(_now() - timedelta(hours=IDEMPOTENCY_TTL_HOURS))
+    removed = 0
+    while True:
+        conn = get_db()
+        cur = conn.execute(
+            """DELETE FROM webhook_messages WHERE message_sid IN (
+                   SELECT message_sid FROM webhook_messages WHERE created_at < ? LIMIT ?
+               )""",
+            (cutoff, IDEMPOTENCY_SWEEP_BATCH),
+        )
+        deleted = cur.rowcount
+        conn.commit()
+        conn.close()
+        removed += deleted
+        if deleted < IDEMPOTENCY_SWEEP_BATCH:
+            return removed
+
+
+async def _loop():
+    while True:
+        try:
+            removed = await asyncio.to_thread(purge_expired)
+            if removed:
+                print(f"[IDEMPOTENCY] Purged {removed} expired webhook keys")
+        except Exception as e:
+            print(f"[IDEMPOTENCY] Sweep failed: {e}")
+        await asyncio.sleep(IDEMPOTENCY_SWEEP_INTERVAL)
+
+
+def start_sweeper():
+    """Start the background expiry sweep (no-op if already running)."""
+    global _task
+    if _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_loop())
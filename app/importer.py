@@ -0,0 +1,218 @@
+import asyncio
+import html
+import os
+import re
+import time
+import uuid
+
+from dotenv import load_dotenv
+
+from app import pipeline
+from app.database import get_db
+from app.metrics import SAVES_TOTAL
+from app.scrapers import detect_platform, extract_url, normalize_url, fetch
+from app.session_store import is_weak_text
+from app.thumbnails import prefetch
+
+load_dotenv()
+
+# Bulk import of links from an uploaded file.
+#
+# Accepts a browser bookmarks export (Netscape HTML) or any text containing
+# URLs, such as a WhatsApp chat export. start_import() parses and dedupes
+# up front (one IN query against saved_links), then a background job scrapes
+# and classifies with at most IMPORT_CONCURRENCY links in flight, at prefetch
+# priority so live saves still jump the outbound queues. Finished links are
+# written IMPORT_BATCH_SIZE at a time with one executemany.
+#
+# Job state is in-memory, like the MCQ session store — a restart loses the
+# progress view, not the links already written.
+
+IMPORT_CONCURRENCY = int(os.getenv("IMPORT_CONCURRENCY", "4"))
+IMPORT_BATCH_SIZE = int(os.getenv("IMPORT_BATCH_SIZE", "25"))
+IMPORT_MAX_LINKS = int(os.getenv("IMPORT_MAX_LINKS", "2000"))
+IMPORT_MAX_BYTES = int(os.getenv("IMPORT_MAX_BYTES", str(5 * 1024 * 1024)))
+# Finished jobs are kept this long for the progress endpoint
+IMPORT_JOB_TTL_SECONDS = int(os.getenv("IMPORT_JOB_TTL_SECONDS", "3600"))
+
+# SQLite's default limit on bound parameters is 999; stay well under it
+_IN_CHUNK = 900
+
+_HREF = re.compile(r'href\s*=\s*"([^"]+)"', re.IGNORECASE)
+_TRAILING = ".,;:!?)]}>'\""
+
+jobs: dict[str, dict] = {}
+_tasks: set[asyncio.Task] = set()
+
+
+# ── Parsing ────────────────────────────────────────────────────────────────
+
+def parse_urls(content: str) -> list[str]:
+    """Normalized, de-duplicated URLs in file order."""
+    if "<a " in content.lower() or "NETSCAPE-Bookmark-file" in content:
+        candidates = (html.unescape(h) for h in _HREF.findall(content))
+    else:
+        candidates = content.split()
+
+    seen: set[str] = set()
+    urls = []
+    for candidate in candidates:
+        url = extract_url(candidate).rstrip(_TRAILING)
+        if not url:
+            continue
+        url = normalize_url(url)
+        if url not in seen:
+            seen.add(url)
+            urls.append(url)
+    return urls
+
+
+def _existing_urls(user_id: int, urls: list[str]) -> set[str]:
+    """Which of `urls` the user already has — one IN query per 900 URLs."""
+    existing: set[str] = set()
+    conn = get_db(readonly=True)
+    for i in range(0, len(urls), _IN_CHUNK):
+        chunk = urls[i:i + _IN_CHUNK]
+        rows = conn.execute(
+            f"SELECT original_url FROM saved_links WHERE user_id = ? "
+            f"AND original_url IN ({', '.join('?' * len(chunk))})",
+            [user_id] + chunk,
+        ).fetchall()
+        existing.update(r["original_url"] for r in rows)
+    conn.close()
+    return existing
+
+
+# ── Jobs ───────────────────────────────────────────────────────────────────
+
+def _purge_old_jobs():
+    cutoff = time.time() - IMPORT_JOB_TTL_SECONDS
+    for job_id in [j for j, job in jobs.items() if job["finished_at"] and job["finished_at"] < cutoff]:
+        del jobs[job_id]
+
+
+def start_import(user_id: int, content: str) -> dict:
+    """Parse `content`, dedupe, and start the background job. Returns the job dict."""
+    _purge_old_jobs()
+    urls = parse_urls(content)
+    truncated = max(0, len(urls) - IMPORT_MAX_LINKS)
+    urls = urls[:IMPORT_MAX_LINKS]
+    existing = _existing_urls(user_id, urls)
+    todo = [u for u in urls if u not in existing]
+
+    job = {
+        "id": uuid.uuid4().hex,
+        "user_id": user_id,
+        "status": "running" if todo else "done",
+        "found": len(urls) + truncated,
+        "truncated": truncated,
+        "duplicates": len(existing),
+        "total": len(todo),
+        "processed": 0,
+        "saved": 0,
+        "weak": 0,
+        "failed": 0,
+        "started_at": time.time(),
+        "finished_at": None if todo else time.time(),
+    }
+    jobs[job["id"]] = job
+    if todo:
+        task = asyncio.get_running_loop().create_task(_run(job, todo))
+        _tasks.add(task)
+        task.add_done_callback(_tasks.discard)
+    print(f"[IMPORT] Job {job['id']}: {len(urls)} links, {len(existing)} already saved, {len(todo)} to import")
+    return job
+
+
+def progress(job: dict) -> dict:
+    out = {k: v for k, v in job.items() if k != "user_id"}
+    elapsed = (job["finished_at"] or time.time()) - job["started_at"]
+    out["elapsed_seconds"] = round(elapsed, 1)
+    out["percent"] = round(100 * job["processed"] / job["total"], 1) if job["total"] else 100.0
+    return out
+
+
+async def process_url(url: str, weak_summary: str = "Imported link.") -> tuple[dict | None, str]:
+    """Scrape + classify one URL with nobody waiting on the reply (imports and
+    deferred saves). Returns (row for insert_links, outcome)."""
+    platform = detect_platform(url)
+    if not platform:
+        return None, "failed"
+    scraped = await pipeline.scrape(url, platform)
+    text = scraped.get("text", "")
+    if is_weak_text(text):
+        # Nobody to ask an MCQ — file it under Other for the user (and the refresher) to revisit
+        return {
+            "url": url, "platform": platform, "extracted_text": text,
+            "summary": weak_summary, "category": "Other", "tags": "",
+            "thumbnail_url": scraped.get("thumbnail_url"),
+            "etag": scraped.get("etag"), "last_modified": scraped.get("last_modified"),
+        }, "weak"
+    ai_result = await pipeline.classify(url, text, batched=True)
+    return {
+        "url": url, "platform": platform, "extracted_text": text,
+        "summary": ai_result["summary"], "category": ai_result["category"],
+        "tags": ai_result.get("tags", ""),
+        "thumbnail_url": scraped.get("thumbnail_url"),
+        "etag": scraped.get("etag"), "last_modified": scraped.get("last_modified"),
+    }, "saved"
+
+
+async def _run(job: dict, urls: list[str]):
+    semaphore = asyncio.Semaphore(IMPORT_CONCURRENCY)
+    pending_rows: list[tuple[dict, str]] = []    # (row, outcome) waiting for the next batch
+
+    async def flush():
+        batch = pending_rows[:]
+        pending_rows.clear()
+        # saved / weak are counted from what insert_links actually wrote, so a
+        # link saved meanwhile by another channel counts as a duplicate
+        for outcome in ("saved", "weak"):
+            rows = [row for row, o in batch if o == outcome]
+            if not rows:
+                continue
+            try:
+                inserted = await asyncio.to_thread(pipeline.insert_links, job["user_id"], rows)
+            except Exception as e:
+                print(f"[IMPORT] Job {job['id']}: writing {len(rows)} links failed: {e}")
+                job["failed"] += len(rows)
+                SAVES_TOTAL.inc("import", "failed", amount=len(rows))
+                continue
+            job[outcome] += inserted
+            job["duplicates"] += len(rows) - inserted
+            SAVES_TOTAL.inc("import", outcome, amount=inserted)
+            SAVES_TOTAL.inc("import", "duplicate", amount=len(rows) - inserted)
+            for row in rows:
+                prefetch(row["thumbnail_url"])
+
+    async def one(url: str):
+        async with semaphore:
+            try:
+                row, outcome = await process_url(url)
+            except Exception as e:
+                print(f"[IMPORT] {url} failed: {e}")
+                row, outcome = None, "failed"
+        job["processed"] += 1
+        if not row:
+            job[outcome] += 1
+            SAVES_TOTAL.inc("import", outcome)
+            return
+        pending_rows.append((row, outcome))
+        if len(pending_rows) >= IMPORT_BATCH_SIZE:
+            await flush()
+
+    try:
+        with fetch.priority(fetch.PRIORITY_PREFETCH):
+            await asyncio.gather(*(one(u) for u in urls))
+        job["status"] = "done"
+    except Exception as e:
+        print(f"[IMPORT] Job {job['id']} failed: {e}")
+        job["status"] = "failed"
+    finally:
+        # Whatever finished before an error or cancellation still gets written
+        await flush()
+        job["finished_at"] = time.time()
+        print(
+            f"[IMPORT] Job {job['id']} {job['status']}: {job['saved']} saved, "
+            f"{job['weak']} weak, {job['failed']} failed in {progress(job)['elapsed_seconds']}s"
+        )
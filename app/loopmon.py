@@ -0,0 +1,151 @@
+import asyncio
+import os
+import sys
+import threading
+import time
+import traceback
+
+from app.metrics import Counter, Gauge, Histogram, current_route
+
+# Event-loop lag monitor and blocking-call detector.
+#
+# A heartbeat task sleeps LOOP_LAG_INTERVAL_MS at a time and records how late
+# it woke up — the time every other coroutine waited too — as
+# event_loop_lag_seconds. A watchdog thread watches the heartbeat: when it is
+# more than LOOP_BLOCK_THRESHOLD_MS overdue, something synchronous is holding
+# the loop (a sqlite3 / psycopg2 query, a Gemini SDK call, bcrypt, a big
+# BeautifulSoup parse, time.sleep), so it logs the loop thread's stack at that
+# moment — the blocking call itself — once per stall, with the route whose
+# task was running.
+#
+# LOOP_DEBUG_SLOW_MS > 0 turns on debug mode: every callback / coroutine step
+# the loop runs is timed, and any step over that many ms is logged with its
+# route and coroutine. It wraps asyncio's Handle._run, so it costs a couple of
+# perf_counter() calls per step — for staging and local runs, not production —
+# and only works on the stock asyncio loop (run uvicorn with --loop asyncio).
+
+LOOP_MONITOR_ENABLED = os.getenv("LOOP_MONITOR_ENABLED", "1") == "1"
+LOOP_LAG_INTERVAL_MS = float(os.getenv("LOOP_LAG_INTERVAL_MS", "250"))
+LOOP_BLOCK_THRESHOLD_MS = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "300"))
+LOOP_DEBUG_SLOW_MS = float(os.getenv("LOOP_DEBUG_SLOW_MS", "0"))
+# Innermost frames of the blocking stack to log
+LOOP_STACK_DEPTH = int(os.getenv("LOOP_STACK_DEPTH", "15"))
+
+LOOP_LAG_SECONDS = Histogram(
+    "event_loop_lag_seconds",
+    "How late the event-loop heartbeat woke up — time every ready coroutine had to wait",
+)
+LOOP_LAG_LAST = Gauge("event_loop_lag_last_seconds", "Event-loop lag at the most recent heartbeat")
+LOOP_BLOCKED_TOTAL = Counter(
+    "event_loop_blocked_total",
+    "Stalls past LOOP_BLOCK_THRESHOLD_MS, by the route whose task held the loop",
+    ("route",),
+)
+LOOP_SLOW_STEPS_TOTAL = Counter(
+    "event_loop_slow_steps_total",
+    "Coroutine steps over LOOP_DEBUG_SLOW_MS (debug mode only), by route",
+    ("route",),
+)
+
+_task: asyncio.Task | None = None
+_last_beat = 0.0
+# Debug mode: when the step now running started (0 between steps), and the
+# loop thread's stack once the watchdog has seen it run past the threshold
+_step_started = 0.0
+_step_stack: str | None = None
+
+
+async def _heartbeat():
+    global _last_beat
+    interval = LOOP_LAG_INTERVAL_MS / 1000
+    while True:
+        expected = time.monotonic() + interval
+        await asyncio.sleep(interval)
+        _last_beat = time.monotonic()
+        lag = max(0.0, _last_beat - expected)
+        LOOP_LAG_SECONDS.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
+
+def _route_of(task) -> str:
+    if task is None:
+        return "-"
+    try:
+        return task.get_context().get(current_route, "-")
+    except Exception:
+        return "-"
+
+
+def _loop_stack(loop_thread_id: int) -> str:
+    frame = sys._current_frames().get(loop_thread_id)
+    return "".join(traceback.format_stack(frame, limit=LOOP_STACK_DEPTH)) if frame else "  (no frame)\n"
+
+
+def _watchdog(loop: asyncio.AbstractEventLoop, loop_thread_id: int, debug: bool):
+    """Runs in its own thread; reads the loop's state without touching the loop."""
+    global _step_stack
+    interval = LOOP_LAG_INTERVAL_MS / 1000
+    threshold = LOOP_BLOCK_THRESHOLD_MS / 1000
+    poll = min(threshold / 2, 0.1, LOOP_DEBUG_SLOW_MS / 2000 if debug else 0.1)
+    reported = None
+    while True:
+        time.sleep(poll)
+        if debug:
+            started = _step_started
+            if started and _step_stack is None and time.perf_counter() - started > LOOP_DEBUG_SLOW_MS / 1000:
+                _step_stack = _loop_stack(loop_thread_id)
+        beat = _last_beat
+        stalled = time.monotonic() - beat - interval
+        if stalled < threshold or beat == reported:
+            continue
+        reported = beat
+        stack = _step_stack if debug and _step_stack else _loop_stack(loop_thread_id)
+        route = _route_of(asyncio.current_task(loop))
+        LOOP_BLOCKED_TOTAL.inc(route)
+        print(
+            f"[LOOPMON] Event loop blocked for {stalled * 1000:.0f}+ ms (route {route}); "
+            f"blocking call:\n{stack.rstrip()}"
+        )
+
+
+def _enable_slow_step_log(threshold_ms: float):
+    threshold = threshold_ms / 1000
+    run = asyncio.events.Handle._run
+
+    def _timed_run(self):
+        global _step_started, _step_stack
+        _step_stack = None
+        started = _step_started = time.perf_counter()
+        try:
+            run(self)
+        finally:
+            _step_started = 0.0
+        elapsed = time.perf_counter() - started
+        if elapsed >= threshold:
+            route = self._context.get(current_route, "-") if self._context is not None else "-"
+            LOOP_SLOW_STEPS_TOTAL.inc(route)
+            where = f"; stack while running:\n{_step_stack.rstrip()}" if _step_stack else f" — {self._callback!r}"
+            print(f"[LOOPMON] Slow step: {elapsed * 1000:.0f} ms in route {route}{where}")
+
+    asyncio.events.Handle._run = _timed_run
+
+
+def start():
+    """Start the heartbeat and watchdog for the running loop (no-op if already running)."""
+    global _task, _last_beat
+    if _task is not None or not LOOP_MONITOR_ENABLED:
+        return
+    loop = asyncio.get_running_loop()
+    _last_beat = time.monotonic()
+    _task = loop.create_task(_heartbeat())
+    debug = LOOP_DEBUG_SLOW_MS > 0
+    if debug:
+        if isinstance(loop, asyncio.BaseEventLoop):
+            _enable_slow_step_log(LOOP_DEBUG_SLOW_MS)
+            print(f"[LOOPMON] Debug mode: logging coroutine steps over {LOOP_DEBUG_SLOW_MS:.0f} ms")
+        else:
+            debug = False
+            print("[LOOPMON] Debug mode needs the stock asyncio loop (uvicorn --loop asyncio); skipped")
+    threading.Thread(
+        target=_watchdog, args=(loop, threading.get_ident(), debug), name="loopmon-watchdog", daemon=True
+    ).start()
@@ -1,26 +1,98 @@
+import asyncio
+import time
+
 from fastapi import FastAPI, Request
-from fastapi.responses import RedirectResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
+from fastapi.responses import RedirectResponse, JSONResponse, PlainTextResponse
+from starlette.routing import Match
 from app.database import init_db
+from app.assets import AssetFiles, build_if_stale
+from app.compression import CompressionMiddleware
+from app import admission, loopmon, refresher, idempotency, tags, textstore
+from app.scrapers import fetch, strategy
+from app import metrics
 from app.routes import auth, dashboard, webhook
-from app.routes import chat
+from app.routes import chat, thumbs, imports
 
 app = FastAPI(title="Social Saver Bot")
 
-# Mount static files
-app.mount("/static", StaticFiles(directory="app/static"), name="static")
+# Mount static files — fingerprinted + precompressed under /static/dist (see app.assets)
+app.mount("/static", AssetFiles(directory="app/static"), name="static")
+
+# gzip / brotli for HTML and JSON bodies; streamed responses pass through
+app.add_middleware(CompressionMiddleware)
 
 # Include routers
 app.include_router(auth.router)
 app.include_router(dashboard.router)
 app.include_router(webhook.router)
 app.include_router(chat.router)
+app.include_router(thumbs.router)
+app.include_router(imports.router)
+
+
+def _route_template(scope) -> str:
+    """Resolve the matching route's path template so metrics don't explode on /links/123 etc."""
+    for route in app.router.routes:
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            return getattr(route, "path", "-")
+    return "unmatched"
+
+
+class _RequestMetricsMiddleware:
+    """Pure ASGI, so the clock stops at the final response body — the end of
+    the stream for StreamingResponse, not when headers go out — and the handler
+    runs in this task, with current_route set, rather than in a copy."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+        route = _route_template(scope)
+        token = metrics.current_route.set(route)
+        started = time.perf_counter()
+        finished = None
+        status = 500
+
+        async def send_wrapper(message):
+            nonlocal finished, status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+            if message["type"] == "http.response.body" and not message.get("more_body", False):
+                finished = time.perf_counter()      # background tasks run after this
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            metrics.HTTP_REQUEST_SECONDS.observe(
+                (finished or time.perf_counter()) - started, route, scope["method"], str(status)
+            )
+            metrics.current_route.reset(token)
+
+
+app.add_middleware(_RequestMetricsMiddleware)
 
 
 @app.on_event("startup")
-def startup():
-    """Initialize database on app startup."""
-    init_db()
+async def startup():
+    """Initialize database and start background jobs on app startup."""
+    loopmon.start()
+    await asyncio.to_thread(init_db)
+    try:
+        if build_if_stale():
+            print("[ASSETS] Rebuilt fingerprinted static assets")
+    except OSError as e:
+        # Read-only filesystem etc. — templates fall back to the plain /static files
+        print(f"[ASSETS] Build skipped: {e}")
+    refresher.start_refresher()
+    idempotency.start_sweeper()
+    textstore.start_backfill()
+    tags.start_backfill()
+    admission.start_worker()
 
 
 @app.get("/health")
@@ -29,6 +101,55 @@ async def health():
     return JSONResponse({"status": "ok"})
 
 
+def _not_found():
+    return PlainTextResponse("Not found", status_code=404)
+
+
+def _operator(request: Request) -> bool:
+    """Operational endpoints below share /metrics' access rule (see app.metrics)."""
+    return metrics.scrape_allowed(request.headers.get("authorization", ""))
+
+
+@app.get("/health/refresh")
+async def health_refresh(request: Request):
+    """Throughput and backlog of the background metadata refresher."""
+    if not _operator(request):
+        return _not_found()
+    return JSONResponse({"enabled": refresher.REFRESH_ENABLED, **refresher.stats})
+
+
+@app.get("/health/outbound")
+async def health_outbound(request: Request):
+    """Per-host queue wait, in-flight and throttling counters for outbound scrapes."""
+    if not _operator(request):
+        return _not_found()
+    return JSONResponse(fetch.host_stats())
+
+
+@app.get("/health/scrapers")
+async def health_scrapers(request: Request):
+    """Per-host success rate and latency of each scrape strategy, and the order they're tried in."""
+    if not _operator(request):
+        return _not_found()
+    return JSONResponse(strategy.snapshot())
+
+
+@app.get("/health/admission")
+async def health_admission(request: Request):
+    """Save pipeline slots in use, saves queued for one, and saves deferred to the background worker."""
+    if not _operator(request):
+        return _not_found()
+    return JSONResponse(admission.snapshot())
+
+
+@app.get("/metrics")
+async def metrics_endpoint(request: Request):
+    """Prometheus text exposition of all in-process metrics (see app.metrics for access)."""
+    if not _operator(request):
+        return _not_found()
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 @app.get("/")
 async def root(request: Request):
     """Redirect to dashboard if logged in, else to login."""
@@ -0,0 +1,233 @@
+# In-process metrics with Prometheus text exposition — no client library or
+# external service needed; GET /metrics renders everything registered here.
+#
+# Recording is a dict lookup plus a bisect, with no locks: the app runs on one
+# event loop, and the odd lost increment from a worker thread is acceptable
+# for monitoring data.
+#
+# /metrics is not public by default, and neither are the /health/* detail
+# endpoints (plain /health stays open for uptime checks). Set METRICS_TOKEN and
+# have the scraper send "Authorization: Bearer <token>" (Prometheus'
+# bearer_token), or set METRICS_PUBLIC=1 for a deployment where they aren't
+# reachable from outside anyway (local runs, a private network).
+
+import contextvars
+import hmac
+import os
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+from dotenv import load_dotenv
+
+from app.tracing import add_span
+
+load_dotenv()
+
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_PUBLIC = os.getenv("METRICS_PUBLIC", "0") == "1"
+
+# Route template of the request being handled (e.g. "/links/{link_id}"), set by
+# the middleware in app.main so DB timings can be attributed per route.
+current_route: contextvars.ContextVar[str] = contextvars.ContextVar("current_route", default="-")
+
+_REGISTRY: list = []
+
+# Latency buckets (seconds) tuned for this app: sub-ms DB calls up to 20s+ scrapes
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30)
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(names: tuple, values: tuple, extra: str = "") -> str:
+    parts = [f'{n}="{_escape(v)}"' for n, v in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return "{" + ",".join(parts) + "}" if parts else ""
+
+
+def _fmt_value(v: float) -> str:
+    if v == float("inf"):
+        return "+Inf"
+    return repr(float(v)) if isinstance(v, float) else str(v)
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = ()):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self._values: dict[tuple, float] = {}
+        _REGISTRY.append(self)
+
+    def inc(self, *labels, amount: float = 1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def collect(self) -> list[str]:
+        return [
+            f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}"
+            for k, v in sorted(self._values.items())
+        ]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels):
+        self._values[labels] = value
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name: str, help: str, labelnames: tuple = (), buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.buckets = tuple(sorted(buckets))
+        # labels → [per-bucket counts..., +Inf count, sum]
+        self._series: dict[tuple, list] = {}
+        _REGISTRY.append(self)
+
+    def observe(self, value: float, *labels):
+        series = self._series.get(labels)
+        if series is None:
+            series = self._series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+        series[bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def collect(self) -> list[str]:
+        lines = []
+        for labels, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series[:-1]):
+                cumulative += count
+                le = f'le="{_fmt_value(float(bound)) if bound != float("inf") else "+Inf"}"'
+                lines.append(f"{self.name}_bucket{_fmt_labels(self.labelnames, labels, le)} {cumulative}")
+            lines.append(f"{self.name}_sum{_fmt_labels(self.labelnames, labels)} {_fmt_value(series[-1])}")
+            lines.append(f"{self.name}_count{_fmt_labels(self.labelnames, labels)} {cumulative}")
+        return lines
+
+
+class CallbackMetric:
+    """A gauge or counter whose values are read from existing state at scrape time.
+    `fn` returns an iterable of (label_values_tuple, value)."""
+
+    def __init__(self, name: str, help: str, labelnames: tuple, fn, kind: str = "gauge"):
+        self.name = name
+        self.help = help
+        self.labelnames = labelnames
+        self.kind = kind
+        self._fn = fn
+        _REGISTRY.append(self)
+
+    def collect(self) -> list[str]:
+        try:
+            items = list(self._fn())
+        except Exception as e:
+            print(f"[METRICS] Collector {self.name} failed: {e}")
+            return []
+        return [f"{self.name}{_fmt_labels(self.labelnames, k)} {_fmt_value(v)}" for k, v in items]
+
+
+def scrape_allowed(authorization: str) -> bool:
+    """Whether a request with this Authorization header may read /metrics and /health/*."""
+    if METRICS_TOKEN:
+        return hmac.compare_digest(authorization.encode(), f"Bearer {METRICS_TOKEN}".encode())
+    return METRICS_PUBLIC
+
+
+def render() -> str:
+    """Render every registered metric in Prometheus text exposition format (0.0.4)."""
+    out = []
+    for metric in _REGISTRY:
+        out.append(f"# HELP {metric.name} {metric.help}")
+        out.append(f"# TYPE {metric.name} {metric.kind}")
+        out.extend(metric.collect())
+    return "\n".join(out) + "\n"
+
+
+# ── Metric definitions ─────────────────────────────────────────────────────
+
+HTTP_REQUEST_SECONDS = Histogram(
+    "http_request_duration_seconds",
+    "End-to-end request latency per route (includes the WhatsApp webhook)",
+    ("route", "method", "status"),
+)
+SCRAPE_SECONDS = Histogram(
+    "scrape_duration_seconds",
+    "Latency of each scrape strategy attempt",
+    ("platform", "strategy"),
+)
+SCRAPE_TOTAL = Counter(
+    "scrape_attempts_total",
+    "Scrape strategy attempts by outcome (text, empty, error, not_modified, deadline, cancelled)",
+    ("platform", "strategy", "outcome"),
+)
+LLM_SECONDS = Histogram(
+    "llm_request_duration_seconds",
+    "Latency of LLM classification calls",
+    ("provider", "model", "outcome"),
+)
+LLM_BATCH_SIZE = Histogram(
+    "llm_batch_size",
+    "Texts per micro-batched classification request",
+    (),
+    buckets=(1, 2, 4, 8, 16, 32),
+)
+DB_QUERY_SECONDS = Histogram(
+    "db_query_duration_seconds",
+    "Database execute() latency, attributed to the route that issued it",
+    ("route",),
+)
+SAVES_TOTAL = Counter(
+    "save_outcomes_total",
+    "Result of each incoming save message; mcq / (saved + mcq) is the MCQ fallback rate",
+    ("channel", "outcome"),
+)
+CACHE_TOTAL = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit / miss)",
+    ("cache", "result"),
+)
+OUTBOUND_WAIT_SECONDS = Histogram(
+    "outbound_queue_wait_seconds",
+    "Time outbound requests spent queued in the per-host scheduler",
+    ("host",),
+)
+
+
+def record_scrape(platform: str, strategy: str, started: float, outcome: str):
+    """Record one strategy attempt that began at perf_counter() value `started`
+    (metrics, plus a span on the current request trace)."""
+    elapsed = time.perf_counter() - started
+    SCRAPE_SECONDS.observe(elapsed, platform, strategy)
+    SCRAPE_TOTAL.inc(platform, strategy, outcome)
+    add_span(f"{platform}_{strategy}", started, elapsed)
+
+
+def _mcq_fallback_ratio():
+    channels = {channel for channel, _ in SAVES_TOTAL._values}
+    for channel in sorted(channels):
+        mcq = SAVES_TOTAL._values.get((channel, "mcq"), 0)
+        saved = SAVES_TOTAL._values.get((channel, "saved"), 0)
+        if mcq + saved:
+            yield (channel,), mcq / (mcq + saved)
+
+
+CallbackMetric(
+    "mcq_fallback_ratio", "Share of scraped links that fell back to the MCQ prompt", ("channel",),
+    _mcq_fallback_ratio,
+)
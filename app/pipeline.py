@@ -0,0 +1,174 @@
+import asyncio
+
+from app import deadline, refresher, stats, suggest, tags as tag_index, textstore
+from app.database import get_db
+from app.scrapers import scrape_url
+from app.ai import categorize_and_summarize, classify_batched, try_keyword_fallback
+from app.metrics import Counter
+
+# Shared save pipeline for the webhook and chat routes.
+#
+# When a link goes viral, many users send the same URL within seconds. scrape()
+# and classify() are single-flight per normalized URL: the first caller starts
+# the work in a task, and everyone who asks for the same URL while it is running
+# awaits that same task instead of hitting the platform and the LLM again.
+# The task runs under its leader's deadline; a follower with a tighter one (a
+# live save joining a bulk import's scrape) stops waiting when its own budget
+# runs out and falls back to an empty scrape / keyword classification.
+#
+# insert_link() is the authoritative duplicate check — a single
+# INSERT ... ON CONFLICT DO NOTHING on the (user_id, original_url) unique index,
+# so a double-tapped send can't race past a SELECT and insert twice.
+# None of these hold a DB connection across an await.
+
+SINGLEFLIGHT_TOTAL = Counter(
+    "singleflight_requests_total",
+    "Scrape / classify calls by whether they started the work (leader) or joined one in flight (follower)",
+    ("operation", "role"),
+)
+
+# SQLite's default limit on bound parameters is 999; stay well under it
+_IN_CHUNK = 900
+
+_inflight: dict[tuple, asyncio.Future] = {}
+
+
+async def _single_flight(key: tuple, factory):
+    """Run factory() once per key at a time; concurrent callers share its result."""
+    task = _inflight.get(key)
+    if task is None:
+        SINGLEFLIGHT_TOTAL.inc(key[0], "leader")
+        task = asyncio.ensure_future(factory())
+        _inflight[key] = task
+        task.add_done_callback(lambda t: _inflight.pop(key, None) if _inflight.get(key) is t else None)
+        # shield: one caller timing out or disconnecting must not cancel the others' work
+        return await asyncio.shield(task)
+    SINGLEFLIGHT_TOTAL.inc(key[0], "follower")
+    # The task runs under the leader's deadline, which may be later than ours
+    return await asyncio.wait_for(asyncio.shield(task), deadline.remaining())
+
+
+async def scrape(url: str, platform: str) -> dict:
+    """scrape_url(), shared between concurrent requests for the same URL."""
+    try:
+        return await _single_flight(("scrape", url), lambda: scrape_url(url, platform))
+    except TimeoutError:
+        print(f"[PIPELINE] Out of time waiting on a shared scrape of {url}")
+        return {"text": "", "thumbnail_url": None}
+
+
+async def classify(url: str, text: str, batched: bool = False) -> dict:
+    """categorize_and_summarize(), shared between concurrent requests for the same URL.
+    `batched` routes it through the LLM micro-batcher (bulk work that can wait a moment)."""
+    classify_fn = classify_batched if batched else categorize_and_summarize
+    try:
+        return await _single_flight(("classify", url), lambda: classify_fn(text))
+    except TimeoutError:
+        print(f"[PIPELINE] Out of time waiting on a shared classification of {url}")
+        return await try_keyword_fallback(text)
+
+
+def is_saved(user_id: int, url: str) -> bool:
+    """Cheap pre-check so a re-sent link skips the scrape. insert_link() still
+    decides for real."""
+    conn = get_db(readonly=True)
+    existing = conn.execute(
+        "SELECT id FROM saved_links WHERE user_id = ? AND original_url = ?",
+        (user_id, url),
+    ).fetchone()
+    conn.close()
+    return existing is not None
+
+
+def insert_link(
+    user_id: int,
+    url: str,
+    platform: str,
+    extracted_text: str,
+    summary: str,
+    category: str,
+    thumbnail_url: str | None,
+    tags: str,
+    etag: str | None = None,
+    last_modified: str | None = None,
+) -> bool:
+    """Insert a saved link. Returns False if the user already has this URL."""
+    conn = get_db()
+    row = conn.execute(
+        """INSERT INTO saved_links
+           (user_id, original_url, platform, display_text, ai_summary, category, thumbnail_url, tags,
+            etag, last_modified, next_refresh_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT (user_id, original_url) DO NOTHING
+           RETURNING id""",
+        (user_id, url, platform, textstore.display_text(extracted_text), summary, category,
+         thumbnail_url, tags, etag, last_modified, refresher.next_refresh_at(summary)),
+    ).fetchone()
+    inserted = row is not None
+    if inserted:
+        textstore.save(conn, row["id"], extracted_text)
+        tag_index.add(conn, user_id, row["id"], tags)
+        stats.record_insert(conn, user_id, category, platform)
+    conn.commit()
+    conn.close()
+    if inserted:
+        suggest.invalidate(user_id)
+    return inserted
+
+
+def _ids_for(conn, user_id: int, urls: list[str]) -> dict[str, int]:
+    """{url: id} for those of `urls` the user has saved."""
+    ids: dict[str, int] = {}
+    for i in range(0, len(urls), _IN_CHUNK):
+        chunk = urls[i:i + _IN_CHUNK]
+        rows = conn.execute(
+            f"SELECT id, original_url FROM saved_links WHERE user_id = ? "
+            f"AND original_url IN ({', '.join('?' * len(chunk))})",
+            [user_id] + chunk,
+        ).fetchall()
+        ids.update({r["original_url"]: r["id"] for r in rows})
+    return ids
+
+
+def insert_links(user_id: int, links: list[dict]) -> int:
+    """Batched insert_link() for bulk imports — one executemany per call.
+    Each dict has the insert_link() fields. Returns how many rows were new."""
+    if not links:
+        return 0
+    conn = get_db()
+    by_url = {l["url"]: l for l in links}
+    # executemany can't RETURNING — look up what exists before and after instead
+    existing = _ids_for(conn, user_id, list(by_url))
+    fresh = [l for url, l in by_url.items() if url not in existing]
+    if not fresh:
+        conn.close()
+        return 0
+    cur = conn.executemany(
+        """INSERT INTO saved_links
+           (user_id, original_url, platform, display_text, ai_summary, category, thumbnail_url, tags,
+            etag, last_modified, next_refresh_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+           ON CONFLICT (user_id, original_url) DO NOTHING""",
+        [
+            (user_id, l["url"], l["platform"], textstore.display_text(l["extracted_text"]), l["summary"],
+             l["category"], l.get("thumbnail_url"), l.get("tags", ""), l.get("etag"), l.get("last_modified"),
+             refresher.next_refresh_at(l["summary"]))
+            for l in fresh
+        ],
+    )
+    inserted = cur.rowcount
+    ids = _ids_for(conn, user_id, [l["url"] for l in fresh])
+    textstore.save_new(conn, {ids[l["url"]]: l["extracted_text"] for l in fresh})
+    for l in fresh:
+        tag_index.add(conn, user_id, ids[l["url"]], l.get("tags", ""))
+    if inserted == len(fresh):
+        for l in fresh:
+            stats.record_insert(conn, user_id, l["category"], l["platform"])
+    conn.commit()
+    conn.close()
+    if inserted != len(fresh):
+        # A concurrent save won the race for some of these URLs — recount this user
+        stats.rebuild(user_id)
+    if inserted:
+        suggest.invalidate(user_id)
+    return inserted
@@ -0,0 +1,254 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from urllib.parse import urlparse
+
+from dotenv import load_dotenv
+
+from app import stats as link_stats, suggest, tags as tag_index, textstore
+from app.database import get_db, sql_timestamp
+from app.scrapers import scrape_url, fetch
+from app.ai import classify_batched
+from app.metrics import CallbackMetric
+from app.session_store import is_weak_text
+from app.thumbnails import prefetch
+
+load_dotenv()
+
+# Background re-scrape of saved links.
+#
+# Every row carries next_refresh_at, set whenever it is saved or refreshed:
+#   - MCQ-categorized rows ("User-categorized as X.") that never got a real
+#     summary are due again after REFRESH_WEAK_RETRY_HOURS
+#   - everything else after REFRESH_STALE_DAYS
+# A batch is the earliest-due rows, read straight off the next_refresh_at
+# index; weak rows fall due within hours, so they come round far more often.
+# Changing either interval applies to rows as they are next saved or refreshed.
+# Requests go through the per-host outbound scheduler at background priority.
+# Each fetch sends the ETag / Last-Modified stored from the previous one, so an
+# unchanged page costs a 304 and a single UPDATE. The LLM only runs again when
+# the scraped text actually differs from what is stored.
+
+REFRESH_ENABLED = os.getenv("REFRESH_ENABLED", "1") == "1"
+REFRESH_INTERVAL_SECONDS = int(os.getenv("REFRESH_INTERVAL_SECONDS", "300"))
+REFRESH_BATCH_SIZE = int(os.getenv("REFRESH_BATCH_SIZE", "20"))
+REFRESH_STALE_DAYS = int(os.getenv("REFRESH_STALE_DAYS", "7"))
+REFRESH_WEAK_RETRY_HOURS = int(os.getenv("REFRESH_WEAK_RETRY_HOURS", "6"))
+# The backlog gauge is recounted this often and decremented per batch in between
+REFRESH_BACKLOG_COUNT_SECONDS = int(os.getenv("REFRESH_BACKLOG_COUNT_SECONDS", "600"))
+
+_WEAK_PREFIX = "User-categorized as "
+
+# Exposed via /health/refresh
+stats = {
+    "runs": 0,
+    "checked": 0,
+    "not_modified": 0,
+    "unchanged": 0,
+    "reclassified": 0,
+    "errors": 0,
+    "backlog": 0,
+    "last_run_at": None,
+    "last_run_seconds": 0.0,
+    "last_run_rows_per_second": 0.0,
+}
+
+_task: asyncio.Task | None = None
+_backlog_counted_at: float | None = None
+
+CallbackMetric(
+    "refresher_links_total", "Links re-checked by the background refresher, by outcome", ("outcome",),
+    lambda: (((k,), stats[k]) for k in ("not_modified", "unchanged", "reclassified", "errors")),
+    kind="counter",
+)
+CallbackMetric(
+    "refresher_backlog", "Rows currently due for a refresh", (),
+    lambda: [((), stats["backlog"])],
+)
+
+
+def next_refresh_at(summary: str | None, now: datetime | None = None) -> str:
+    """When a link with this summary is next due for a refresh (SQL timestamp)."""
+    now = now or datetime.now(timezone.utc)
+    if (summary or "").startswith(_WEAK_PREFIX):
+        return sql_timestamp(now + timedelta(hours=REFRESH_WEAK_RETRY_HOURS))
+    return sql_timestamp(now + timedelta(days=REFRESH_STALE_DAYS))
+
+
+def _load_batch() -> list[dict]:
+    global _backlog_counted_at
+    now = sql_timestamp(datetime.now(timezone.utc))
+    conn = get_db(readonly=True)
+    rows = conn.execute(
+        """SELECT id, user_id, original_url, platform, ai_summary, category,
+                  thumbnail_url, etag, last_modified
+           FROM saved_links
+           WHERE next_refresh_at <= ?
+           ORDER BY next_refresh_at
+           LIMIT ?""",
+        (now, REFRESH_BATCH_SIZE),
+    ).fetchall()
+    if _backlog_counted_at is None or time.monotonic() - _backlog_counted_at >= REFRESH_BACKLOG_COUNT_SECONDS:
+        stats["backlog"] = conn.execute(
+            "SELECT COUNT(*) AS n FROM saved_links WHERE next_refresh_at <= ?", (now,)
+        ).fetchone()["n"]
+        _backlog_counted_at = time.monotonic()
+    conn.close()
+    return [dict(r) for r in rows]
+
+
+def _mark_refreshed(row: dict):
+    now = datetime.now(timezone.utc)
+    conn = get_db()
+    conn.execute(
+        "UPDATE saved_links SET refreshed_at = ?, next_refresh_at = ? WHERE id = ?",
+        (sql_timestamp(now), next_refresh_at(row["ai_summary"], now), row["id"]),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _write_unchanged(row: dict, thumbnail_url, etag, last_modified, now: datetime):
+    conn = get_db()
+    conn.execute(
+        """UPDATE saved_links
+           SET thumbnail_url = ?, etag = ?, last_modified = ?, refreshed_at = ?, next_refresh_at = ?
+           WHERE id = ?""",
+        (thumbnail_url, etag, last_modified, sql_timestamp(now),
+         next_refresh_at(row["ai_summary"], now), row["id"]),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _write_reclassified(row: dict, text: str, ai_result: dict, category: str,
+                        thumbnail_url, etag, last_modified, now: datetime):
+    conn = get_db()
+    conn.execute(
+        """UPDATE saved_links
+           SET display_text = ?, extracted_text = NULL, ai_summary = ?, category = ?, tags = ?,
+               thumbnail_url = ?, etag = ?, last_modified = ?, refreshed_at = ?, next_refresh_at = ?
+           WHERE id = ?""",
+        (
+            textstore.display_text(text),
+            ai_result["summary"],
+            category,
+            ai_result.get("tags", ""),
+            thumbnail_url,
+            etag,
+            last_modified,
+            sql_timestamp(now),
+            next_refresh_at(ai_result["summary"], now),
+            row["id"],
+        ),
+    )
+    textstore.save(conn, row["id"], text)
+    tag_index.replace(conn, row["user_id"], row["id"], ai_result.get("tags", ""))
+    link_stats.record_recategorize(conn, row["user_id"], row["category"], category)
+    conn.commit()
+    conn.close()
+
+
+async def refresh_link(row: dict) -> str:
+    """Re-scrape one row and write back whatever changed. Returns the outcome name."""
+    scraped = await scrape_url(
+        row["original_url"],
+        row["platform"],
+        validators={"etag": row.get("etag"), "last_modified": row.get("last_modified")},
+    )
+    if scraped.get("not_modified"):
+        await asyncio.to_thread(_mark_refreshed, row)
+        return "not_modified"
+
+    now = datetime.now(timezone.utc)
+
+    text = scraped.get("text", "")
+    thumbnail_url = scraped.get("thumbnail_url") or row["thumbnail_url"]
+    etag = scraped.get("etag") or row.get("etag")
+    last_modified = scraped.get("last_modified") or row.get("last_modified")
+
+    # The stored text is only loaded when there is a new one to compare it with
+    if is_weak_text(text) or text.strip() == textstore.load(row["id"]).strip():
+        await asyncio.to_thread(_write_unchanged, row, thumbnail_url, etag, last_modified, now)
+        if thumbnail_url != row["thumbnail_url"]:
+            prefetch(thumbnail_url)
+        return "unchanged"
+
+    ai_result = await classify_batched(text)
+
+    # An MCQ answer is the user's own choice — keep their category, fill in the rest
+    category = ai_result["category"]
+    if (row["ai_summary"] or "").startswith(_WEAK_PREFIX):
+        category = row["category"]
+
+    await asyncio.to_thread(
+        _write_reclassified, row, text, ai_result, category, thumbnail_url, etag, last_modified, now
+    )
+    suggest.invalidate(row["user_id"])
+    if thumbnail_url != row["thumbnail_url"]:
+        prefetch(thumbnail_url)
+    return "reclassified"
+
+
+async def _refresh_host(rows: list[dict]):
+    """Refresh rows for one host sequentially; the outbound scheduler paces the requests."""
+    for row in rows:
+        try:
+            outcome = await refresh_link(row)
+        except Exception as e:
+            print(f"[REFRESH] Link {row['id']} failed: {e}")
+            stats["errors"] += 1
+            await asyncio.to_thread(_mark_refreshed, row)   # don't retry a broken row every batch
+            continue
+        stats["checked"] += 1
+        stats[outcome] += 1
+
+
+async def run_once() -> int:
+    """Refresh one batch. Hosts are processed concurrently, each host serially."""
+    rows = _load_batch()
+    if not rows:
+        return 0
+
+    by_host: dict[str, list[dict]] = {}
+    for row in rows:
+        host = urlparse(row["original_url"]).netloc.lower()
+        by_host.setdefault(host, []).append(row)
+
+    start = time.monotonic()
+    # Background priority: interactive saves to the same host always go first
+    with fetch.priority(fetch.PRIORITY_BACKGROUND):
+        await asyncio.gather(*(_refresh_host(host_rows) for host_rows in by_host.values()))
+    elapsed = time.monotonic() - start
+
+    stats["runs"] += 1
+    stats["last_run_at"] = sql_timestamp(datetime.now(timezone.utc))
+    stats["last_run_seconds"] = round(elapsed, 3)
+    stats["last_run_rows_per_second"] = round(len(rows) / elapsed, 3) if elapsed else 0.0
+    stats["backlog"] = max(0, stats["backlog"] - len(rows))
+    print(
+        f"[REFRESH] Batch of {len(rows)} across {len(by_host)} hosts in {elapsed:.1f}s — "
+        f"backlog {stats['backlog']}"
+    )
+    return len(rows)
+
+
+async def _loop():
+    while True:
+        try:
+            processed = await run_once()
+        except Exception as e:
+            print(f"[REFRESH] Batch failed: {e}")
+            processed = 0
+        # Drain a backlog back-to-back; otherwise wait for the next interval
+        await asyncio.sleep(1 if processed >= REFRESH_BATCH_SIZE else REFRESH_INTERVAL_SECONDS)
+
+
+def start_refresher():
+    """Start the background refresh loop (no-op if disabled or already running)."""
+    global _task
+    if not REFRESH_ENABLED or _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_loop())
+    print("[REFRESH] Background refresher started")
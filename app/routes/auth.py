@@ -1,17 +1,17 @@
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import HTMLResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
 from itsdangerous import URLSafeSerializer
 from dotenv import load_dotenv
+import asyncio
 import bcrypt
 import os
 
 from app.database import get_db
+from app.templating import templates
 
 load_dotenv()
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 serializer = URLSafeSerializer(os.getenv("SECRET_KEY", "fallback-secret-key"))
 
 
@@ -22,7 +22,7 @@ def get_current_user(request: Request) -> dict | None:
         return None
     try:
         user_id = serializer.loads(session_token)
-        conn = get_db()
+        conn = get_db(readonly=True)
         user = conn.execute("SELECT * FROM users WHERE id = ?", (user_id,)).fetchone()
         conn.close()
         if user:
@@ -42,7 +42,7 @@ async def login_page(request: Request):
 
 @router.post("/login", response_class=HTMLResponse)
 async def login_submit(request: Request, whatsapp_number: str = Form(...), password: str = Form(...)):
-    conn = get_db()
+    conn = get_db(readonly=True)
     user = conn.execute("SELECT * FROM users WHERE whatsapp_number = ?", (whatsapp_number,)).fetchone()
     conn.close()
 
@@ -83,13 +83,27 @@ async def register_submit(request: Request, name: str = Form(...), whatsapp_numb
     if not whatsapp_number.startswith("+"):
         whatsapp_number = "+" + whatsapp_number
 
+    user_id = await asyncio.to_thread(_create_user, name, whatsapp_number, password)
+    if user_id is None:
+        return templates.TemplateResponse("register.html", {"request": request, "error": "This phone number is already registered."})
+
+    # Auto-login after registration
+    token = serializer.dumps(user_id)
+    response = RedirectResponse(url="/dashboard", status_code=302)
+    response.set_cookie(key="session", value=token, httponly=True, max_age=86400)
+    return response
+
+
+def _create_user(name: str, whatsapp_number: str, password: str) -> int | None:
+    """Blocking (bcrypt + the write connection): returns the new user's id, or
+    None if the number is already registered."""
     conn = get_db()
 
     # Check if number already exists
     existing = conn.execute("SELECT id FROM users WHERE whatsapp_number = ?", (whatsapp_number,)).fetchone()
     if existing:
         conn.close()
-        return templates.TemplateResponse("register.html", {"request": request, "error": "This phone number is already registered."})
+        return None
 
     # Hash password and create user
     password_hash = bcrypt.hashpw(password.encode("utf-8"), bcrypt.gensalt()).decode("utf-8")
@@ -99,12 +113,7 @@ async def register_submit(request: Request, name: str = Form(...), whatsapp_numb
     # Get the new user ID
     user = conn.execute("SELECT id FROM users WHERE whatsapp_number = ?", (whatsapp_number,)).fetchone()
     conn.close()
-
-    # Auto-login after registration
-    token = serializer.dumps(user["id"])
-    response = RedirectResponse(url="/dashboard", status_code=302)
-    response.set_cookie(key="session", value=token, httponly=True, max_age=86400)
-    return response
+    return user["id"]
 
 
 @router.get("/logout")
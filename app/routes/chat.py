@@ -1,12 +1,18 @@
+import asyncio
+import json
+
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, JSONResponse, RedirectResponse, StreamingResponse
 from pydantic import BaseModel
 
-from app.database import get_db
+from app import admission, deadline, pipeline
+from app.pipeline import insert_link, is_saved
 from app.routes.auth import get_current_user
-from app.scrapers import detect_platform, scrape_url, extract_url, normalize_url
-from app.ai import categorize_and_summarize
+from app.scrapers import detect_platform, extract_url, normalize_url
+from app.thumbnails import prefetch
+from app.metrics import SAVES_TOTAL
+from app.tracing import trace_request, span
+from app.templating import templates
 from app.session_store import (
     get_pending,
     get_mcq_message,
@@ -17,7 +23,6 @@ from app.session_store import (
 )
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 class ChatMessage(BaseModel):
@@ -39,15 +44,77 @@ async def chat_page(request: Request):
 
 @router.post("/chat/send")
 async def chat_send(request: Request, body: ChatMessage):
+    """Handle a chat message and return the outcome as one JSON object."""
+    with trace_request("chat_send") as trace:
+        with span("auth"):
+            user = get_current_user(request)
+        if not user:
+            return JSONResponse({"error": "Not authenticated"}, status_code=401)
+        result = None
+        with deadline.budget():
+            async for event in _handle_message(user, body):
+                if event["type"] == "result":
+                    result = event
+    response = JSONResponse(result["body"])
+    response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
+@router.post("/chat/send/stream")
+async def chat_send_stream(request: Request, body: ChatMessage):
+    """Same as /chat/send, but streamed as NDJSON: one {"type": "stage", ...} line
+    per finished step (detected, scraped, classifying, ...) and a final
+    {"type": "result", ...} line carrying the /chat/send payload."""
     user = get_current_user(request)
     if not user:
         return JSONResponse({"error": "Not authenticated"}, status_code=401)
 
+    # The save runs in its own task so a client that disconnects mid-stream
+    # doesn't abandon it halfway (e.g. after the scrape, before the insert).
+    queue: asyncio.Queue = asyncio.Queue()
+
+    async def run():
+        try:
+            with trace_request("chat_send_stream"), deadline.budget():
+                async for event in _handle_message(user, body):
+                    await queue.put(event)
+        finally:
+            await queue.put(None)
+
+    task = asyncio.create_task(run())
+
+    async def lines():
+        while (event := await queue.get()) is not None:
+            if event["type"] == "result":
+                event = {"type": "result", **event["body"]}
+            yield json.dumps(event) + "\n"
+        await asyncio.wait([task])
+        if task.exception():
+            print(f"[CHAT] Streamed save failed: {task.exception()}")
+            yield json.dumps({"type": "error", "error": "Something went wrong. Please try again."}) + "\n"
+
+    # no-transform / X-Accel-Buffering keep proxies from holding the lines back
+    return StreamingResponse(
+        lines(),
+        media_type="application/x-ndjson",
+        headers={"Cache-Control": "no-cache, no-transform", "X-Accel-Buffering": "no"},
+    )
+
+
+def _stage(stage: str, message: str) -> dict:
+    return {"type": "stage", "stage": stage, "message": message}
+
+
+def _result(body: dict) -> dict:
+    return {"type": "result", "body": body}
+
+
+async def _handle_message(user: dict, body: ChatMessage):
+    """Process one chat message, yielding stage events as work finishes and a
+    final result event."""
     key = _session_key(user["id"])
     incoming = body.message.strip()
 
-    conn = get_db()
-
     # ── MCQ reply flow ──────────────────────────────────────────────
     pending = get_pending(key)
     if pending:
@@ -55,108 +122,130 @@ async def chat_send(request: Request, body: ChatMessage):
         if incoming in mcq_opts:
             pending_data = resolve_pending(key)
             category = mcq_opts[incoming]
-            conn.execute(
-                """INSERT INTO saved_links
-                   (user_id, original_url, platform, extracted_text, ai_summary, category, thumbnail_url, tags)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    user["id"],
-                    pending_data["url"],
-                    pending_data["platform"],
-                    category,
-                    f"User-categorized as {category}.",
-                    category,
-                    pending_data["thumbnail_url"],
-                    category.lower(),
-                ),
+            await asyncio.to_thread(
+                insert_link,
+                user["id"],
+                pending_data["url"],
+                pending_data["platform"],
+                category,
+                f"User-categorized as {category}.",
+                category,
+                pending_data["thumbnail_url"],
+                category.lower(),
             )
-            conn.commit()
-            conn.close()
-            return JSONResponse({
+            prefetch(pending_data["thumbnail_url"])
+            SAVES_TOTAL.inc("chat", "mcq_resolved")
+            yield _result({
                 "reply": f"✅ Saved to your *{category}* collection!",
                 "mcq_options": None,
                 "saved": True,
                 "category": category,
                 "platform": pending_data["platform"],
             })
+            return
         else:
             if pending["retries"] < 1:
                 increment_retry(key)
                 n = len(mcq_opts)
                 opts_list = [{"key": k, "label": v} for k, v in mcq_opts.items()]
-                conn.close()
-                return JSONResponse({
+                SAVES_TOTAL.inc("chat", "mcq_retry")
+                yield _result({
                     "reply": f"Please pick one of the options below (1–{n}).",
                     "mcq_options": opts_list,
                     "saved": False,
                 })
+                return
             else:
                 resolve_pending(key)
-                conn.close()
-                return JSONResponse({
+                SAVES_TOTAL.inc("chat", "mcq_dropped")
+                yield _result({
                     "reply": "❌ Couldn't save that one. Try sending the link again.",
                     "mcq_options": None,
                     "saved": False,
                 })
+                return
 
     # ── New message — must contain a URL ────────────────────────────
     url = extract_url(incoming)
     if not url:
-        conn.close()
-        return JSONResponse({
+        SAVES_TOTAL.inc("chat", "no_url")
+        yield _result({
             "reply": "Please send a valid social media or article link. 🔗",
             "mcq_options": None,
             "saved": False,
         })
+        return
 
     url = normalize_url(url)
 
     # Duplicate check
-    existing = conn.execute(
-        "SELECT id FROM saved_links WHERE user_id = ? AND original_url = ?",
-        (user["id"], url),
-    ).fetchone()
+    with span("db_duplicate_check"):
+        existing = is_saved(user["id"], url)
     if existing:
-        conn.close()
-        return JSONResponse({
+        SAVES_TOTAL.inc("chat", "duplicate")
+        yield _result({
             "reply": "You've already saved this link! 📌",
             "mcq_options": None,
             "saved": False,
         })
+        return
 
     # Platform detect
     platform = detect_platform(url)
     if not platform:
-        conn.close()
-        return JSONResponse({
+        SAVES_TOTAL.inc("chat", "unknown_platform")
+        yield _result({
             "reply": "Couldn't identify this link. Send an Instagram, Twitter, YouTube, or blog URL.",
             "mcq_options": None,
             "saved": False,
         })
+        return
+    yield _stage("detected", f"Detected {platform} link")
+
+    # Scrape + classify hold one of the pipeline's admission slots. With none
+    # free in time the link is queued for the deferred worker instead.
+    try:
+        async with admission.slot(user["id"]):
+            # Scrape
+            yield _stage("scraping", f"Reading the {platform} post…")
+            with span("scrape"), deadline.reserve(deadline.LLM_RESERVE_SECONDS):
+                scraped = await pipeline.scrape(url, platform)
+            yield _stage("scraped", f"Scraped {len(scraped.get('text') or '')} chars")
 
-    # Scrape
-    scraped = await scrape_url(url, platform)
-
-    # Weak text → MCQ fallback
-    if is_weak_text(scraped.get("text", "")):
-        store_pending(key, url, scraped.get("thumbnail_url"), platform)
-        fresh_pending = get_pending(key)
-        opts_list = [{"key": k, "label": v} for k, v in fresh_pending["mcq_opts"].items()]
-        conn.close()
-        return JSONResponse({
-            "reply": "Couldn't read this post automatically. What's it about?",
-            "mcq_options": opts_list,
+            # Weak text → MCQ fallback
+            if is_weak_text(scraped.get("text", "")):
+                store_pending(key, url, scraped.get("thumbnail_url"), platform)
+                fresh_pending = get_pending(key)
+                opts_list = [{"key": k, "label": v} for k, v in fresh_pending["mcq_opts"].items()]
+                SAVES_TOTAL.inc("chat", "mcq")
+                yield _result({
+                    "reply": "Couldn't read this post automatically. What's it about?",
+                    "mcq_options": opts_list,
+                    "saved": False,
+                })
+                return
+
+            # AI categorize
+            yield _stage("classifying", "Classifying…")
+            with span("classify"):
+                ai_result = await pipeline.classify(url, scraped["text"])
+            yield _stage("classified", f"Looks like {ai_result['category']}")
+    except admission.Busy as e:
+        print(f"[CHAT] Pipeline busy ({e}), deferring {url}")
+        await admission.defer(user["id"], url, "chat")
+        SAVES_TOTAL.inc("chat", "deferred")
+        yield _result({
+            "reply": "⏳ We're a bit busy right now — this link will be saved shortly.",
+            "mcq_options": None,
             "saved": False,
+            "deferred": True,
         })
+        return
 
-    # AI categorize
-    ai_result = await categorize_and_summarize(scraped["text"])
-
-    conn.execute(
-        """INSERT INTO saved_links
-           (user_id, original_url, platform, extracted_text, ai_summary, category, thumbnail_url, tags)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-        (
+    yield _stage("saving", "Saving…")
+    with span("db_insert"):
+        inserted = await asyncio.to_thread(
+            insert_link,
             user["id"],
             url,
             platform,
@@ -165,12 +254,22 @@ async def chat_send(request: Request, body: ChatMessage):
             ai_result["category"],
             scraped.get("thumbnail_url"),
             ai_result.get("tags", ""),
-        ),
-    )
-    conn.commit()
-    conn.close()
+            etag=scraped.get("etag"),
+            last_modified=scraped.get("last_modified"),
+        )
+    if not inserted:
+        # Lost a race with another send of the same link (e.g. a double tap)
+        SAVES_TOTAL.inc("chat", "duplicate")
+        yield _result({
+            "reply": "You've already saved this link! 📌",
+            "mcq_options": None,
+            "saved": False,
+        })
+        return
+    prefetch(scraped.get("thumbnail_url"))
 
-    return JSONResponse({
+    SAVES_TOTAL.inc("chat", "saved")
+    yield _result({
         "reply": f"✅ Saved to your *{ai_result['category']}* collection!",
         "summary": ai_result.get("summary", ""),
         "category": ai_result.get("category", ""),
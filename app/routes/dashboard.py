@@ -1,12 +1,15 @@
+import asyncio
+from datetime import datetime
+
 from fastapi import APIRouter, Request
-from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse
-from fastapi.templating import Jinja2Templates
+from fastapi.responses import HTMLResponse, RedirectResponse, JSONResponse, StreamingResponse
 
+from app import export, stats, suggest, tags, textstore
 from app.database import get_db
 from app.routes.auth import get_current_user
+from app.templating import templates
 
 router = APIRouter()
-templates = Jinja2Templates(directory="app/templates")
 
 
 CATEGORIES = [
@@ -27,7 +30,7 @@ _SEARCH_COLS = [
     ("category",       4),   # exact semantic bucket
     ("platform",       3),   # lets "youtube" / "instagram" searches work
     ("ai_summary",     2),   # one-sentence AI description
-    ("extracted_text", 1),   # raw scraped text — lowest weight, most noise
+    ("display_text",   1),   # head of the raw scraped text — lowest weight, most noise
 ]
 
 
@@ -80,12 +83,12 @@ def _build_search_query(q: str, base_where: str, base_params: list) -> tuple[str
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
-async def dashboard(request: Request, q: str = "", cat: str = ""):
+async def dashboard(request: Request, q: str = "", cat: str = "", tag: str = ""):
     user = get_current_user(request)
     if not user:
         return RedirectResponse(url="/login", status_code=302)
 
-    conn = get_db()
+    conn = get_db(readonly=True)
 
     base_params: list = [user["id"]]
     base_where = "user_id = ?"
@@ -94,6 +97,12 @@ async def dashboard(request: Request, q: str = "", cat: str = ""):
         base_where += " AND LOWER(category) = LOWER(?)"
         base_params.append(cat)
 
+    tag = tag.strip().lower()
+    if tag:
+        # Exact match through the link_tags index, not a LIKE over the tags string
+        base_where += " AND id IN (SELECT link_id FROM link_tags WHERE user_id = ? AND tag = ?)"
+        base_params.extend([user["id"], tag])
+
     if q:
         sql, params = _build_search_query(q, base_where, base_params)
     else:
@@ -102,6 +111,7 @@ async def dashboard(request: Request, q: str = "", cat: str = ""):
 
     links = conn.execute(sql, params).fetchall()
     conn.close()
+    counts = stats.get_stats(user["id"])
 
     return templates.TemplateResponse("dashboard.html", {
         "request": request,
@@ -109,17 +119,48 @@ async def dashboard(request: Request, q: str = "", cat: str = ""):
         "links": [dict(l) for l in links],
         "search_query": q,
         "active_category": cat,
+        "active_tag": tag,
+        "tag_cloud": tags.tag_cloud(user["id"]),
         "categories": CATEGORIES,
+        "category_counts": counts["category"],
+        "total_links": counts["total"],
     })
 
 
+@router.get("/dashboard/stats")
+async def dashboard_stats(request: Request):
+    """Link counts per category, platform and month, read from the rollup table."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    return JSONResponse(stats.get_stats(user["id"]))
+
+
+@router.get("/dashboard/tags")
+async def dashboard_tags(request: Request, limit: int = tags.TAG_CLOUD_SIZE):
+    """The user's most-used tags with link counts, read from the rollup table."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    return JSONResponse(tags.tag_cloud(user["id"], max(1, min(limit, 500))))
+
+
+@router.get("/dashboard/suggest")
+async def dashboard_suggest(request: Request, q: str = "", limit: int = suggest.SUGGEST_LIMIT):
+    """Completions for the word being typed in the search box."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    return JSONResponse({"q": q, "suggestions": await suggest.suggest_async(user["id"], q, max(1, min(limit, 20)))})
+
+
 @router.get("/dashboard/random")
 async def random_link(request: Request):
     user = get_current_user(request)
     if not user:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
 
-    conn = get_db()
+    conn = get_db(readonly=True)
     link = conn.execute(
         "SELECT * FROM saved_links WHERE user_id = ? ORDER BY RANDOM() LIMIT 1",
         (user["id"],),
@@ -129,7 +170,52 @@ async def random_link(request: Request):
     if not link:
         return JSONResponse({"error": "No saved links yet"}, status_code=404)
 
-    return JSONResponse(dict(link))
+    link = dict(link)
+    link["extracted_text"] = textstore.load(link["id"])
+    return JSONResponse(link)
+
+
+@router.get("/links/export")
+async def export_links(request: Request, format: str = "csv"):
+    """Download the whole library as CSV, NDJSON or a browser bookmarks file, streamed."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+    if format not in export.FORMATS:
+        return JSONResponse(
+            {"error": f"Unknown format. Use one of: {', '.join(export.FORMATS)}"}, status_code=400
+        )
+
+    media_type, ext = export.FORMATS[format]
+    filename = f"social-saver-{datetime.now().strftime('%Y%m%d')}.{ext}"
+    # Sync generator: Starlette steps it in the threadpool, so DB reads don't block the loop
+    return StreamingResponse(
+        export.EXPORTERS[format](user["id"]),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@router.get("/links/{link_id}")
+async def link_detail(request: Request, link_id: int):
+    """One link with its full scraped text — the only read that decompresses it."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+
+    conn = get_db(readonly=True)
+    link = conn.execute(
+        "SELECT * FROM saved_links WHERE id = ? AND user_id = ?", (link_id, user["id"])
+    ).fetchone()
+    conn.close()
+
+    if not link:
+        return JSONResponse({"error": "Not found"}, status_code=404)
+
+    link = dict(link)
+    link["extracted_text"] = textstore.load(link_id)
+    link["saved_at"] = str(link["saved_at"])
+    return JSONResponse(link)
 
 
 @router.delete("/links/{link_id}")
@@ -138,10 +224,24 @@ async def delete_link(request: Request, link_id: int):
     if not user:
         return JSONResponse({"error": "Not logged in"}, status_code=401)
 
+    if await asyncio.to_thread(_delete_link, user["id"], link_id):
+        suggest.invalidate(user["id"])
+
+    return JSONResponse({"success": True})
+
+
+def _delete_link(user_id: int, link_id: int) -> bool:
+    """Blocking: delete the link if it belongs to the user. Returns whether it did."""
     conn = get_db()
     # Only delete if the link belongs to this user
-    conn.execute("DELETE FROM saved_links WHERE id = ? AND user_id = ?", (link_id, user["id"]))
+    link = conn.execute(
+        "SELECT category, platform, saved_at FROM saved_links WHERE id = ? AND user_id = ?",
+        (link_id, user_id),
+    ).fetchone()
+    if link:
+        tags.remove(conn, user_id, link_id)
+        conn.execute("DELETE FROM saved_links WHERE id = ? AND user_id = ?", (link_id, user_id))
+        stats.record_delete(conn, user_id, link["category"], link["platform"], link["saved_at"])
     conn.commit()
     conn.close()
-
-    return JSONResponse({"success": True})
+    return link is not None
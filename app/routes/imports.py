@@ -0,0 +1,41 @@
+from fastapi import APIRouter, Request, UploadFile, File
+from fastapi.responses import JSONResponse
+
+from app import importer
+from app.routes.auth import get_current_user
+
+router = APIRouter()
+
+
+@router.post("/import")
+async def start_import(request: Request, file: UploadFile = File(...)):
+    """Upload a bookmarks HTML file or a WhatsApp chat export; returns a job to poll."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+
+    raw = await file.read(importer.IMPORT_MAX_BYTES + 1)
+    if len(raw) > importer.IMPORT_MAX_BYTES:
+        return JSONResponse(
+            {"error": f"File too large (max {importer.IMPORT_MAX_BYTES // (1024 * 1024)} MB)"},
+            status_code=413,
+        )
+    content = raw.decode("utf-8", errors="replace")
+
+    job = importer.start_import(user["id"], content)
+    if not job["found"]:
+        return JSONResponse({"error": "No links found in that file"}, status_code=400)
+    return JSONResponse(importer.progress(job), status_code=202)
+
+
+@router.get("/import/{job_id}")
+async def import_progress(request: Request, job_id: str):
+    """Progress of an import job: processed / total, and saved / weak / failed counts."""
+    user = get_current_user(request)
+    if not user:
+        return JSONResponse({"error": "Not logged in"}, status_code=401)
+
+    job = importer.jobs.get(job_id)
+    if not job or job["user_id"] != user["id"]:
+        return JSONResponse({"error": "Import job not found"}, status_code=404)
+    return JSONResponse(importer.progress(job))
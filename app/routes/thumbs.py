@@ -0,0 +1,40 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+
+from app.database import get_db
+from app.routes.auth import get_current_user
+from app.thumbnails import get_variant, pick_width
+
+router = APIRouter()
+
+# Variants are content-addressed, so a given (link, width, format) only changes
+# when the link's thumbnail_url is replaced — a week of caching is safe.
+_CACHE_CONTROL = "private, max-age=604800, stale-while-revalidate=86400"
+
+
+@router.get("/thumb/{link_id}")
+async def thumbnail(request: Request, link_id: int, w: int = 0):
+    user = get_current_user(request)
+    if not user:
+        return Response(status_code=401)
+
+    conn = get_db(readonly=True)
+    link = conn.execute(
+        "SELECT thumbnail_url FROM saved_links WHERE id = ? AND user_id = ?",
+        (link_id, user["id"]),
+    ).fetchone()
+    conn.close()
+
+    if not link or not link["thumbnail_url"]:
+        return Response(status_code=404)
+
+    fmt = "webp" if "image/webp" in request.headers.get("accept", "") else "jpg"
+    variant = await get_variant(link["thumbnail_url"], pick_width(w), fmt)
+    if not variant:
+        return Response(status_code=404)
+
+    data, media_type, etag = variant
+    headers = {"Cache-Control": _CACHE_CONTROL, "ETag": etag, "Vary": "Accept"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=data, media_type=media_type, headers=headers)
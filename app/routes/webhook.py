@@ -1,11 +1,15 @@
+import asyncio
 import re
 from fastapi import APIRouter, Request, Form
 from fastapi.responses import PlainTextResponse
-from twilio.twiml.messaging_response import MessagingResponse
 
+from app import admission, deadline, idempotency, pipeline
 from app.database import get_db
-from app.scrapers import detect_platform, scrape_url, extract_url, normalize_url
-from app.ai import categorize_and_summarize
+from app.pipeline import insert_link, is_saved
+from app.scrapers import detect_platform, extract_url, normalize_url
+from app.thumbnails import prefetch
+from app.metrics import SAVES_TOTAL
+from app.tracing import trace_request, span
 from app.session_store import (
     get_pending,
     get_mcq_message,
@@ -20,6 +24,7 @@ router = APIRouter()
 
 def make_reply(message: str) -> str:
     """Create a TwiML response string."""
+    from twilio.twiml.messaging_response import MessagingResponse  # heavy; keep it off the boot path
     resp = MessagingResponse()
     resp.message(message)
     return str(resp)
@@ -27,7 +32,39 @@ def make_reply(message: str) -> str:
 
 @router.post("/webhook/whatsapp")
 async def whatsapp_webhook(request: Request):
-    """Handle incoming WhatsApp messages from Twilio."""
+    """Handle incoming WhatsApp messages from Twilio.
+
+    Deliveries are keyed by MessageSid: a Twilio retry of a message we already
+    handled gets the stored reply instead of a second scrape + LLM call."""
+    form_data = await request.form()
+    message_sid = form_data.get("MessageSid", "")
+
+    if message_sid and not await asyncio.to_thread(idempotency.claim, message_sid):
+        reply = await idempotency.wait_for_reply(message_sid)
+        if reply is not None:
+            print(f"[WEBHOOK] Repeat delivery of {message_sid}, replaying stored reply")
+            SAVES_TOTAL.inc("whatsapp", "redelivered")
+            return PlainTextResponse(reply, media_type="text/xml")
+        print(f"[WEBHOOK] Repeat delivery of {message_sid} while still processing")
+        SAVES_TOTAL.inc("whatsapp", "redelivered_in_progress")
+        return PlainTextResponse(
+            make_reply("⏳ Still working on your link — hang tight."),
+            media_type="text/xml",
+        )
+
+    try:
+        with trace_request("whatsapp_webhook"), deadline.budget():
+            response = await _handle_message(request)
+    except Exception:
+        if message_sid:
+            await asyncio.to_thread(idempotency.release, message_sid)
+        raise
+    if message_sid:
+        await asyncio.to_thread(idempotency.complete, message_sid, response.body.decode())
+    return response
+
+
+async def _handle_message(request: Request):
     form_data = await request.form()
     incoming_msg = form_data.get("Body", "").strip()
     sender = form_data.get("From", "")  # e.g., "whatsapp:+91XXXXXXXXXX"
@@ -38,12 +75,14 @@ async def whatsapp_webhook(request: Request):
     print(f"[WEBHOOK] Message from {whatsapp_number}: {incoming_msg[:100]}")
 
     # Check if user exists in database
-    conn = get_db()
-    user = conn.execute("SELECT * FROM users WHERE whatsapp_number = ?", (whatsapp_number,)).fetchone()
+    conn = get_db(readonly=True)
+    with span("db_user"):
+        user = conn.execute("SELECT * FROM users WHERE whatsapp_number = ?", (whatsapp_number,)).fetchone()
+    conn.close()
 
     if not user:
-        conn.close()
         print(f"[WEBHOOK] User {whatsapp_number} not registered")
+        SAVES_TOTAL.inc("whatsapp", "unregistered")
         return PlainTextResponse(
             make_reply("You're not registered yet! Please sign up on our website first, then send your link again."),
             media_type="text/xml",
@@ -61,24 +100,20 @@ async def whatsapp_webhook(request: Request):
 
             print(f"[WEBHOOK] MCQ resolved: {category}")
 
-            conn.execute(
-                """INSERT INTO saved_links
-                   (user_id, original_url, platform, extracted_text, ai_summary, category, thumbnail_url, tags)
-                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-                (
-                    user["id"],
-                    pending_data["url"],
-                    pending_data["platform"],
-                    category,
-                    summary,
-                    category,
-                    pending_data["thumbnail_url"],
-                    category.lower(),
-                ),
+            await asyncio.to_thread(
+                insert_link,
+                user["id"],
+                pending_data["url"],
+                pending_data["platform"],
+                category,
+                summary,
+                category,
+                pending_data["thumbnail_url"],
+                category.lower(),
             )
-            conn.commit()
-            conn.close()
+            prefetch(pending_data["thumbnail_url"])
 
+            SAVES_TOTAL.inc("whatsapp", "mcq_resolved")
             return PlainTextResponse(
                 make_reply(f"Got it! Saved to your *{category}* collection. \u2705"),
                 media_type="text/xml",
@@ -89,14 +124,14 @@ async def whatsapp_webhook(request: Request):
                 increment_retry(whatsapp_number)
                 retry_msg = get_mcq_message(whatsapp_number)
                 n = len(pending.get("mcq_opts", {}))
-                conn.close()
+                SAVES_TOTAL.inc("whatsapp", "mcq_retry")
                 return PlainTextResponse(
                     make_reply(f"Please reply with a number 1\u2013{n}.\n\n{retry_msg}"),
                     media_type="text/xml",
                 )
             else:
                 resolve_pending(whatsapp_number)
-                conn.close()
+                SAVES_TOTAL.inc("whatsapp", "mcq_dropped")
                 return PlainTextResponse(
                     make_reply("Couldn't save this one. Please try sending the link again."),
                     media_type="text/xml",
@@ -105,7 +140,7 @@ async def whatsapp_webhook(request: Request):
     # Not an MCQ reply — check for URL in message
     url = extract_url(incoming_msg)
     if not url:
-        conn.close()
+        SAVES_TOTAL.inc("whatsapp", "no_url")
         return PlainTextResponse(
             make_reply("Please send a valid social media or article link. 🔗"),
             media_type="text/xml",
@@ -115,12 +150,10 @@ async def whatsapp_webhook(request: Request):
     url = normalize_url(url)
 
     # Check for duplicate URL
-    existing = conn.execute(
-        "SELECT id FROM saved_links WHERE user_id = ? AND original_url = ?",
-        (user["id"], url),
-    ).fetchone()
+    with span("db_duplicate_check"):
+        existing = is_saved(user["id"], url)
     if existing:
-        conn.close()
+        SAVES_TOTAL.inc("whatsapp", "duplicate")
         return PlainTextResponse(
             make_reply("You've already saved this link! 📌"),
             media_type="text/xml",
@@ -129,38 +162,40 @@ async def whatsapp_webhook(request: Request):
     # Detect platform
     platform = detect_platform(url)
     if not platform:
-        conn.close()
+        SAVES_TOTAL.inc("whatsapp", "unknown_platform")
         return PlainTextResponse(
             make_reply("Couldn't identify this link. Please send an Instagram, Twitter, YouTube, or blog URL."),
             media_type="text/xml",
         )
 
-    # Scrape the URL
-    print(f"[WEBHOOK] Scraping {platform} URL: {url}")
-    scraped = await scrape_url(url, platform)
-    print(f"[WEBHOOK] Scraped text length: {len(scraped.get('text', ''))}, has thumbnail: {scraped.get('thumbnail_url') is not None}")
+    # Scrape + classify hold one of the pipeline's admission slots. With none
+    # free in time the link is queued for the deferred worker instead.
+    try:
+        async with admission.slot(user["id"]):
+            scraped, ai_result = await _scrape_and_classify(url, platform)
+    except admission.Busy as e:
+        print(f"[WEBHOOK] Pipeline busy ({e}), deferring {url}")
+        await admission.defer(user["id"], url, "whatsapp")
+        SAVES_TOTAL.inc("whatsapp", "deferred")
+        return PlainTextResponse(
+            make_reply("We're a bit busy right now — we'll save this link shortly. ⏳"),
+            media_type="text/xml",
+        )
 
-    # Check if text is weak — trigger MCQ fallback
-    if is_weak_text(scraped.get("text", "")):
-        print(f"[WEBHOOK] Weak text detected, triggering MCQ")
+    # Weak text — trigger MCQ fallback
+    if ai_result is None:
         store_pending(whatsapp_number, url, scraped.get("thumbnail_url"), platform)
         mcq_msg = get_mcq_message(whatsapp_number)
-        conn.close()
+        SAVES_TOTAL.inc("whatsapp", "mcq")
         return PlainTextResponse(
             make_reply(mcq_msg),
             media_type="text/xml",
         )
 
-    # Text is strong — send to Gemini
-    print(f"[WEBHOOK] Sending to Gemini AI...")
-    ai_result = await categorize_and_summarize(scraped["text"])
-    print(f"[WEBHOOK] AI result: {ai_result}")
-
     # Save to database
-    conn.execute(
-        """INSERT INTO saved_links (user_id, original_url, platform, extracted_text, ai_summary, category, thumbnail_url, tags)
-           VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",
-        (
+    with span("db_insert"):
+        inserted = await asyncio.to_thread(
+            insert_link,
             user["id"],
             url,
             platform,
@@ -169,12 +204,41 @@ async def whatsapp_webhook(request: Request):
             ai_result["category"],
             scraped.get("thumbnail_url"),
             ai_result.get("tags", ""),
-        ),
-    )
-    conn.commit()
-    conn.close()
+            etag=scraped.get("etag"),
+            last_modified=scraped.get("last_modified"),
+        )
+    if not inserted:
+        # Lost a race with another delivery of the same link (e.g. a double send)
+        SAVES_TOTAL.inc("whatsapp", "duplicate")
+        return PlainTextResponse(
+            make_reply("You've already saved this link! 📌"),
+            media_type="text/xml",
+        )
+    prefetch(scraped.get("thumbnail_url"))
 
+    SAVES_TOTAL.inc("whatsapp", "saved")
     return PlainTextResponse(
         make_reply(f"Got it! Saved to your *{ai_result['category']}* collection. \u2705"),
         media_type="text/xml",
     )
+
+
+async def _scrape_and_classify(url: str, platform: str) -> tuple[dict, dict | None]:
+    """Scrape `url` and classify it. The classification is None when the text
+    is too weak and the user should get the MCQ instead."""
+    print(f"[WEBHOOK] Scraping {platform} URL: {url}")
+    # The scrape gets the budget minus what the classifier needs after it
+    with span("scrape"), deadline.reserve(deadline.LLM_RESERVE_SECONDS):
+        scraped = await pipeline.scrape(url, platform)
+    print(f"[WEBHOOK] Scraped text length: {len(scraped.get('text', ''))}, has thumbnail: {scraped.get('thumbnail_url') is not None}")
+
+    if is_weak_text(scraped.get("text", "")):
+        print(f"[WEBHOOK] Weak text detected, triggering MCQ")
+        return scraped, None
+
+    # Text is strong — send to Gemini
+    print(f"[WEBHOOK] Sending to Gemini AI...")
+    with span("classify"):
+        ai_result = await pipeline.classify(url, scraped["text"])
+    print(f"[WEBHOOK] AI result: {ai_result}")
+    return scraped, ai_result
@@ -49,16 +49,21 @@ def detect_platform(url: str) -> str:
     return ""
 
 
-async def scrape_url(url: str, platform: str) -> dict:
-    """Route to the correct scraper based on platform. Returns dict with text, thumbnail_url."""
+async def scrape_url(url: str, platform: str, validators: dict | None = None) -> dict:
+    """Route to the correct scraper based on platform. Returns dict with text, thumbnail_url.
+
+    Pass `validators` ({"etag", "last_modified"}) from a previous fetch to make a
+    conditional request; the result then carries "not_modified": True on a 304.
+    Fresh results include the new "etag" / "last_modified" when the origin sent them.
+    """
     if platform == "instagram":
-        return await scrape_instagram(url)
+        return await scrape_instagram(url, validators)
     elif platform == "twitter":
-        return await scrape_twitter(url)
+        return await scrape_twitter(url, validators)
     elif platform == "youtube":
-        return await scrape_youtube(url)
+        return await scrape_youtube(url, validators)
     elif platform == "blog":
-        return await scrape_blog(url)
+        return await scrape_blog(url, validators)
     return {"text": "", "thumbnail_url": None}
 
 
@@ -1,5 +1,10 @@
+import time
 import httpx
-from bs4 import BeautifulSoup
+
+from app import deadline
+from app.metrics import record_scrape
+from app.scrapers import fetch
+from app.scrapers.fetch import conditional_headers, read_validators, not_modified_result, parse_html
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -8,16 +13,22 @@ HEADERS = {
 }
 
 
-async def scrape_blog(url: str) -> dict:
-    """Extract title, meta description, and first 500 chars of body from a blog/article URL."""
+async def scrape_blog(url: str, validators: dict | None = None) -> dict:
+    """Extract title, meta description, and first 500 chars of body from a blog/article URL.
+    Sends `validators` from a previous fetch; a 304 returns {"not_modified": True}."""
     result = {"text": "", "thumbnail_url": None}
+    started, outcome = time.perf_counter(), "empty"
 
     try:
         async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-            response = await client.get(url, headers=HEADERS)
+            response = await fetch.get(client, url, headers={**HEADERS, **conditional_headers(validators)})
+            if response.status_code == 304:
+                outcome = "not_modified"
+                return not_modified_result()
             response.raise_for_status()
+        result.update(read_validators(response))
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = parse_html(response.text)
 
         parts = []
 
@@ -49,7 +60,13 @@ async def scrape_blog(url: str) -> dict:
         if og_image and og_image.get("content"):
             result["thumbnail_url"] = og_image["content"]
 
+        if result["text"]:
+            outcome = "text"
+    except deadline.DeadlineExceeded:
+        outcome = "deadline"
     except Exception:
-        pass
+        outcome = "error"
+    finally:
+        record_scrape("blog", "page", started, outcome)
 
     return result
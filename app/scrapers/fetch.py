@@ -0,0 +1,317 @@
+# Shared HTTP layer for the scrapers.
+#
+# Every outbound scrape request goes through request()/get(), which queues it on
+# a per-host limiter: a token bucket (sustained rate + burst), a cap on requests
+# in flight, and a priority queue so interactive saves jump ahead of background
+# refreshes and thumbnail prefetches. A 429/503 with Retry-After pauses the
+# whole host and the request is retried once the pause is over, so a burst of
+# WhatsApp messages gets smoothed out instead of falling through to the MCQ.
+#
+# Inside a save's deadline.budget() the queue wait, each request's timeout and
+# any Retry-After pause are all bounded by what is left of the budget; a
+# request that can't even start in time raises deadline.DeadlineExceeded.
+
+import asyncio
+import contextvars
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from email.utils import parsedate_to_datetime
+from urllib.parse import urlparse
+
+from app import deadline
+from app.metrics import OUTBOUND_WAIT_SECONDS, CallbackMetric
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_PREFETCH = 5
+PRIORITY_BACKGROUND = 10
+
+# host → (requests per second, burst, max in flight)
+_DEFAULT_LIMIT = (5.0, 10, 8)
+HOST_LIMITS: dict[str, tuple[float, int, int]] = {
+    "api.instagram.com":   (1.0, 3, 2),
+    "www.instagram.com":   (1.0, 3, 2),
+    "publish.twitter.com": (2.0, 5, 4),
+    "twitter.com":         (1.0, 3, 2),
+    "x.com":               (1.0, 3, 2),
+    "www.youtube.com":     (3.0, 6, 4),
+}
+
+# Cap on how long we honour a Retry-After before giving up and returning the 429
+MAX_RETRY_AFTER_SECONDS = float(os.getenv("OUTBOUND_MAX_RETRY_AFTER", "20"))
+
+
+def _load_env_limits():
+    """OUTBOUND_LIMITS="api.instagram.com=1:3:2,publish.twitter.com=2:5:4" overrides the defaults."""
+    raw = os.getenv("OUTBOUND_LIMITS", "")
+    for item in raw.split(","):
+        if "=" not in item:
+            continue
+        host, spec = item.split("=", 1)
+        try:
+            rate, burst, in_flight = spec.split(":")
+            HOST_LIMITS[host.strip().lower()] = (float(rate), int(burst), int(in_flight))
+        except ValueError:
+            print(f"[FETCH] Ignoring bad OUTBOUND_LIMITS entry: {item}")
+
+
+_load_env_limits()
+
+_priority: contextvars.ContextVar[int] = contextvars.ContextVar(
+    "outbound_priority", default=PRIORITY_INTERACTIVE
+)
+
+
+@contextmanager
+def priority(level: int):
+    """Run outbound requests made inside this block (and tasks it spawns) at `level`."""
+    token = _priority.set(level)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class _HostLimiter:
+    """Token bucket + in-flight cap + priority wait queue for one host."""
+
+    def __init__(self, host: str, rate: float, burst: int, max_in_flight: int):
+        self.host = host
+        self.rate = rate
+        self.burst = burst
+        self.max_in_flight = max_in_flight
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self._waiters: list = []          # heap of (priority, seq, future)
+        self._seq = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+        self.stats = {
+            "requests": 0,
+            "throttled": 0,
+            "retries": 0,
+            "deadline_exceeded": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def _dispatch(self):
+        self._timer = None
+        now = time.monotonic()
+        self._refill(now)
+        while self._waiters and self.in_flight < self.max_in_flight:
+            if self._waiters[0][2].done():           # cancelled while queued
+                heapq.heappop(self._waiters)
+                continue
+            delay = max(self.blocked_until - now, (1 - self.tokens) / self.rate if self.tokens < 1 else 0)
+            if delay > 0:
+                self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+                return
+            _, _, fut = heapq.heappop(self._waiters)
+            self.tokens -= 1
+            self.in_flight += 1
+            fut.set_result(None)
+
+    async def acquire(self, prio: int) -> float:
+        """Wait for a slot. Returns the time spent queued, in seconds."""
+        start = time.monotonic()
+        fut = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (prio, next(self._seq), fut))
+        if self._timer is None:
+            self._dispatch()
+        try:
+            await fut
+        except asyncio.CancelledError:
+            if fut.done() and not fut.cancelled():
+                self.release()                      # granted just as we were cancelled
+            raise
+        waited = time.monotonic() - start
+        self.stats["requests"] += 1
+        self.stats["wait_seconds_total"] += waited
+        self.stats["wait_seconds_max"] = max(self.stats["wait_seconds_max"], waited)
+        OUTBOUND_WAIT_SECONDS.observe(waited, self.host)
+        return waited
+
+    def release(self):
+        self.in_flight -= 1
+        if self._timer is None:
+            self._dispatch()
+
+    def block_for(self, seconds: float):
+        """Pause the whole host (Retry-After)."""
+        self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+        self.stats["throttled"] += 1
+
+    def snapshot(self) -> dict:
+        return {
+            **self.stats,
+            "wait_seconds_total": round(self.stats["wait_seconds_total"], 3),
+            "wait_seconds_max": round(self.stats["wait_seconds_max"], 3),
+            "queued": sum(1 for _, _, f in self._waiters if not f.done()),
+            "in_flight": self.in_flight,
+            "blocked_for": round(max(0.0, self.blocked_until - time.monotonic()), 3),
+        }
+
+
+_limiters: dict[str, _HostLimiter] = {}
+
+
+def _limiter_for(url: str) -> _HostLimiter:
+    host = urlparse(url).netloc.lower()
+    limiter = _limiters.get(host)
+    if limiter is None:
+        rate, burst, in_flight = HOST_LIMITS.get(host, _DEFAULT_LIMIT)
+        limiter = _limiters[host] = _HostLimiter(host, rate, burst, in_flight)
+    return limiter
+
+
+def _retry_after_seconds(resp) -> float | None:
+    value = resp.headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+async def _acquire(limiter: _HostLimiter, prio: int):
+    """limiter.acquire(), giving up when the request's deadline passes first."""
+    left = deadline.remaining()
+    if left is None:
+        await limiter.acquire(prio)
+        return
+    if not deadline.expired():
+        try:
+            await asyncio.wait_for(limiter.acquire(prio), left)
+            return
+        except TimeoutError:
+            pass
+    limiter.stats["deadline_exceeded"] += 1
+    raise deadline.DeadlineExceeded(f"no time left to reach {limiter.host}")
+
+
+def _bounded(client, kwargs: dict) -> dict:
+    """Request kwargs with the timeout cut down to what is left of the deadline."""
+    if deadline.remaining() is not None:
+        kwargs["timeout"] = deadline.timeout(kwargs.get("timeout") or client.timeout.read or 30.0)
+    return kwargs
+
+
+async def request(client, method: str, url: str, *, max_retries: int = 2, **kwargs):
+    """Send a request through the per-host scheduler. Retries 429/503 that carry Retry-After."""
+    limiter = _limiter_for(url)
+    prio = _priority.get()
+    for attempt in range(max_retries + 1):
+        await _acquire(limiter, prio)
+        try:
+            resp = await client.request(method, url, **_bounded(client, kwargs))
+        finally:
+            limiter.release()
+
+        if resp.status_code not in (429, 503):
+            return resp
+        wait = _retry_after_seconds(resp)
+        if wait is None:
+            # No hint — back the host off briefly so the rest of the queue doesn't pile in
+            limiter.block_for(1.0)
+            return resp
+        limiter.block_for(wait)
+        if attempt == max_retries or wait > deadline.timeout(MAX_RETRY_AFTER_SECONDS):
+            return resp
+        limiter.stats["retries"] += 1
+        print(f"[FETCH] {limiter.host} returned {resp.status_code}, retrying in {wait:.1f}s")
+    return resp
+
+
+async def get(client, url: str, **kwargs):
+    return await request(client, "GET", url, **kwargs)
+
+
+async def get_prefix(client, url: str, max_bytes: int, until=None, **kwargs):
+    """GET through the scheduler, reading at most `max_bytes` of a 200 body and
+    stopping early once the compiled bytes pattern `until` matches what has
+    arrived. Returns (response, body prefix); the rest is never downloaded.
+    No Retry-After retries — this is for optional extras."""
+    limiter = _limiter_for(url)
+    await _acquire(limiter, _priority.get())
+    try:
+        async with client.stream("GET", url, **_bounded(client, kwargs)) as resp:
+            body = bytearray()
+            if resp.status_code == 200:
+                async for chunk in resp.aiter_bytes():
+                    body += chunk
+                    if len(body) >= max_bytes or (until is not None and until.search(body)):
+                        break
+            elif resp.status_code in (429, 503):
+                limiter.block_for(_retry_after_seconds(resp) or 1.0)
+            return resp, bytes(body[:max_bytes])
+    finally:
+        limiter.release()
+
+
+def host_stats() -> dict:
+    """Per-host queue/wait/throttle counters, for /health/outbound."""
+    return {host: limiter.snapshot() for host, limiter in sorted(_limiters.items())}
+
+
+CallbackMetric(
+    "outbound_in_flight", "Outbound requests currently in flight per host", ("host",),
+    lambda: (((h,), l.in_flight) for h, l in _limiters.items()),
+)
+CallbackMetric(
+    "outbound_queued", "Outbound requests waiting in the per-host queue", ("host",),
+    lambda: (((h,), l.snapshot()["queued"]) for h, l in _limiters.items()),
+)
+CallbackMetric(
+    "outbound_throttled_total", "429/503 responses that paused a host", ("host",),
+    lambda: (((h,), l.stats["throttled"]) for h, l in _limiters.items()),
+    kind="counter",
+)
+
+
+# ── Conditional requests ───────────────────────────────────────────────────
+
+def conditional_headers(validators: dict | None) -> dict:
+    """Build If-None-Match / If-Modified-Since headers from a previous fetch's validators."""
+    if not validators:
+        return {}
+    headers = {}
+    if validators.get("etag"):
+        headers["If-None-Match"] = validators["etag"]
+    if validators.get("last_modified"):
+        headers["If-Modified-Since"] = validators["last_modified"]
+    return headers
+
+
+def read_validators(resp) -> dict:
+    """Pull ETag / Last-Modified off a response so the next refresh can send them back."""
+    return {
+        "etag": resp.headers.get("etag"),
+        "last_modified": resp.headers.get("last-modified"),
+    }
+
+
+def not_modified_result() -> dict:
+    """Scraper result for a 304 — the caller keeps what it already has."""
+    return {"text": "", "thumbnail_url": None, "not_modified": True}
+
+
+# ── HTML parsing ───────────────────────────────────────────────────────────
+
+def parse_html(markup: str):
+    """BeautifulSoup with the stdlib parser. bs4 is imported on first use so it
+    stays off the cold-start path."""
+    from bs4 import BeautifulSoup
+    return BeautifulSoup(markup, "html.parser")
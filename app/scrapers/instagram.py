@@ -1,6 +1,9 @@
+import os
 import re
 import httpx
-from bs4 import BeautifulSoup
+
+from app.scrapers import fetch, strategy
+from app.scrapers.fetch import conditional_headers, read_validators, not_modified_result, parse_html
 
 # Instagram and Facebook are the same company.
 # Instagram MUST serve OG metadata to Facebook's own crawler so that
@@ -12,6 +15,8 @@ _FB_HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
 }
 
+OEMBED_URL = os.getenv("INSTAGRAM_OEMBED_URL", "https://api.instagram.com/oembed/")
+
 
 def extract_shortcode(url: str) -> str:
     """Extract the Instagram shortcode from a URL."""
@@ -19,62 +24,78 @@ def extract_shortcode(url: str) -> str:
     return match.group(2) if match else ""
 
 
-async def scrape_instagram(url: str) -> dict:
+async def _oembed(client, url: str, validators: dict | None) -> dict:
+    """Instagram public oEmbed API — caption + thumbnail, zero auth needed."""
+    result = {"text": "", "thumbnail_url": None}
+    oembed_url = f"{OEMBED_URL}?url={url}&omitscript=true"
+    resp = await fetch.get(
+        client, oembed_url, headers={**_FB_HEADERS, **conditional_headers(validators)}
+    )
+    if resp.status_code == 304:
+        print("[INSTAGRAM] oEmbed not modified")
+        return not_modified_result()
+    if resp.status_code == 200:
+        result.update(read_validators(resp))
+        data = resp.json()
+        caption = data.get("title", "").strip()
+        thumb   = data.get("thumbnail_url", "")
+        if caption and len(caption) > 5:
+            result["text"] = caption
+            print(f"[INSTAGRAM] oEmbed caption ({len(caption)} chars)")
+        if thumb:
+            result["thumbnail_url"] = thumb
+            print("[INSTAGRAM] oEmbed thumbnail OK")
+    return result
+
+
+async def _og(client, url: str) -> dict:
+    """facebookexternalhit OG metadata — Instagram must serve og:description to FB crawler."""
+    result = {"text": "", "thumbnail_url": None}
+    resp = await fetch.get(client, url, headers=_FB_HEADERS)
+    if resp.status_code == 200:
+        soup = parse_html(resp.text)
+
+        og_desc = soup.find("meta", property="og:description")
+        if og_desc and og_desc.get("content") and len(og_desc["content"]) > 5:
+            result["text"] = og_desc["content"]
+            print(f"[INSTAGRAM] OG desc ({len(result['text'])} chars)")
+
+        og_img = soup.find("meta", property="og:image")
+        if og_img and og_img.get("content"):
+            result["thumbnail_url"] = og_img["content"]
+            print("[INSTAGRAM] OG thumbnail OK")
+
+        if not result["text"]:
+            og_title = soup.find("meta", property="og:title")
+            if og_title and og_title.get("content"):
+                t = og_title["content"]
+                if "instagram" not in t.lower():
+                    result["text"] = t
+                    print(f"[INSTAGRAM] OG title fallback ({len(t)} chars)")
+    return result
+
+
+async def scrape_instagram(url: str, validators: dict | None = None) -> dict:
     """
-    Strategy (in order — no Playwright, no browser):
+    Strategies (no Playwright, no browser):
     1. Instagram public oEmbed API  — returns caption + thumbnail, zero auth needed.
     2. facebookexternalhit OG meta  — Instagram must serve og:description to FB crawler.
     3. Empty result                 — triggers MCQ category fallback.
-    """
-    result = {"text": "", "thumbnail_url": None}
 
-    async with httpx.AsyncClient(follow_redirects=True, timeout=12.0) as client:
+    Live saves race 1 and 2 and keep the first caption; background work tries
+    them in turn. Either way the order adapts to which one has been working
+    for this host lately — see app.scrapers.strategy.
 
-        # ── 1. oEmbed API ──────────────────────────────────────────────────────
-        try:
-            oembed_url = f"https://api.instagram.com/oembed/?url={url}&omitscript=true"
-            resp = await client.get(oembed_url, headers=_FB_HEADERS)
-            if resp.status_code == 200:
-                data = resp.json()
-                caption = data.get("title", "").strip()
-                thumb   = data.get("thumbnail_url", "")
-                if caption and len(caption) > 5:
-                    result["text"] = caption
-                    print(f"[INSTAGRAM] oEmbed caption ({len(caption)} chars)")
-                if thumb:
-                    result["thumbnail_url"] = thumb
-                    print("[INSTAGRAM] oEmbed thumbnail OK")
-                if result["text"]:
-                    return result
-        except Exception as e:
-            print(f"[INSTAGRAM] oEmbed failed: {e}")
-
-        # ── 2. facebookexternalhit OG metadata ─────────────────────────────────
-        try:
-            resp = await client.get(url, headers=_FB_HEADERS)
-            if resp.status_code == 200:
-                soup = BeautifulSoup(resp.text, "html.parser")
-
-                og_desc = soup.find("meta", property="og:description")
-                if og_desc and og_desc.get("content") and len(og_desc["content"]) > 5:
-                    result["text"] = og_desc["content"]
-                    print(f"[INSTAGRAM] OG desc ({len(result['text'])} chars)")
-
-                if not result["thumbnail_url"]:
-                    og_img = soup.find("meta", property="og:image")
-                    if og_img and og_img.get("content"):
-                        result["thumbnail_url"] = og_img["content"]
-                        print("[INSTAGRAM] OG thumbnail OK")
-
-                if not result["text"]:
-                    og_title = soup.find("meta", property="og:title")
-                    if og_title and og_title.get("content"):
-                        t = og_title["content"]
-                        if "instagram" not in t.lower():
-                            result["text"] = t
-                            print(f"[INSTAGRAM] OG title fallback ({len(t)} chars)")
-        except Exception as e:
-            print(f"[INSTAGRAM] FB crawler fallback failed: {e}")
+    `validators` (etag / last_modified from a previous fetch) are sent with the
+    oEmbed request; a 304 short-circuits with {"not_modified": True}.
+    """
+    async with httpx.AsyncClient(follow_redirects=True, timeout=12.0) as client:
+        result = await strategy.run("instagram", url, [
+            ("oembed", lambda: _oembed(client, url, validators)),
+            ("og", lambda: _og(client, url)),
+        ])
+    if result.get("not_modified"):
+        return result
 
     print(
         f"[INSTAGRAM] Done — text_len={len(result['text'])}, "
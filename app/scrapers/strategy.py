@@ -0,0 +1,201 @@
+# Running a scraper's strategies (oEmbed, OG page, ...) for one URL.
+#
+# Instagram and Twitter each have two ways to read a post. run() either tries
+# them one after another, stopping at the first that gives usable text, or
+# races them: both start together, the first with text wins, the loser is
+# cancelled, and the thumbnail is taken from whichever strategy has one (the
+# winner gets RACE_THUMB_GRACE_MS for a still-running strategy to supply it).
+#
+# SCRAPE_RACE picks the mode: "interactive" (default) races live saves only,
+# so background refreshes and imports don't spend two requests of a
+# rate-limited host's budget per link; "always" and "off" do what they say.
+#
+# Every attempt is recorded per (host, strategy) — successes and an EWMA of
+# latency — and both modes try the strategy with the lowest expected time to
+# a usable result first, so a host whose oEmbed endpoint keeps getting
+# rate-limited soon goes straight to the OG page. Counters are at
+# /health/scrapers.
+
+import asyncio
+import os
+import time
+from urllib.parse import urlparse
+
+from app import deadline
+from app.metrics import record_scrape
+from app.scrapers import fetch
+
+SCRAPE_RACE = os.getenv("SCRAPE_RACE", "interactive")   # interactive | always | off
+RACE_THUMB_GRACE_MS = float(os.getenv("SCRAPE_RACE_THUMB_GRACE_MS", "300"))
+
+# Weight of the newest sample in the latency EWMA
+_EWMA_ALPHA = 0.2
+# Latency assumed for a strategy that has never finished
+_PRIOR_LATENCY = 1.0
+
+
+class _StrategyStats:
+    __slots__ = ("attempts", "successes", "cancelled", "latency")
+
+    def __init__(self):
+        self.attempts = 0
+        self.successes = 0
+        self.cancelled = 0
+        self.latency: float | None = None
+
+    def record(self, ok: bool, elapsed: float):
+        self.attempts += 1
+        self.successes += ok
+        self._observe(elapsed)
+
+    def record_cancelled(self, elapsed: float):
+        """A race loser: it took at least `elapsed`, outcome unknown."""
+        self.cancelled += 1
+        if self.latency is None or elapsed > self.latency:
+            self._observe(elapsed)
+
+    def _observe(self, elapsed: float):
+        self.latency = elapsed if self.latency is None else (
+            _EWMA_ALPHA * elapsed + (1 - _EWMA_ALPHA) * self.latency
+        )
+
+    def expected_seconds(self) -> float:
+        """Latency over (Laplace-smoothed) success rate: time spent per usable result."""
+        rate = (self.successes + 1) / (self.attempts + 2)
+        return (self.latency if self.latency is not None else _PRIOR_LATENCY) / rate
+
+    def snapshot(self) -> dict:
+        return {
+            "attempts": self.attempts,
+            "successes": self.successes,
+            "cancelled": self.cancelled,
+            "success_rate": round(self.successes / self.attempts, 3) if self.attempts else None,
+            "latency_ewma_seconds": round(self.latency, 3) if self.latency is not None else None,
+        }
+
+
+_stats: dict[tuple[str, str], _StrategyStats] = {}
+
+
+def _stats_for(host: str, name: str) -> _StrategyStats:
+    stats = _stats.get((host, name))
+    if stats is None:
+        stats = _stats[(host, name)] = _StrategyStats()
+    return stats
+
+
+def _empty() -> dict:
+    return {"text": "", "thumbnail_url": None}
+
+
+def _merge(into: dict, result: dict):
+    """Fill what `into` is still missing from `result` — the first text and thumbnail win."""
+    for key, value in result.items():
+        if value and not into.get(key):
+            into[key] = value
+
+
+def _ordered(host: str, strategies: list) -> list:
+    # sorted() is stable, so the declared order breaks ties (and decides on a cold start)
+    return sorted(strategies, key=lambda s: _stats_for(host, s[0]).expected_seconds())
+
+
+async def _attempt(platform: str, host: str, name: str, fn) -> dict:
+    """Run one strategy, recording it. Failures come back as an empty result."""
+    started, outcome = time.perf_counter(), "empty"
+    try:
+        result = await fn()
+        if result.get("not_modified"):
+            outcome = "not_modified"
+        elif result.get("text"):
+            outcome = "text"
+        return result
+    except asyncio.CancelledError:
+        outcome = "cancelled"
+        raise
+    except deadline.DeadlineExceeded:
+        outcome = "deadline"
+        print(f"[{platform.upper()}] Out of time before {name}")
+    except Exception as e:
+        outcome = "error"
+        print(f"[{platform.upper()}] {name} failed: {e}")
+    finally:
+        record_scrape(platform, name, started, outcome)
+        elapsed = time.perf_counter() - started
+        if outcome == "cancelled":
+            _stats_for(host, name).record_cancelled(elapsed)
+        elif outcome != "deadline":     # budget-starved: says nothing about the strategy
+            _stats_for(host, name).record(outcome in ("text", "not_modified"), elapsed)
+    return _empty()
+
+
+async def _sequential(platform: str, host: str, strategies: list) -> dict:
+    merged = _empty()
+    for i, (name, fn) in enumerate(strategies):
+        if i and deadline.expired():
+            print(f"[{platform.upper()}] Out of time, skipping {name}")
+            break
+        result = await _attempt(platform, host, name, fn)
+        if result.get("not_modified"):
+            return result
+        _merge(merged, result)
+        if merged["text"]:
+            break
+    return merged
+
+
+async def _race(platform: str, host: str, strategies: list) -> dict:
+    merged = _empty()
+    rank = {}
+    pending = set()
+    for i, (name, fn) in enumerate(strategies):
+        task = asyncio.ensure_future(_attempt(platform, host, name, fn))
+        rank[task] = i
+        pending.add(task)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in sorted(done, key=rank.get):
+                result = task.result()
+                if result.get("not_modified"):
+                    return result
+                _merge(merged, result)
+            if merged["text"]:
+                if not merged["thumbnail_url"] and pending:
+                    done, pending = await asyncio.wait(pending, timeout=RACE_THUMB_GRACE_MS / 1000)
+                    for task in done:
+                        merged["thumbnail_url"] = merged["thumbnail_url"] or task.result().get("thumbnail_url")
+                return merged
+        return merged
+    finally:
+        for task in pending:
+            task.cancel()
+        # Let the losers unwind before the caller closes the HTTP client they share
+        await asyncio.gather(*pending, return_exceptions=True)
+
+
+def _should_race() -> bool:
+    if SCRAPE_RACE == "always":
+        return True
+    return SCRAPE_RACE == "interactive" and fetch._priority.get() == fetch.PRIORITY_INTERACTIVE
+
+
+async def run(platform: str, url: str, strategies: list) -> dict:
+    """Run `strategies` — [(name, zero-arg coroutine function returning a scraper
+    result)] in preference order — for `url`, racing or in turn (see above).
+    Returns the merged result, or the first {"not_modified": True}."""
+    host = urlparse(url).netloc.lower()
+    ordered = _ordered(host, strategies)
+    if len(ordered) > 1 and _should_race():
+        return await _race(platform, host, ordered)
+    return await _sequential(platform, host, ordered)
+
+
+def snapshot() -> dict:
+    """{host: {strategy: counters}}, for /health/scrapers."""
+    out: dict[str, dict] = {}
+    for (host, name), stats in sorted(_stats.items()):
+        out.setdefault(host, {})[name] = {
+            **stats.snapshot(), "expected_seconds": round(stats.expected_seconds(), 3),
+        }
+    return out
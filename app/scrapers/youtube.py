@@ -1,5 +1,14 @@
+import os
+import re
+import time
+from urllib.parse import quote
+
 import httpx
-from bs4 import BeautifulSoup
+
+from app import deadline
+from app.metrics import record_scrape
+from app.scrapers import fetch
+from app.scrapers.fetch import conditional_headers, read_validators, not_modified_result, parse_html
 
 HEADERS = {
     "User-Agent": "Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36",
@@ -7,17 +16,104 @@ HEADERS = {
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8",
 }
 
+# A watch page is over 1 MB of HTML and script for three meta tags. When the
+# URL carries a video ID, the title and channel come from the oEmbed endpoint
+# (well under 1 KB) and the thumbnail URL is built from the ID. The
+# description is only fetched when it's needed — a short title, or a refresh
+# comparing against text saved from the full page — and then only the first
+# YOUTUBE_HEAD_BYTES of the page are read. Anything the fast path can't handle
+# (channel / playlist URLs, private or removed videos) gets the full page.
+
+YOUTUBE_OEMBED_URL = os.getenv("YOUTUBE_OEMBED_URL", "https://www.youtube.com/oembed")
+YOUTUBE_THUMBNAIL_URL = os.getenv("YOUTUBE_THUMBNAIL_URL", "https://i.ytimg.com/vi/{id}/hqdefault.jpg")
+# Titles shorter than this get the description appended for the classifier
+YOUTUBE_DESCRIBE_BELOW_CHARS = int(os.getenv("YOUTUBE_DESCRIBE_BELOW_CHARS", "30"))
+YOUTUBE_HEAD_BYTES = int(os.getenv("YOUTUBE_HEAD_BYTES", str(256 * 1024)))
+
+_VIDEO_ID = re.compile(r"(?:[?&]v=|youtu\.be/|/(?:shorts|embed|live|v)/)([A-Za-z0-9_-]{11})(?![A-Za-z0-9_-])")
+# Stop reading the page once a description meta tag (or the end of <head>) has arrived
+_HEAD_DONE = re.compile(rb'<meta[^>]+(?:property="og:description"|name="description")[^>]*>|</head>', re.I)
+
+
+def extract_video_id(url: str) -> str:
+    """The 11-character video ID from a watch / youtu.be / shorts / embed / live URL, or ""."""
+    match = _VIDEO_ID.search(url)
+    return match.group(1) if match else ""
+
+
+async def _oembed(client, video_id: str, validators: dict | None) -> dict | None:
+    """Title, channel and thumbnail from oEmbed. None when oEmbed has nothing for
+    this video, so the caller falls back to the page."""
+    started, outcome = time.perf_counter(), "empty"
+    watch_url = f"https://www.youtube.com/watch?v={video_id}"
+    try:
+        resp = await fetch.get(
+            client,
+            f"{YOUTUBE_OEMBED_URL}?url={quote(watch_url, safe='')}&format=json",
+            headers={**HEADERS, **conditional_headers(validators)},
+        )
+        if resp.status_code == 304:
+            outcome = "not_modified"
+            return not_modified_result()
+        if resp.status_code != 200:
+            return None
+        data = resp.json()
+        title = (data.get("title") or "").strip()
+        if not title:
+            return None
+        outcome = "text"
+        return {
+            "text": title,
+            "author": (data.get("author_name") or "").strip(),
+            "thumbnail_url": YOUTUBE_THUMBNAIL_URL.format(id=video_id),
+            **read_validators(resp),
+        }
+    except deadline.DeadlineExceeded:
+        outcome = "deadline"
+        # The thumbnail needs no request, so even an out-of-time save gets one
+        return {"text": "", "thumbnail_url": YOUTUBE_THUMBNAIL_URL.format(id=video_id)}
+    except Exception:
+        outcome = "error"
+        return None
+    finally:
+        record_scrape("youtube", "oembed", started, outcome)
+
+
+async def _head_description(client, url: str) -> str:
+    """og:description from the first YOUTUBE_HEAD_BYTES of the page, or ""."""
+    started, outcome = time.perf_counter(), "empty"
+    try:
+        _, head = await fetch.get_prefix(client, url, YOUTUBE_HEAD_BYTES, until=_HEAD_DONE, headers=HEADERS)
+        soup = parse_html(head.decode("utf-8", "ignore"))
+        meta = soup.find("meta", property="og:description") or soup.find("meta", attrs={"name": "description"})
+        desc = (meta.get("content") or "").strip() if meta else ""
+        if desc:
+            outcome = "text"
+        return desc
+    except deadline.DeadlineExceeded:
+        outcome = "deadline"
+        return ""
+    except Exception:
+        outcome = "error"
+        return ""
+    finally:
+        record_scrape("youtube", "head", started, outcome)
+
 
-async def scrape_youtube(url: str) -> dict:
-    """Extract OG metadata from a YouTube URL. Returns dict with text and thumbnail_url."""
+async def _page(client, url: str, validators: dict | None) -> dict:
+    """og:title, og:description and og:image from the full page."""
     result = {"text": "", "thumbnail_url": None}
+    started, outcome = time.perf_counter(), "empty"
 
     try:
-        async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
-            response = await client.get(url, headers=HEADERS)
-            response.raise_for_status()
+        response = await fetch.get(client, url, headers={**HEADERS, **conditional_headers(validators)})
+        if response.status_code == 304:
+            outcome = "not_modified"
+            return not_modified_result()
+        response.raise_for_status()
+        result.update(read_validators(response))
 
-        soup = BeautifulSoup(response.text, "html.parser")
+        soup = parse_html(response.text)
 
         # Extract og:title (video title)
         og_title = soup.find("meta", property="og:title")
@@ -38,7 +134,47 @@ async def scrape_youtube(url: str) -> dict:
         if og_image and og_image.get("content"):
             result["thumbnail_url"] = og_image["content"]
 
+        if result["text"]:
+            outcome = "text"
+    except deadline.DeadlineExceeded:
+        outcome = "deadline"
     except Exception:
-        pass
+        outcome = "error"
+    finally:
+        record_scrape("youtube", "page", started, outcome)
+
+    return result
+
+
+async def scrape_youtube(url: str, validators: dict | None = None) -> dict:
+    """Extract title, description and thumbnail for a YouTube URL. Returns dict
+    with text ("title — description", or "title — by channel" when the
+    description wasn't needed) and thumbnail_url.
+    Sends `validators` from a previous fetch; a 304 returns {"not_modified": True}."""
+    video_id = extract_video_id(url)
+    async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
+        if not video_id:
+            return await _page(client, url, validators)
+
+        result = await _oembed(client, video_id, validators)
+        if result is None:
+            if deadline.expired():
+                return {"text": "", "thumbnail_url": YOUTUBE_THUMBNAIL_URL.format(id=video_id)}
+            return await _page(client, url, validators)
+        if result.get("not_modified") or not result["text"]:
+            return result
 
+        # The refresher passes validators and compares against text that was
+        # saved as "title — description", so it always wants the description
+        refresh = validators is not None
+        author = result.pop("author", "")
+        desc = ""
+        if (refresh or len(result["text"]) < YOUTUBE_DESCRIBE_BELOW_CHARS) and not deadline.expired():
+            desc = await _head_description(client, url)
+        if desc:
+            result["text"] += " — " + desc
+        elif refresh:
+            return await _page(client, url, validators)
+        elif author:
+            result["text"] += " — by " + author
     return result
@@ -0,0 +1,151 @@
+import argparse
+from datetime import datetime, timezone
+
+from app.database import get_db, init_db, DATABASE_URL
+
+# Per-user facet counters.
+#
+# user_link_stats holds one row per (user, dimension, value) with the number of
+# saved links in it — dimensions are "category", "platform", "month"
+# (YYYY-MM of saved_at) and "tag" (see app.tags). The save, delete and refresh
+# paths adjust the counters
+# in the same transaction as their own write, so reading a user's facets is a
+# handful of rows regardless of how many links they have.
+#
+# If the counters ever drift (manual SQL, a crash between statements on a
+# driver without transactions), rebuild them from saved_links:
+#   python -m app.stats rebuild [--user ID]
+
+DIMENSIONS = ("category", "platform", "month", "tag")
+# What get_stats() returns; tag counts are read top-N through app.tags
+FACET_DIMENSIONS = ("category", "platform", "month")
+
+_UPSERT = """INSERT INTO user_link_stats (user_id, dimension, value, count)
+             VALUES (?, ?, ?, ?)
+             ON CONFLICT (user_id, dimension, value)
+             DO UPDATE SET count = user_link_stats.count + excluded.count"""
+
+
+def month_of(saved_at) -> str:
+    """YYYY-MM bucket for a saved_at value (datetime from PG, string from SQLite, None = now)."""
+    if saved_at is None:
+        return datetime.now(timezone.utc).strftime("%Y-%m")
+    if isinstance(saved_at, datetime):
+        return saved_at.strftime("%Y-%m")
+    return str(saved_at)[:7]
+
+
+def _facets(category: str | None, platform: str | None, saved_at=None) -> list[tuple[str, str]]:
+    return [
+        ("category", category or "Other"),
+        ("platform", platform or "unknown"),
+        ("month", month_of(saved_at)),
+    ]
+
+
+def _adjust(conn, user_id: int, facets: list[tuple[str, str]], delta: int):
+    for dimension, value in facets:
+        conn.execute(_UPSERT, (user_id, dimension, value, delta))
+    if delta < 0:
+        conn.execute("DELETE FROM user_link_stats WHERE user_id = ? AND count <= 0", (user_id,))
+
+
+def record_insert(conn, user_id: int, category: str, platform: str, saved_at=None):
+    """Count a newly inserted link. Call on the inserting connection, before its commit."""
+    _adjust(conn, user_id, _facets(category, platform, saved_at), 1)
+
+
+def record_delete(conn, user_id: int, category: str, platform: str, saved_at):
+    """Uncount a deleted link. Call on the deleting connection, before its commit."""
+    _adjust(conn, user_id, _facets(category, platform, saved_at), -1)
+
+
+def record_recategorize(conn, user_id: int, old_category: str, new_category: str):
+    """Move one link between categories (background reclassification)."""
+    if (old_category or "Other") == (new_category or "Other"):
+        return
+    _adjust(conn, user_id, [("category", new_category or "Other")], 1)
+    _adjust(conn, user_id, [("category", old_category or "Other")], -1)
+
+
+def record_tags(conn, user_id: int, added=(), removed=()):
+    """Count tags indexed for / dropped from a link (app.tags keeps link_tags in step)."""
+    if added:
+        _adjust(conn, user_id, [("tag", t) for t in added], 1)
+    if removed:
+        _adjust(conn, user_id, [("tag", t) for t in removed], -1)
+
+
+def get_stats(user_id: int) -> dict:
+    """{"total": N, "category": {value: count}, "platform": {...}, "month": {...}}.
+
+    Tags are left out: a user can have thousands of them, and the dashboard only
+    shows the top few (app.tags.tag_cloud).
+    """
+    conn = get_db(readonly=True)
+    rows = conn.execute(
+        f"""SELECT dimension, value, count FROM user_link_stats
+            WHERE user_id = ? AND dimension IN ({", ".join("?" * len(FACET_DIMENSIONS))})""",
+        (user_id, *FACET_DIMENSIONS),
+    ).fetchall()
+    conn.close()
+    out: dict = {dim: {} for dim in FACET_DIMENSIONS}
+    for row in rows:
+        out.setdefault(row["dimension"], {})[row["value"]] = row["count"]
+    out["total"] = sum(out["category"].values())
+    return out
+
+
+# ── Full rebuild ───────────────────────────────────────────────────────────
+
+def rebuild(user_id: int | None = None) -> int:
+    """Recompute counters from saved_links (all users, or one). Returns rows written."""
+    month_expr = "to_char(saved_at, 'YYYY-MM')" if DATABASE_URL else "strftime('%Y-%m', saved_at)"
+    sources = {
+        "category": "COALESCE(category, 'Other')",
+        "platform": "COALESCE(platform, 'unknown')",
+        "month": month_expr,
+    }
+    where, params = ("WHERE user_id = ?", [user_id]) if user_id is not None else ("", [])
+
+    conn = get_db()
+    conn.execute(f"DELETE FROM user_link_stats {where}", params)
+    written = 0
+    for dimension, expr in sources.items():
+        cur = conn.execute(
+            f"""INSERT INTO user_link_stats (user_id, dimension, value, count)
+                SELECT user_id, '{dimension}', {expr}, COUNT(*)
+                FROM saved_links {where}
+                GROUP BY user_id, {expr}""",
+            params,
+        )
+        written += max(cur.rowcount, 0)
+    cur = conn.execute(
+        f"""INSERT INTO user_link_stats (user_id, dimension, value, count)
+            SELECT user_id, 'tag', tag, COUNT(*)
+            FROM link_tags {where}
+            GROUP BY user_id, tag""",
+        params,
+    )
+    written += max(cur.rowcount, 0)
+    conn.commit()
+    conn.close()
+    return written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the user_link_stats rollup table.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    rebuild_cmd = sub.add_parser("rebuild", help="recompute counters from saved_links")
+    rebuild_cmd.add_argument("--user", type=int, help="only this user id")
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "rebuild":
+        written = rebuild(args.user)
+        scope = f"user {args.user}" if args.user is not None else "all users"
+        print(f"[STATS] Rebuilt {written} counter rows for {scope}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,175 @@
+import asyncio
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict
+
+from app.database import get_db
+from app.metrics import CACHE_TOTAL, Gauge
+
+# Search-as-you-type completions for the dashboard.
+#
+# Each user gets a prefix index: one sorted list of terms (their tags,
+# categories and the words in their link titles / summaries) with a parallel
+# list of (kind, count). A lookup is a bisect to the first term >= the prefix
+# and a walk forward while terms still start with it — no query per keystroke.
+#
+# Indexes are built on a user's first keystroke — in a worker thread when
+# called from the event loop — and kept in an LRU capped at SUGGEST_CACHE_BYTES
+# (estimated) across users. Saves, deletes and reclassifications call
+# invalidate(), which also bumps the user's generation so an index that was
+# still being built from the old rows is used once but not cached.
+# SUGGEST_TTL_SECONDS bounds how stale an index can get in another worker
+# process, which never hears about them.
+
+SUGGEST_CACHE_BYTES = int(os.getenv("SUGGEST_CACHE_BYTES", str(32 * 1024 * 1024)))
+SUGGEST_TTL_SECONDS = int(os.getenv("SUGGEST_TTL_SECONDS", "300"))
+SUGGEST_LIMIT = 8
+
+# Lower rank wins when the same text is, say, both a tag and a title word
+_KIND_RANK = {"tag": 0, "category": 1, "word": 2}
+
+_WORD = re.compile(r"[^\W_]{3,}")
+_STOPWORDS = frozenset(
+    "the and for with this that from your you are was how why what when who into about "
+    "have has its our out not but all can will just more than then them they their".split()
+)
+# Rough per-entry overhead beyond the term string: list slots, the (kind, count) tuple
+_ENTRY_OVERHEAD = 120
+
+SUGGEST_INDEX_BYTES = Gauge(
+    "suggest_index_bytes", "Estimated memory held by cached per-user suggestion indexes"
+)
+
+
+class _Index:
+    __slots__ = ("terms", "meta", "size", "built_at")
+
+    def __init__(self, counts: dict[str, tuple[str, int]]):
+        self.terms = sorted(counts)
+        self.meta = [counts[t] for t in self.terms]
+        self.size = sum(sys.getsizeof(t) + _ENTRY_OVERHEAD for t in self.terms)
+        self.built_at = time.monotonic()
+
+    def complete(self, prefix: str, limit: int) -> list[dict]:
+        matches = []
+        i = bisect_left(self.terms, prefix)
+        while i < len(self.terms) and self.terms[i].startswith(prefix):
+            kind, count = self.meta[i]
+            matches.append((_KIND_RANK[kind], -count, self.terms[i], kind, count))
+            i += 1
+        matches.sort()
+        return [{"text": m[2], "kind": m[3], "count": m[4]} for m in matches[:limit]]
+
+
+_cache: OrderedDict[int, _Index] = OrderedDict()
+_cache_bytes = 0
+_generations: dict[int, int] = {}     # user → invalidate() count
+_lock = threading.Lock()
+
+
+def _build(user_id: int) -> _Index:
+    counts: dict[str, tuple[str, int]] = {}
+
+    def add(term: str, kind: str, count: int = 1):
+        current = counts.get(term)
+        if current is None or _KIND_RANK[kind] < _KIND_RANK[current[0]]:
+            counts[term] = (kind, count)
+        elif current[0] == kind:
+            counts[term] = (kind, current[1] + count)
+
+    conn = get_db(readonly=True)
+    facets = conn.execute(
+        """SELECT dimension, value, count FROM user_link_stats
+           WHERE user_id = ? AND dimension IN ('tag', 'category')""",
+        (user_id,),
+    ).fetchall()
+    texts = conn.execute(
+        "SELECT display_text, ai_summary FROM saved_links WHERE user_id = ?", (user_id,)
+    ).fetchall()
+    conn.close()
+
+    for row in facets:
+        add(row["value"].lower(), row["dimension"], row["count"])
+    for row in texts:
+        title = (row["display_text"] or "").split(" — ", 1)[0]
+        for word in _WORD.findall(f"{title} {row['ai_summary'] or ''}".lower()):
+            if word not in _STOPWORDS:
+                add(word, "word")
+    return _Index(counts)
+
+
+def _evict_locked():
+    global _cache_bytes
+    while _cache_bytes > SUGGEST_CACHE_BYTES and len(_cache) > 1:
+        _, index = _cache.popitem(last=False)
+        _cache_bytes -= index.size
+    SUGGEST_INDEX_BYTES.set(_cache_bytes)
+
+
+def _cached(user_id: int) -> _Index | None:
+    with _lock:
+        index = _cache.get(user_id)
+        if index is not None and time.monotonic() - index.built_at < SUGGEST_TTL_SECONDS:
+            _cache.move_to_end(user_id)
+            CACHE_TOTAL.inc("suggest_index", "hit")
+            return index
+    return None
+
+
+def _load(user_id: int) -> _Index:
+    """Build a user's index and cache it, unless invalidate() ran meanwhile."""
+    global _cache_bytes
+    CACHE_TOTAL.inc("suggest_index", "miss")
+    with _lock:
+        generation = _generations.get(user_id, 0)
+    index = _build(user_id)
+    with _lock:
+        if _generations.get(user_id, 0) != generation:
+            return index
+        old = _cache.pop(user_id, None)
+        if old is not None:
+            _cache_bytes -= old.size
+        _cache[user_id] = index
+        _cache_bytes += index.size
+        _evict_locked()
+    return index
+
+
+def _last_word(q: str) -> str | None:
+    words = q.lower().split()
+    if not words or q[-1:].isspace():
+        return None
+    return words[-1]
+
+
+def suggest(user_id: int, q: str, limit: int = SUGGEST_LIMIT) -> list[dict]:
+    """Completions for the last word of `q`: [{"text", "kind", "count"}, ...]."""
+    prefix = _last_word(q)
+    if prefix is None:
+        return []
+    return (_cached(user_id) or _load(user_id)).complete(prefix, limit)
+
+
+async def suggest_async(user_id: int, q: str, limit: int = SUGGEST_LIMIT) -> list[dict]:
+    """suggest() for the event loop: a cached index answers inline, a missing
+    one is built in a worker thread."""
+    prefix = _last_word(q)
+    if prefix is None:
+        return []
+    index = _cached(user_id) or await asyncio.to_thread(_load, user_id)
+    return index.complete(prefix, limit)
+
+
+def invalidate(user_id: int):
+    """Drop a user's index; the next keystroke rebuilds it."""
+    global _cache_bytes
+    with _lock:
+        _generations[user_id] = _generations.get(user_id, 0) + 1
+        index = _cache.pop(user_id, None)
+        if index is not None:
+            _cache_bytes -= index.size
+            SUGGEST_INDEX_BYTES.set(_cache_bytes)
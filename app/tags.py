@@ -0,0 +1,148 @@
+import argparse
+import asyncio
+import os
+
+from app import stats
+from app.database import get_db, init_db
+
+# Normalized tag index.
+#
+# saved_links.tags stays the comma-joined string the cards display; link_tags
+# holds one row per (link, tag), so an exact tag filter is an index lookup
+# instead of a LIKE '%tag%' scan that also matches "java" inside "javascript".
+# Per-user tag counts live in user_link_stats under dimension "tag" and are
+# adjusted in the same transaction as link_tags, so the tag cloud reads a
+# handful of rows.
+#
+# Links saved before the index existed are filled in by a background backfill,
+# TAG_BACKFILL_BATCH rows at a time. To run it offline:
+#   python -m app.tags backfill
+
+TAG_BACKFILL_BATCH = int(os.getenv("TAG_BACKFILL_BATCH", "500"))
+TAG_BACKFILL_PAUSE = float(os.getenv("TAG_BACKFILL_PAUSE", "0.5"))
+TAG_CLOUD_SIZE = int(os.getenv("TAG_CLOUD_SIZE", "30"))
+
+_task = None
+
+
+def split_tags(tags: str | None) -> list[str]:
+    """'Yoga, morning routine, yoga' → ['yoga', 'morning routine']."""
+    out: list[str] = []
+    for tag in (tags or "").split(","):
+        tag = tag.strip().lower()
+        if tag and tag not in out:
+            out.append(tag)
+    return out
+
+
+# ── Writes (caller's connection and transaction) ──────────────────────────
+
+def add(conn, user_id: int, link_id: int, tags: str | None):
+    """Index the tags of a link and count them."""
+    added = []
+    for tag in split_tags(tags):
+        cur = conn.execute(
+            "INSERT INTO link_tags (link_id, user_id, tag) VALUES (?, ?, ?) "
+            "ON CONFLICT (link_id, tag) DO NOTHING",
+            (link_id, user_id, tag),
+        )
+        if cur.rowcount == 1:
+            added.append(tag)
+    stats.record_tags(conn, user_id, added=added)
+
+
+def remove(conn, user_id: int, link_id: int):
+    """Drop a link's tags from the index and uncount them. Call before deleting the link."""
+    rows = conn.execute("SELECT tag FROM link_tags WHERE link_id = ?", (link_id,)).fetchall()
+    conn.execute("DELETE FROM link_tags WHERE link_id = ?", (link_id,))
+    stats.record_tags(conn, user_id, removed=[r["tag"] for r in rows])
+
+
+def replace(conn, user_id: int, link_id: int, tags: str | None):
+    remove(conn, user_id, link_id)
+    add(conn, user_id, link_id, tags)
+
+
+# ── Reads ──────────────────────────────────────────────────────────────────
+
+def tag_cloud(user_id: int, limit: int = TAG_CLOUD_SIZE) -> list[dict]:
+    """The user's most-used tags, [{"tag": ..., "count": N}, ...]."""
+    conn = get_db(readonly=True)
+    rows = conn.execute(
+        """SELECT value, count FROM user_link_stats
+           WHERE user_id = ? AND dimension = 'tag'
+           ORDER BY count DESC, value
+           LIMIT ?""",
+        (user_id, limit),
+    ).fetchall()
+    conn.close()
+    return [{"tag": r["value"], "count": r["count"]} for r in rows]
+
+
+# ── Backfill of links saved before the index ───────────────────────────────
+
+def backfill_batch(after_id: int = 0) -> tuple[int, int]:
+    """Index one batch of untagged-in-the-index links with id > after_id.
+    Returns (last id handled, rows seen); 0 rows seen means it is done."""
+    conn = get_db()
+    rows = conn.execute(
+        """SELECT id, user_id, tags FROM saved_links s
+           WHERE id > ? AND tags IS NOT NULL AND tags != ''
+             AND NOT EXISTS (SELECT 1 FROM link_tags t WHERE t.link_id = s.id)
+           ORDER BY id LIMIT ?""",
+        (after_id, TAG_BACKFILL_BATCH),
+    ).fetchall()
+    for row in rows:
+        add(conn, row["user_id"], row["id"], row["tags"])
+    conn.commit()
+    conn.close()
+    return (rows[-1]["id"] if rows else after_id), len(rows)
+
+
+def backfill_all() -> int:
+    """Run backfill_batch() to completion. Returns the number of links indexed."""
+    total, last_id = 0, 0
+    while True:
+        last_id, seen = backfill_batch(last_id)
+        if not seen:
+            return total
+        total += seen
+
+
+async def _backfill():
+    total, last_id = 0, 0
+    try:
+        while True:
+            last_id, seen = await asyncio.to_thread(backfill_batch, last_id)
+            if not seen:
+                break
+            total += seen
+            await asyncio.sleep(TAG_BACKFILL_PAUSE)
+    except Exception as e:
+        print(f"[TAGS] Backfill stopped after id {last_id}: {e}")
+        return
+    if total:
+        print(f"[TAGS] Backfill finished: indexed {total} links")
+
+
+def start_backfill():
+    """Start the background backfill (no-op if already running)."""
+    global _task
+    if _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_backfill())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the link_tags index.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("backfill", help="index tags of links saved before link_tags existed")
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "backfill":
+        print(f"[TAGS] Indexed {backfill_all()} links")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,7 @@
+from fastapi.templating import Jinja2Templates
+
+from app.assets import asset_url
+
+# One Jinja environment for every router, so template globals are defined once.
+templates = Jinja2Templates(directory="app/templates")
+templates.env.globals["asset_url"] = asset_url
@@ -0,0 +1,168 @@
+import argparse
+import asyncio
+import os
+import zlib
+
+from app.database import get_db, init_db
+
+# Raw scraped text, stored apart from saved_links.
+#
+# The full extracted_text is only needed to re-classify a link, to export it,
+# or to show its detail view — yet it is by far the widest column, so keeping it
+# inline made every dashboard page read carry it. It now lives zlib-compressed
+# in link_text (one row per link, deleted with it), and saved_links keeps a
+# short display_text for the cards and search.
+#
+# Rows written before the split still have extracted_text inline. A background
+# backfill moves them over TEXT_BACKFILL_BATCH rows at a time; until it reaches
+# a row, the readers here fall back to the inline value. To run it offline:
+#   python -m app.textstore migrate
+
+TEXT_BACKFILL_BATCH = int(os.getenv("TEXT_BACKFILL_BATCH", "500"))
+TEXT_BACKFILL_PAUSE = float(os.getenv("TEXT_BACKFILL_PAUSE", "0.5"))
+
+# Enough for a YouTube "title — description" card and the search column
+DISPLAY_TEXT_CHARS = 500
+_ZLIB_LEVEL = 6
+
+_INSERT = "INSERT INTO link_text (link_id, body) VALUES (?, ?) ON CONFLICT (link_id) DO NOTHING"
+_UPSERT = (
+    "INSERT INTO link_text (link_id, body) VALUES (?, ?) "
+    "ON CONFLICT (link_id) DO UPDATE SET body = excluded.body"
+)
+
+# SQLite's default limit on bound parameters is 999; stay well under it
+_IN_CHUNK = 900
+
+_task = None
+
+
+def pack(text: str | None) -> bytes:
+    return zlib.compress((text or "").encode("utf-8"), _ZLIB_LEVEL)
+
+
+def unpack(body) -> str:
+    """Inverse of pack(). Accepts bytes (SQLite) or memoryview (psycopg2 bytea)."""
+    return zlib.decompress(body).decode("utf-8")
+
+
+def resolve(body, inline: str | None) -> str:
+    """Full text from a (link_text.body, saved_links.extracted_text) pair."""
+    if body is not None:
+        return unpack(body)
+    return inline or ""
+
+
+def display_text(text: str | None) -> str:
+    return (text or "")[:DISPLAY_TEXT_CHARS]
+
+
+# ── Writes (caller's connection and transaction) ──────────────────────────
+
+def save(conn, link_id: int, text: str | None):
+    """Store (or replace) the full text of one link."""
+    conn.execute(_UPSERT, (link_id, pack(text)))
+
+
+def save_new(conn, texts: dict[int, str]):
+    """Store texts for freshly inserted links; existing rows are left alone."""
+    if texts:
+        conn.executemany(_INSERT, [(link_id, pack(text)) for link_id, text in texts.items()])
+
+
+# ── Lazy reads ─────────────────────────────────────────────────────────────
+
+def load_many(link_ids: list[int]) -> dict[int, str]:
+    """Full text for each link id that exists."""
+    out: dict[int, str] = {}
+    conn = get_db(readonly=True)
+    for i in range(0, len(link_ids), _IN_CHUNK):
+        chunk = link_ids[i:i + _IN_CHUNK]
+        rows = conn.execute(
+            f"""SELECT s.id, s.extracted_text, t.body
+                FROM saved_links s LEFT JOIN link_text t ON t.link_id = s.id
+                WHERE s.id IN ({', '.join('?' * len(chunk))})""",
+            chunk,
+        ).fetchall()
+        for row in rows:
+            out[row["id"]] = resolve(row["body"], row["extracted_text"])
+    conn.close()
+    return out
+
+
+def load(link_id: int) -> str:
+    return load_many([link_id]).get(link_id, "")
+
+
+# ── Backfill of pre-split rows ─────────────────────────────────────────────
+
+def migrate_batch(after_id: int = 0) -> tuple[int, int]:
+    """Move one batch of inline texts with id > after_id into link_text.
+    Returns (last id handled, rows moved); 0 rows moved means it is done."""
+    conn = get_db()
+    rows = conn.execute(
+        """SELECT id, extracted_text FROM saved_links
+           WHERE id > ? AND extracted_text IS NOT NULL
+           ORDER BY id LIMIT ?""",
+        (after_id, TEXT_BACKFILL_BATCH),
+    ).fetchall()
+    if rows:
+        save_new(conn, {r["id"]: r["extracted_text"] for r in rows})
+        conn.executemany(
+            """UPDATE saved_links
+               SET display_text = COALESCE(display_text, ?), extracted_text = NULL
+               WHERE id = ?""",
+            [(display_text(r["extracted_text"]), r["id"]) for r in rows],
+        )
+    conn.commit()
+    conn.close()
+    return (rows[-1]["id"] if rows else after_id), len(rows)
+
+
+def migrate_all() -> int:
+    """Run migrate_batch() to completion. Returns the number of rows moved."""
+    total, last_id = 0, 0
+    while True:
+        last_id, moved = migrate_batch(last_id)
+        if not moved:
+            return total
+        total += moved
+
+
+async def _backfill():
+    total, last_id = 0, 0
+    try:
+        while True:
+            last_id, moved = await asyncio.to_thread(migrate_batch, last_id)
+            if not moved:
+                break
+            total += moved
+            await asyncio.sleep(TEXT_BACKFILL_PAUSE)
+    except Exception as e:
+        print(f"[TEXT] Backfill stopped after id {last_id}: {e}")
+        return
+    if total:
+        print(f"[TEXT] Backfill finished: moved {total} rows to link_text")
+
+
+def start_backfill():
+    """Start the background backfill (no-op if already running)."""
+    global _task
+    if _task is not None:
+        return
+    _task = asyncio.get_running_loop().create_task(_backfill())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain the compressed link_text store.")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("migrate", help="move inline extracted_text rows into link_text")
+    args = parser.parse_args()
+
+    init_db()
+    if args.command == "migrate":
+        print(f"[TEXT] Moved {migrate_all()} rows to link_text")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,338 @@
+import asyncio
+import hashlib
+import io
+import os
+import threading
+
+import httpx
+from dotenv import load_dotenv
+
+from app.metrics import CACHE_TOTAL
+from app.scrapers import fetch
+
+load_dotenv()
+
+# Local disk cache for card thumbnails.
+#
+# Layout under THUMB_CACHE_DIR:
+#   refs/<sha1(source_url)>         → sha256 of the original image bytes
+#   blobs/<sha256>                  → original image, content-addressed
+#   variants/<sha256>-<width>.<ext> → resized WebP/JPEG for the cards
+#
+# Signed CDN URLs (Instagram especially) expire, so once an original has been
+# fetched the cached copy keeps serving even after the source URL goes dead.
+# A variant already on disk is served straight from the ref without touching
+# the original, and every variant hit also bumps its blob, so LRU eviction
+# doesn't pick the originals of the most-served cards first. Eviction works on
+# blobs and variants; refs are pruned once nothing they point to is left.
+
+THUMB_CACHE_DIR = os.getenv(
+    "THUMB_CACHE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "thumb_cache"),
+)
+THUMB_CACHE_MAX_BYTES = int(os.getenv("THUMB_CACHE_MAX_MB", "200")) * 1024 * 1024
+
+# Card widths: the grid column is 320–600px wide, so 400 for 1x and 800 for 2x screens
+VARIANT_WIDTHS = (400, 800)
+DEFAULT_WIDTH = 400
+MAX_ORIGINAL_BYTES = 8 * 1024 * 1024
+
+_FETCH_HEADERS = {
+    "User-Agent": "facebookexternalhit/1.1 (+http://www.facebook.com/externalhit_uagent.php)",
+    "Accept": "image/avif,image/webp,image/*,*/*;q=0.8",
+}
+
+_lock = threading.Lock()
+_cache_bytes: int | None = None      # running total, computed lazily on first write
+_inflight: dict[str, asyncio.Task] = {}
+_background: set[asyncio.Task] = set()
+
+
+# ── Disk layout helpers ────────────────────────────────────────────────────
+
+def _path(*parts: str) -> str:
+    return os.path.join(THUMB_CACHE_DIR, *parts)
+
+
+def _ref_path(source_url: str) -> str:
+    return _path("refs", hashlib.sha1(source_url.encode("utf-8")).hexdigest())
+
+
+def _touch(path: str):
+    """Bump mtime so LRU eviction treats the file as recently used."""
+    try:
+        os.utime(path, None)
+    except OSError:
+        pass
+
+
+def _scan_cache_bytes() -> int:
+    total = 0
+    for sub in ("refs", "blobs", "variants"):
+        d = _path(sub)
+        if not os.path.isdir(d):
+            continue
+        for name in os.listdir(d):
+            try:
+                total += os.path.getsize(os.path.join(d, name))
+            except OSError:
+                pass
+    return total
+
+
+def _write_file(path: str, data: bytes):
+    """Atomically write a cache file and evict least-recently-used files if over the cap."""
+    global _cache_bytes
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp{threading.get_ident()}"
+    with open(tmp, "wb") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+    with _lock:
+        if _cache_bytes is None:
+            _cache_bytes = _scan_cache_bytes()
+        else:
+            _cache_bytes += len(data)
+        if _cache_bytes > THUMB_CACHE_MAX_BYTES:
+            _evict_locked()
+
+
+def _evict_locked():
+    """Delete oldest-by-mtime files until the cache is back under 90% of the cap."""
+    global _cache_bytes
+    files = []
+    for sub in ("blobs", "variants"):
+        d = _path(sub)
+        if not os.path.isdir(d):
+            continue
+        for name in os.listdir(d):
+            p = os.path.join(d, name)
+            try:
+                st = os.stat(p)
+            except OSError:
+                continue
+            files.append((st.st_mtime, st.st_size, p))
+    files.sort()
+
+    target = int(THUMB_CACHE_MAX_BYTES * 0.9)
+    total = sum(size for _, size, _ in files)
+    for _, size, p in files:
+        if total <= target:
+            break
+        try:
+            os.remove(p)
+            total -= size
+        except OSError:
+            pass
+    total += _prune_refs_locked()
+    _cache_bytes = total
+    print(f"[THUMB] Evicted cache down to {total // 1024} KB")
+
+
+def _prune_refs_locked() -> int:
+    """Delete refs whose digest has no blob or variant left. Returns the bytes the rest take."""
+    d = _path("refs")
+    if not os.path.isdir(d):
+        return 0
+    live = set()
+    for sub in ("blobs", "variants"):
+        if os.path.isdir(_path(sub)):
+            # blobs/<sha256>, variants/<sha256>-<width>.<ext>
+            live.update(name.split("-")[0].split(".")[0] for name in os.listdir(_path(sub)))
+    total = 0
+    for name in os.listdir(d):
+        if ".tmp" in name:
+            continue                            # a ref being written right now
+        p = os.path.join(d, name)
+        try:
+            with open(p, "r") as f:
+                digest = f.read().strip()
+            if digest in live:
+                total += os.path.getsize(p)
+            else:
+                os.remove(p)
+        except OSError:
+            pass
+    return total
+
+
+def _ref_digest(source_url: str) -> str | None:
+    """The digest a source URL was last fetched as, whether or not its blob is still cached."""
+    try:
+        with open(_ref_path(source_url), "r") as f:
+            return f.read().strip() or None
+    except OSError:
+        return None
+
+
+def _read_ref(source_url: str) -> str | None:
+    digest = _ref_digest(source_url)
+    return digest if digest and os.path.exists(_path("blobs", digest)) else None
+
+
+# ── Fetching originals ─────────────────────────────────────────────────────
+
+async def _download(source_url: str) -> str | None:
+    """Fetch the original image once and store it content-addressed. Returns its sha256."""
+    try:
+        async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
+            resp = await fetch.get(client, source_url, headers=_FETCH_HEADERS)
+        if resp.status_code != 200:
+            print(f"[THUMB] Source returned {resp.status_code}: {source_url[:80]}")
+            return None
+        if not resp.headers.get("content-type", "").startswith("image/"):
+            return None
+        data = resp.content
+        if not data or len(data) > MAX_ORIGINAL_BYTES:
+            return None
+    except Exception as e:
+        print(f"[THUMB] Fetch failed: {e}")
+        return None
+
+    digest = hashlib.sha256(data).hexdigest()
+    blob = _path("blobs", digest)
+    if not os.path.exists(blob):
+        await asyncio.to_thread(_write_file, blob, data)
+    await asyncio.to_thread(_write_file, _ref_path(source_url), digest.encode())
+    return digest
+
+
+async def ensure_original(source_url: str) -> str | None:
+    """Return the content hash for source_url, downloading it if needed.
+    Concurrent callers for the same URL share one download."""
+    digest = _read_ref(source_url)
+    if digest:
+        CACHE_TOTAL.inc("thumb_original", "hit")
+        return digest
+    CACHE_TOTAL.inc("thumb_original", "miss")
+
+    task = _inflight.get(source_url)
+    if task is None:
+        task = asyncio.create_task(_download(source_url))
+        _inflight[source_url] = task
+        task.add_done_callback(lambda _: _inflight.pop(source_url, None))
+    return await task
+
+
+def prefetch(source_url: str | None):
+    """Start fetching a thumbnail in the background right after a link is saved."""
+    if not source_url:
+        return
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        return
+    # Queue behind interactive scrapes to the same CDN host
+    with fetch.priority(fetch.PRIORITY_PREFETCH):
+        task = loop.create_task(ensure_original(source_url))
+    # Keep a reference so the task isn't garbage-collected mid-flight
+    _background.add(task)
+    task.add_done_callback(_background.discard)
+
+
+# ── Resized variants ───────────────────────────────────────────────────────
+
+def pick_width(requested: int | None) -> int:
+    """Snap a requested width to the nearest pre-defined variant (keeps the cache bounded)."""
+    if not requested:
+        return DEFAULT_WIDTH
+    for w in VARIANT_WIDTHS:
+        if requested <= w:
+            return w
+    return VARIANT_WIDTHS[-1]
+
+
+def _resize(data: bytes, width: int, fmt: str) -> bytes | None:
+    """Downscale to `width` and re-encode. Returns None if Pillow is unavailable."""
+    try:
+        from PIL import Image
+    except ImportError:
+        return None
+
+    img = Image.open(io.BytesIO(data))
+    img.draft("RGB", (width, width * 4))   # fast JPEG decode at reduced scale
+    img = img.convert("RGB")
+    if img.width > width:
+        height = max(1, round(img.height * width / img.width))
+        img = img.resize((width, height), Image.LANCZOS)
+
+    out = io.BytesIO()
+    if fmt == "webp":
+        img.save(out, "WEBP", quality=78, method=4)
+    else:
+        img.save(out, "JPEG", quality=80, optimize=True, progressive=True)
+    return out.getvalue()
+
+
+def _sniff_media_type(data: bytes) -> str:
+    if data.startswith(b"\xff\xd8"):
+        return "image/jpeg"
+    if data.startswith(b"\x89PNG"):
+        return "image/png"
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[:6] in (b"GIF87a", b"GIF89a"):
+        return "image/gif"
+    return "application/octet-stream"
+
+
+def _cached_variant(digest: str, width: int, fmt: str) -> tuple[bytes, str] | None:
+    """Blocking: return (bytes, media_type) for a variant already on disk, or None."""
+    variant = _path("variants", f"{digest}-{width}.{fmt}")
+    try:
+        with open(variant, "rb") as f:
+            data = f.read()
+    except OSError:
+        return None
+    CACHE_TOTAL.inc("thumb_variant", "hit")
+    _touch(variant)
+    # Keep the original as warm as its busiest variant, so a later width or
+    # format can still be made after the source URL has expired
+    _touch(_path("blobs", digest))
+    return data, f"image/{'webp' if fmt == 'webp' else 'jpeg'}"
+
+
+def _load_variant(digest: str, width: int, fmt: str) -> tuple[bytes, str] | None:
+    """Blocking: return (bytes, media_type) for a variant, generating it on first use."""
+    cached = _cached_variant(digest, width, fmt)
+    if cached:
+        return cached
+    variant = _path("variants", f"{digest}-{width}.{fmt}")
+
+    blob = _path("blobs", digest)
+    try:
+        with open(blob, "rb") as f:
+            original = f.read()
+    except OSError:
+        return None
+    _touch(blob)
+    CACHE_TOTAL.inc("thumb_variant", "miss")
+
+    try:
+        data = _resize(original, width, fmt)
+    except Exception as e:
+        print(f"[THUMB] Resize failed for {digest[:12]}: {e}")
+        data = None
+    if data is None:
+        # No Pillow or undecodable image — serve the original untouched
+        return original, _sniff_media_type(original)
+
+    _write_file(variant, data)
+    return data, f"image/{'webp' if fmt == 'webp' else 'jpeg'}"
+
+
+async def get_variant(source_url: str, width: int, fmt: str) -> tuple[bytes, str, str] | None:
+    """Return (bytes, media_type, etag) for a resized thumbnail, or None if unavailable."""
+    # A variant on disk needs neither the original nor the (possibly expired) source URL
+    digest = await asyncio.to_thread(_ref_digest, source_url)
+    loaded = digest and await asyncio.to_thread(_cached_variant, digest, width, fmt)
+    if not loaded:
+        digest = await ensure_original(source_url)
+        if not digest:
+            return None
+        loaded = await asyncio.to_thread(_load_variant, digest, width, fmt)
+    if not loaded:
+        return None
+    data, media_type = loaded
+    return data, media_type, f'"{digest[:32]}-{width}-{fmt}"'
@@ -0,0 +1,188 @@
+# Lightweight per-request tracing.
+#
+# trace_request() opens a trace for one request; span() / add_span() record
+# named stages inside it (scrape strategies, LLM attempts, DB writes). Nothing is
+# recorded outside a trace, so background jobs pay only a ContextVar lookup.
+#
+# Requests slower than SLOW_REQUEST_MS are logged with their span breakdown.
+# With PROFILE_SLOW_REQUESTS=1 a sampling thread also records the event-loop
+# thread's stack every PROFILE_INTERVAL_MS while a trace is open, and slow
+# requests get their stacks written to PROFILE_DIR in folded format
+# ("frame;frame;frame count"), ready for flamegraph.pl or speedscope.
+# Samples are per thread, so requests running concurrently on the same event
+# loop share them — read a profile as "what the process was doing meanwhile".
+
+import contextvars
+import os
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+SLOW_REQUEST_MS = float(os.getenv("SLOW_REQUEST_MS", "5000"))
+PROFILE_SLOW_REQUESTS = os.getenv("PROFILE_SLOW_REQUESTS", "0") == "1"
+PROFILE_INTERVAL_MS = float(os.getenv("PROFILE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR",
+    os.path.join(os.path.dirname(os.path.dirname(__file__)), "profiles"),
+)
+
+
+class Trace:
+    def __init__(self, name: str):
+        self.name = name
+        self.started = time.perf_counter()
+        self.duration = 0.0
+        self.spans: list[tuple[str, float, float]] = []   # (name, offset, duration) in seconds
+        self.thread_id = threading.get_ident()
+        self.samples: Counter = Counter()
+
+    def add(self, name: str, started: float, duration: float):
+        self.spans.append((name, started - self.started, duration))
+
+    def totals(self) -> dict[str, float]:
+        """Total milliseconds per span name (e.g. three Gemini attempts add up)."""
+        out: dict[str, float] = {}
+        for name, _, dur in self.spans:
+            out[name] = out.get(name, 0.0) + dur * 1000
+        return out
+
+    def server_timing(self) -> str:
+        """Value for the Server-Timing response header."""
+        parts = [f"{_token(name)};dur={ms:.1f}" for name, ms in self.totals().items()]
+        parts.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(parts)
+
+
+_current: contextvars.ContextVar[Trace | None] = contextvars.ContextVar("current_trace", default=None)
+
+
+def _token(name: str) -> str:
+    return re.sub(r"[^A-Za-z0-9_.\-]", "_", name)
+
+
+def add_span(name: str, started: float, duration: float | None = None):
+    """Record a finished stage that began at perf_counter() value `started`."""
+    trace = _current.get()
+    if trace is None:
+        return
+    if duration is None:
+        duration = time.perf_counter() - started
+    trace.add(name, started, duration)
+
+
+@contextmanager
+def span(name: str):
+    """Time the enclosed block as a named stage of the current trace."""
+    trace = _current.get()
+    if trace is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add(name, started, time.perf_counter() - started)
+
+
+@contextmanager
+def trace_request(name: str):
+    """Open a trace for one request; logs (and optionally profiles) it if it runs slow."""
+    trace = Trace(name)
+    token = _current.set(trace)
+    if PROFILE_SLOW_REQUESTS:
+        _sampler.register(trace)
+    try:
+        yield trace
+    finally:
+        trace.duration = time.perf_counter() - trace.started
+        _current.reset(token)
+        if PROFILE_SLOW_REQUESTS:
+            _sampler.unregister(trace)
+        if trace.duration * 1000 >= SLOW_REQUEST_MS:
+            _report_slow(trace)
+
+
+def _report_slow(trace: Trace):
+    breakdown = ", ".join(
+        f"{name}@{offset * 1000:.0f}ms={dur * 1000:.0f}ms" for name, offset, dur in trace.spans
+    )
+    print(f"[TRACE] Slow {trace.name}: {trace.duration * 1000:.0f}ms — {breakdown or 'no spans'}")
+    if PROFILE_SLOW_REQUESTS and trace.samples:
+        try:
+            path = _write_profile(trace)
+            print(f"[TRACE] Profile written to {path}")
+        except OSError as e:
+            print(f"[TRACE] Could not write profile: {e}")
+
+
+def _write_profile(trace: Trace) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(
+        PROFILE_DIR, f"{stamp}-{_token(trace.name)}-{trace.duration * 1000:.0f}ms.folded"
+    )
+    with open(path, "w") as f:
+        for stack, count in trace.samples.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+# ── Sampling profiler ──────────────────────────────────────────────────────
+
+def _fold(frame) -> str:
+    parts = []
+    while frame is not None:
+        code = frame.f_code
+        parts.append(f"{os.path.basename(code.co_filename)}:{code.co_name}:{frame.f_lineno}")
+        frame = frame.f_back
+    return ";".join(reversed(parts))
+
+
+class _Sampler:
+    """One daemon thread that samples the stacks of threads with an open trace."""
+
+    def __init__(self):
+        self._active: set[Trace] = set()
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+
+    def register(self, trace: Trace):
+        with self._lock:
+            self._active.add(trace)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, name="trace-sampler", daemon=True)
+                self._thread.start()
+
+    def unregister(self, trace: Trace):
+        with self._lock:
+            self._active.discard(trace)
+
+    def _run(self):
+        interval = PROFILE_INTERVAL_MS / 1000
+        while True:
+            with self._lock:
+                active = list(self._active)
+                if not active:
+                    self._thread = None
+                    return
+            frames = sys._current_frames()
+            folded: dict[int, str] = {}
+            for trace in active:
+                if trace.thread_id not in folded:
+                    frame = frames.get(trace.thread_id)
+                    folded[trace.thread_id] = _fold(frame) if frame is not None else ""
+                stack = folded[trace.thread_id]
+                if stack:
+                    trace.samples[stack] += 1
+            time.sleep(interval)
+
+
+_sampler = _Sampler()
@@ -0,0 +1,108 @@
+"""
+Export memory check.
+
+Seeds a throwaway SQLite database with a large library for one user, then
+drains each /links/export generator (CSV, NDJSON, bookmarks HTML) under
+tracemalloc and records the peak Python heap. It repeats that at a tenth of
+the size; a streaming export has the same peak at both sizes, while one that
+buffers the result grows roughly tenfold. Exits 1 if the peak at full size
+is more than --max-growth times the peak at the small size.
+
+Usage:
+  python benchmarks/export_memory.py                 # 100k links
+  python benchmarks/export_memory.py --links 250000 --max-growth 1.5
+"""
+import argparse
+import os
+import sqlite3
+import sys
+import tempfile
+import time
+import tracemalloc
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_tmp = tempfile.TemporaryDirectory()
+os.environ["SQLITE_PATH"] = os.path.join(_tmp.name, "export.db")
+os.environ.pop("DATABASE_URL", None)
+
+from app.database import init_db, DB_PATH  # noqa: E402
+from app import export  # noqa: E402
+
+CATEGORIES = ["Fitness", "Coding", "Tech", "Food", "Travel", "Design", "Business", "Gaming", "Other"]
+PLATFORMS = ["instagram", "twitter", "youtube", "blog"]
+
+
+def _seed(user_id: int, n: int):
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute(
+        "INSERT INTO users (id, name, whatsapp_number, password_hash) VALUES (?, ?, ?, 'x')",
+        (user_id, f"user{user_id}", f"+1555{user_id:07d}"),
+    )
+    caption = "A fairly typical caption with a few hashtags #fitness #morning #routine " * 4
+    conn.executemany(
+        """INSERT INTO saved_links
+           (user_id, original_url, platform, extracted_text, ai_summary, category, thumbnail_url, tags, saved_at)
+           VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)""",
+        (
+            (
+                user_id,
+                f"https://example.com/post/{user_id}/{i}",
+                PLATFORMS[i % len(PLATFORMS)],
+                caption,
+                f"Summary of saved post number {i}.",
+                CATEGORIES[i % len(CATEGORIES)],
+                f"https://cdn.example.com/thumb/{i}.jpg",
+                "fitness, morning, routine",
+                f"2026-{1 + i % 12:02d}-{1 + i % 28:02d} 12:00:00",
+            )
+            for i in range(n)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _measure(fmt: str, user_id: int) -> tuple[int, int, float]:
+    """(peak bytes, output bytes, seconds) for draining one export."""
+    tracemalloc.start()
+    started = time.perf_counter()
+    total = 0
+    for piece in export.EXPORTERS[fmt](user_id):
+        total += len(piece.encode())
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak, total, elapsed
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=100_000)
+    parser.add_argument("--max-growth", type=float, default=2.0,
+                        help="allowed peak(full) / peak(tenth) ratio")
+    args = parser.parse_args()
+
+    init_db()
+    small_user, big_user = 1, 2
+    print(f"Seeding {args.links // 10:,} + {args.links:,} links…")
+    _seed(small_user, args.links // 10)
+    _seed(big_user, args.links)
+
+    failed = False
+    for fmt in export.EXPORTERS:
+        small_peak, _, _ = _measure(fmt, small_user)
+        big_peak, size, elapsed = _measure(fmt, big_user)
+        growth = big_peak / small_peak
+        ok = growth <= args.max_growth
+        failed |= not ok
+        print(
+            f"{fmt:<7} {size / 1e6:>7.1f} MB out in {elapsed:>5.2f}s   "
+            f"peak {small_peak / 1e6:.2f} MB @ {args.links // 10:,} → {big_peak / 1e6:.2f} MB @ {args.links:,}  "
+            f"({growth:.2f}x)  {'ok' if ok else 'NOT FLAT'}"
+        )
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,174 @@
+"""
+Local stand-ins for every upstream the app talks to, for load testing.
+
+One FastAPI app serves:
+  POST /gemini/v1beta/models/{model}:generateContent   Gemini REST API
+  POST /groq/chat/completions                          Groq (OpenAI-compatible)
+  GET  /instagram/oembed/                              Instagram oEmbed
+  GET  /twitter/oembed                                 Twitter/X oEmbed
+  GET  /youtube/oembed                                 YouTube oEmbed
+  GET  /site/{instagram.com|twitter.com|youtube.com|blog}/...   target pages
+  GET  /img/{name}                                     thumbnails
+
+Latency and error injection are configured per service through the
+FAKE_CONFIG environment variable (JSON), e.g.
+  {"gemini": {"latency_ms": 400, "jitter_ms": 150, "error_rate": 0.1, "error_status": 429}}
+Services: gemini, groq, instagram_oembed, twitter_oembed, youtube_oembed, instagram_page,
+twitter_page, youtube_page, blog_page, image.
+
+Run with:  uvicorn benchmarks.fakes:app --port 9100
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import os
+import random
+
+from fastapi import FastAPI, Request
+from fastapi.responses import HTMLResponse, JSONResponse, Response
+
+app = FastAPI(title="Social Saver upstream fakes")
+
+_DEFAULTS = {"latency_ms": 50, "jitter_ms": 20, "error_rate": 0.0, "error_status": 503}
+CONFIG: dict = json.loads(os.getenv("FAKE_CONFIG", "{}") or "{}")
+
+_CATEGORIES = ["Fitness", "Coding", "Tech", "Food", "Travel", "Design", "Business", "Gaming"]
+_WORDS = (
+    "python workout recipe startup design gaming travel budget laptop yoga pasta react "
+    "figma esports hotel marketing algorithm protein camera itinerary"
+).split()
+
+# 1x1 transparent GIF
+_PIXEL = base64.b64decode("R0lGODlhAQABAIAAAAAAAP///yH5BAEAAAAALAAAAAABAAEAAAIBRAA7")
+
+
+def _cfg(service: str) -> dict:
+    return {**_DEFAULTS, **CONFIG.get("*", {}), **CONFIG.get(service, {})}
+
+
+async def _inject(service: str) -> Response | None:
+    """Sleep for the configured latency; maybe return an injected error response."""
+    cfg = _cfg(service)
+    delay = max(0.0, random.gauss(cfg["latency_ms"], cfg["jitter_ms"])) / 1000
+    await asyncio.sleep(delay)
+    if random.random() < cfg["error_rate"]:
+        headers = {"Retry-After": "1"} if cfg["error_status"] == 429 else {}
+        return JSONResponse({"error": "injected"}, status_code=cfg["error_status"], headers=headers)
+    return None
+
+
+def _caption(seed: str, words: int = 18) -> str:
+    rnd = random.Random(hashlib.md5(seed.encode()).hexdigest())
+    return " ".join(rnd.choice(_WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _classification(seed: str) -> str:
+    rnd = random.Random(seed)
+    return json.dumps({
+        "category": rnd.choice(_CATEGORIES),
+        "summary": _caption(seed, 12),
+        "tags": rnd.sample(_WORDS, 4),
+    })
+
+
+# ── LLM APIs ───────────────────────────────────────────────────────────────
+
+@app.post("/gemini/v1beta/models/{model_action}")
+async def gemini(model_action: str, request: Request):
+    if (err := await _inject("gemini")) is not None:
+        return err
+    body = await request.json()
+    prompt = body["contents"][0]["parts"][0]["text"]
+    return {
+        "candidates": [{
+            "content": {"parts": [{"text": _classification(prompt[-200:])}], "role": "model"},
+            "finishReason": "STOP",
+            "index": 0,
+        }],
+        "usageMetadata": {"promptTokenCount": len(prompt) // 4, "candidatesTokenCount": 40},
+    }
+
+
+@app.post("/groq/chat/completions")
+async def groq(request: Request):
+    if (err := await _inject("groq")) is not None:
+        return err
+    body = await request.json()
+    prompt = body["messages"][0]["content"]
+    return {"choices": [{"message": {"role": "assistant", "content": _classification(prompt[-200:])}}]}
+
+
+# ── oEmbed APIs ────────────────────────────────────────────────────────────
+
+@app.get("/instagram/oembed/")
+async def instagram_oembed(url: str, request: Request):
+    if (err := await _inject("instagram_oembed")) is not None:
+        return err
+    base = str(request.base_url).rstrip("/")
+    return {"title": _caption(url), "thumbnail_url": f"{base}/img/{hashlib.md5(url.encode()).hexdigest()}.gif"}
+
+
+@app.get("/twitter/oembed")
+async def twitter_oembed(url: str):
+    if (err := await _inject("twitter_oembed")) is not None:
+        return err
+    return {"html": f'<blockquote><p lang="en">{_caption(url)}</p>&mdash; Someone (@someone)</blockquote>'}
+
+
+@app.get("/youtube/oembed")
+async def youtube_oembed(url: str):
+    if (err := await _inject("youtube_oembed")) is not None:
+        return err
+    return {
+        "title": _caption(url + "t", 6), "author_name": "Some Channel", "type": "video",
+        "thumbnail_url": "https://i.ytimg.com/vi/x/hqdefault.jpg",
+    }
+
+
+# ── Target pages ───────────────────────────────────────────────────────────
+
+# Watch pages: the meta tags sit behind inline player config, and the body
+# carries ~1 MB of initial data — about what YouTube serves. Built once.
+_YT_HEAD_SCRIPT = "<script>var ytcfg = '" + "x" * 40_000 + "';</script>"
+_YT_BODY_SCRIPT = "<script>var ytInitialData = '" + " ".join(
+    random.Random(0).choice(_WORDS) for _ in range(150_000)
+) + "';</script>"
+
+
+def _og_page(title: str, desc: str, image: str, body_words: int = 400, head_script: str = "", body_script: str = "") -> str:
+    body = " ".join(random.choice(_WORDS) for _ in range(body_words))
+    return (
+        f"<html><head><title>{title}</title>{head_script}"
+        f'<meta name="description" content="{desc}">'
+        f'<meta property="og:title" content="{title}">'
+        f'<meta property="og:description" content="{desc}">'
+        f'<meta property="og:image" content="{image}">'
+        f"</head><body><nav>menu</nav><article><p>{body}</p></article>{body_script}</body></html>"
+    )
+
+
+@app.get("/site/{site}/{rest:path}")
+async def page(site: str, rest: str, request: Request):
+    service = {
+        "instagram.com": "instagram_page",
+        "twitter.com": "twitter_page",
+        "youtube.com": "youtube_page",
+    }.get(site, "blog_page")
+    if (err := await _inject(service)) is not None:
+        return err
+    seed = str(request.url)
+    image = f"{str(request.base_url).rstrip('/')}/img/{hashlib.md5(seed.encode()).hexdigest()}.gif"
+    if site == "youtube.com":
+        return HTMLResponse(_og_page(
+            _caption(seed, 6), _caption(seed + "d"), image,
+            head_script=_YT_HEAD_SCRIPT, body_script=_YT_BODY_SCRIPT,
+        ))
+    return HTMLResponse(_og_page(_caption(seed, 6), _caption(seed + "d"), image))
+
+
+@app.get("/img/{name}")
+async def image(name: str):
+    if (err := await _inject("image")) is not None:
+        return err
+    return Response(_PIXEL, media_type="image/gif")
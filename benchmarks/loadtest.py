@@ -0,0 +1,303 @@
+"""
+End-to-end load test.
+
+Starts the upstream fakes (benchmarks/fakes.py) and the real app under uvicorn,
+each in its own process, points the app at the fakes through environment
+variables, registers a pool of users and then drives a weighted mix of:
+
+  webhook    POST /webhook/whatsapp   (Twilio-shaped form posts, fresh URL each time)
+  chat       POST /chat/send
+  dashboard  GET  /dashboard
+  search     GET  /dashboard?q=...
+
+from a fixed number of closed-loop workers. Reports throughput and p50/p95/p99
+latency per scenario and writes the run to benchmarks/results/ as JSON.
+
+Usage:
+  python benchmarks/loadtest.py --concurrency 20 --duration 30
+  python benchmarks/loadtest.py --mix webhook=5,chat=2,dashboard=2,search=1 \\
+      --latency gemini=600 --errors instagram_oembed=0.2:429
+  python benchmarks/loadtest.py --compare benchmarks/results/loadtest-20261019-101500.json
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import httpx
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+_SEARCH_TERMS = ["python", "recipe", "yoga", "startup", "gaming travel", "design figma", "laptop"]
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _parse_kv(items: list[str]) -> dict[str, str]:
+    out = {}
+    for item in items:
+        for part in item.split(","):
+            if "=" in part:
+                k, v = part.split("=", 1)
+                out[k.strip()] = v.strip()
+    return out
+
+
+def _fake_config(args) -> dict:
+    config: dict = {}
+    for service, ms in _parse_kv(args.latency).items():
+        config.setdefault(service, {})["latency_ms"] = float(ms)
+    for service, spec in _parse_kv(args.errors).items():
+        rate, _, status = spec.partition(":")
+        config.setdefault(service, {})["error_rate"] = float(rate)
+        if status:
+            config[service]["error_status"] = int(status)
+    return config
+
+
+def _start(cmd: list[str], env: dict) -> subprocess.Popen:
+    return subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+
+
+async def _wait_healthy(url: str, proc: subprocess.Popen, timeout: float = 30.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            if proc.poll() is not None:
+                raise RuntimeError(f"{url} exited early:\n{proc.stderr.read().decode()[-2000:]}")
+            try:
+                if (await client.get(url)).status_code < 500:
+                    return
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(0.1)
+    raise RuntimeError(f"Timed out waiting for {url}")
+
+
+def _percentile(sorted_ms: list[float], pct: float) -> float:
+    if not sorted_ms:
+        return 0.0
+    k = max(0, min(len(sorted_ms) - 1, round(pct / 100 * len(sorted_ms) + 0.5) - 1))
+    return round(sorted_ms[k], 2)
+
+
+def _summarize(latencies: list[float], errors: int, elapsed: float) -> dict:
+    ms = sorted(latencies)
+    return {
+        "requests": len(ms),
+        "errors": errors,
+        "throughput_rps": round(len(ms) / elapsed, 2) if elapsed else 0.0,
+        "mean_ms": round(sum(ms) / len(ms), 2) if ms else 0.0,
+        "p50_ms": _percentile(ms, 50),
+        "p95_ms": _percentile(ms, 95),
+        "p99_ms": _percentile(ms, 99),
+        "max_ms": round(ms[-1], 2) if ms else 0.0,
+    }
+
+
+class LoadTest:
+    def __init__(self, args, app_url: str, fakes_url: str):
+        self.args = args
+        self.app_url = app_url
+        self.fakes_url = fakes_url
+        self.users: list[dict] = []
+        self.counter = itertools.count()
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+        self.rnd = random.Random(args.seed)
+
+    def _target_url(self) -> str:
+        n = next(self.counter)
+        site = self.rnd.choice(["instagram", "twitter", "youtube", "blog"])
+        if site == "instagram":
+            return f"{self.fakes_url}/site/instagram.com/p/LT{n}x/"
+        if site == "twitter":
+            return f"{self.fakes_url}/site/twitter.com/someone/status/{10_000 + n}"
+        if site == "youtube":
+            return f"{self.fakes_url}/site/youtube.com/watch?v=vid{n:08d}"
+        return f"{self.fakes_url}/site/blog/post-{n}"
+
+    async def register_users(self):
+        for i in range(self.args.users):
+            number = f"+1555{os.getpid() % 1000:03d}{i:04d}"
+            async with httpx.AsyncClient(base_url=self.app_url) as client:
+                resp = await client.post(
+                    "/register",
+                    data={"name": f"Load {i}", "whatsapp_number": number, "password": "loadtest"},
+                )
+                if resp.status_code != 302 or "session" not in resp.cookies:
+                    raise RuntimeError(f"Registering {number} failed: {resp.status_code}")
+                self.users.append({"number": number, "session": resp.cookies["session"]})
+
+    async def _one(self, client: httpx.AsyncClient, scenario: str):
+        user = self.rnd.choice(self.users)
+        cookies = {"session": user["session"]}
+        if scenario == "webhook":
+            return await client.post("/webhook/whatsapp", data={
+                "From": f"whatsapp:{user['number']}",
+                "Body": f"check this {self._target_url()}",
+                "MessageSid": f"SM{os.urandom(16).hex()}",
+            })
+        if scenario == "chat":
+            return await client.post("/chat/send", json={"message": self._target_url()}, cookies=cookies)
+        if scenario == "dashboard":
+            return await client.get("/dashboard", cookies=cookies)
+        if scenario == "search":
+            return await client.get("/dashboard", params={"q": self.rnd.choice(_SEARCH_TERMS)}, cookies=cookies)
+        raise ValueError(scenario)
+
+    async def _worker(self, weights: dict[str, float], deadline: float):
+        names, w = list(weights), list(weights.values())
+        async with httpx.AsyncClient(base_url=self.app_url, timeout=60.0) as client:
+            while time.monotonic() < deadline:
+                scenario = self.rnd.choices(names, w)[0]
+                started = time.perf_counter()
+                try:
+                    resp = await self._one(client, scenario)
+                    ok = resp.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                elapsed_ms = (time.perf_counter() - started) * 1000
+                self.latencies.setdefault(scenario, []).append(elapsed_ms)
+                if not ok:
+                    self.errors[scenario] = self.errors.get(scenario, 0) + 1
+
+    async def run(self) -> dict:
+        weights = {k: float(v) for k, v in _parse_kv([self.args.mix]).items()}
+        await self.register_users()
+        started = time.monotonic()
+        deadline = started + self.args.duration
+        await asyncio.gather(*(self._worker(weights, deadline) for _ in range(self.args.concurrency)))
+        elapsed = time.monotonic() - started
+
+        all_ms = [ms for values in self.latencies.values() for ms in values]
+        return {
+            "scenarios": {
+                name: _summarize(values, self.errors.get(name, 0), elapsed)
+                for name, values in sorted(self.latencies.items())
+            },
+            "total": _summarize(all_ms, sum(self.errors.values()), elapsed),
+            "elapsed_seconds": round(elapsed, 2),
+        }
+
+
+def _git_commit() -> str:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return "unknown"
+
+
+def _print_report(result: dict, previous: dict | None = None):
+    print(f"\n{'scenario':<10} {'reqs':>6} {'err':>5} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    rows = {**result["scenarios"], "TOTAL": result["total"]}
+    prev_rows = {**previous["scenarios"], "TOTAL": previous["total"]} if previous else {}
+    for name, r in rows.items():
+        print(
+            f"{name:<10} {r['requests']:>6} {r['errors']:>5} {r['throughput_rps']:>8.1f} "
+            f"{r['p50_ms']:>8.0f}ms {r['p95_ms']:>8.0f}ms {r['p99_ms']:>8.0f}ms"
+        )
+        if name in prev_rows:
+            p = prev_rows[name]
+
+            def delta(key):
+                return f"{(r[key] - p[key]) / p[key] * 100:+.0f}%" if p[key] else "n/a"
+
+            print(
+                f"{'  vs prev':<10} {'':>6} {'':>5} {delta('throughput_rps'):>8} "
+                f"{delta('p50_ms'):>9} {delta('p95_ms'):>9} {delta('p99_ms'):>9}"
+            )
+
+
+async def main(args) -> dict:
+    fakes_port, app_port = _free_port(), _free_port()
+    fakes_url = f"http://127.0.0.1:{fakes_port}"
+    app_url = f"http://127.0.0.1:{app_port}"
+    workdir = tempfile.mkdtemp(prefix="social-saver-load-")
+
+    fakes_env = {**os.environ, "FAKE_CONFIG": json.dumps(_fake_config(args))}
+    app_env = {
+        **os.environ,
+        "DATABASE_URL": "",
+        "SQLITE_PATH": os.path.join(workdir, "load.db"),
+        "THUMB_CACHE_DIR": os.path.join(workdir, "thumbs"),
+        "REFRESH_ENABLED": "0",
+        "GEMINI_API_KEY": "fake-key",
+        "GEMINI_API_ENDPOINT": f"{fakes_url}/gemini",
+        "GROQ_API_KEY": "fake-key",
+        "GROQ_API_URL": f"{fakes_url}/groq/chat/completions",
+        "INSTAGRAM_OEMBED_URL": f"{fakes_url}/instagram/oembed/",
+        "TWITTER_OEMBED_URL": f"{fakes_url}/twitter/oembed",
+        "YOUTUBE_OEMBED_URL": f"{fakes_url}/youtube/oembed",
+        "YOUTUBE_THUMBNAIL_URL": f"{fakes_url}/img/{{id}}.gif",
+        # Every fake lives on one host:port, so lift the per-host outbound limit for it
+        "OUTBOUND_LIMITS": f"127.0.0.1:{fakes_port}=10000:10000:1000",
+    }
+    uvicorn = [sys.executable, "-m", "uvicorn", "--log-level", "warning", "--host", "127.0.0.1"]
+    fakes = _start(uvicorn + ["--port", str(fakes_port), "benchmarks.fakes:app"], fakes_env)
+    server = _start(uvicorn + ["--port", str(app_port), "app.main:app"], app_env)
+    try:
+        await _wait_healthy(f"{fakes_url}/docs", fakes)
+        await _wait_healthy(f"{app_url}/health", server)
+        print(f"[LOAD] app={app_url} fakes={fakes_url} concurrency={args.concurrency} duration={args.duration}s")
+        result = await LoadTest(args, app_url, fakes_url).run()
+    finally:
+        for proc in (server, fakes):
+            proc.terminate()
+            try:
+                proc.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                proc.kill()
+
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "config": {
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "users": args.users,
+            "mix": args.mix,
+            "fakes": _fake_config(args),
+        },
+        **result,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--mix", default="webhook=4,chat=2,dashboard=3,search=1")
+    parser.add_argument("--latency", action="append", default=[], help="service=ms, e.g. gemini=400")
+    parser.add_argument("--errors", action="append", default=[], help="service=rate[:status], e.g. groq=0.1:429")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--out", default=RESULTS_DIR, help="directory for the JSON result")
+    parser.add_argument("--compare", help="previous result JSON to diff against")
+    args = parser.parse_args()
+
+    result = asyncio.run(main(args))
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)
+    _print_report(result, previous)
+
+    os.makedirs(args.out, exist_ok=True)
+    path = os.path.join(args.out, f"loadtest-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json")
+    with open(path, "w") as f:
+        json.dump(result, f, indent=2)
+    print(f"\n[LOAD] Results written to {path}")
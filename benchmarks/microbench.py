@@ -0,0 +1,179 @@
+"""
+Microbenchmarks for the pure functions on the per-message hot path, checked
+against stored baselines.
+
+Each benchmark runs a function over a realistic corpus from benchmarks/corpora/
+(real share URLs, WhatsApp messages, LLM outputs with and without code fences,
+long captions, search queries) and records the best-of-N time per call.
+
+Baselines live in benchmarks/baselines/microbench.json together with a
+calibration timing of a fixed pure-Python workload, so a run on a faster or
+slower machine is scaled before comparing. The run fails (exit 1) when any
+function is slower than its scaled baseline by more than --tolerance.
+
+Usage:
+  python benchmarks/microbench.py                  # check against baselines
+  python benchmarks/microbench.py --update         # re-record baselines
+  python benchmarks/microbench.py --only normalize_url --tolerance 0.25
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("REFRESH_ENABLED", "0")
+
+from app.scrapers import normalize_url, detect_platform, extract_url  # noqa: E402
+from app.ai import parse_ai_response, try_keyword_fallback  # noqa: E402
+from app.session_store import is_weak_text, build_mcq  # noqa: E402
+from app.routes.dashboard import _build_search_query  # noqa: E402
+
+CORPORA = os.path.join(ROOT, "benchmarks", "corpora")
+BASELINE_PATH = os.path.join(ROOT, "benchmarks", "baselines", "microbench.json")
+
+
+def _lines(name: str) -> list[str]:
+    with open(os.path.join(CORPORA, name), encoding="utf-8") as f:
+        return [line.rstrip("\n") for line in f]
+
+
+def _json(name: str) -> list:
+    with open(os.path.join(CORPORA, name), encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _run_coroutine(coro):
+    """Drive a coroutine that never actually suspends, without event-loop overhead."""
+    try:
+        coro.send(None)
+    except StopIteration as stop:
+        return stop.value
+    raise RuntimeError("coroutine suspended")
+
+
+def _keyword_fallback(text: str):
+    return _run_coroutine(try_keyword_fallback(text))
+
+
+def benchmarks() -> dict[str, tuple]:
+    """name → (callable, corpus)."""
+    urls = [u for u in _lines("share_urls.txt") if u]
+    messages = [m for m in _lines("messages.txt") if m]
+    llm_outputs = _json("llm_outputs.json")
+    captions = _json("captions.json")
+    queries = _lines("search_queries.txt")
+    platforms = ["instagram", "twitter", "youtube", "blog", ""]
+    return {
+        "normalize_url": (normalize_url, urls),
+        "detect_platform": (detect_platform, urls),
+        "extract_url": (extract_url, messages),
+        "parse_ai_response": (parse_ai_response, llm_outputs),
+        "is_weak_text": (is_weak_text, captions),
+        "build_mcq": (build_mcq, platforms),
+        "_build_search_query": (lambda q: _build_search_query(q, "user_id = ?", [1]), queries),
+        "try_keyword_fallback": (_keyword_fallback, captions),
+    }
+
+
+def _time_per_call(fn, corpus: list, min_time: float = 0.2, repeats: int = 5) -> float:
+    """Best-of-`repeats` nanoseconds per call over the whole corpus."""
+    # Pick a loop count so one repeat takes about min_time / repeats
+    number = 1
+    while True:
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            for item in corpus:
+                fn(item)
+        elapsed = time.perf_counter_ns() - start
+        if elapsed >= min_time * 1e9 / repeats:
+            break
+        number *= 2
+
+    best = elapsed
+    for _ in range(repeats - 1):
+        start = time.perf_counter_ns()
+        for _ in range(number):
+            for item in corpus:
+                fn(item)
+        best = min(best, time.perf_counter_ns() - start)
+    return best / (number * len(corpus))
+
+
+def _calibrate() -> float:
+    """ns for a fixed workload of string, dict and regex-free Python work."""
+    def work(_):
+        d = {}
+        for i in range(200):
+            d[str(i)] = f"{i}-{i * 7}".split("-")
+        return sorted(d)[:5]
+    return _time_per_call(work, [None], min_time=0.3)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--update", action="store_true", help="re-record the baselines")
+    parser.add_argument("--tolerance", type=float, default=0.5,
+                        help="allowed slowdown vs. baseline, as a fraction (0.5 = 50%%)")
+    parser.add_argument("--only", action="append", help="run only these benchmarks")
+    args = parser.parse_args()
+
+    selected = {k: v for k, v in benchmarks().items() if not args.only or k in args.only}
+    calibration = _calibrate()
+
+    results = {}
+    # try_keyword_fallback prints a line per call — keep the output readable
+    with contextlib.redirect_stdout(io.StringIO()):
+        for name, (fn, corpus) in selected.items():
+            results[name] = _time_per_call(fn, corpus)
+
+    if args.update:
+        baseline = {"calibration_ns": calibration, "benchmarks": {}}
+        if os.path.exists(BASELINE_PATH) and args.only:
+            with open(BASELINE_PATH) as f:
+                baseline = json.load(f)
+            # Re-express kept entries against this run's calibration
+            scale = calibration / baseline["calibration_ns"]
+            baseline["benchmarks"] = {k: v * scale for k, v in baseline["benchmarks"].items()}
+            baseline["calibration_ns"] = calibration
+        baseline["benchmarks"].update({k: round(v, 1) for k, v in results.items()})
+        os.makedirs(os.path.dirname(BASELINE_PATH), exist_ok=True)
+        with open(BASELINE_PATH, "w") as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write("\n")
+        for name, ns in results.items():
+            print(f"{name:<24} {ns / 1000:>10.2f} µs/call  (recorded)")
+        print(f"\nBaselines written to {BASELINE_PATH}")
+        return 0
+
+    with open(BASELINE_PATH) as f:
+        baseline = json.load(f)
+    scale = calibration / baseline["calibration_ns"]
+    print(f"machine speed factor vs. baseline: {scale:.2f}x\n")
+
+    failed = []
+    for name, ns in results.items():
+        base = baseline["benchmarks"].get(name)
+        if base is None:
+            print(f"{name:<24} {ns / 1000:>10.2f} µs/call  (no baseline)")
+            continue
+        expected = base * scale
+        ratio = ns / expected
+        status = "ok"
+        if ratio > 1 + args.tolerance:
+            status = "REGRESSION"
+            failed.append(name)
+        print(f"{name:<24} {ns / 1000:>10.2f} µs/call  baseline {expected / 1000:>8.2f}  {ratio:>5.2f}x  {status}")
+
+    if failed:
+        print(f"\n{len(failed)} benchmark(s) slower than baseline by more than {args.tolerance:.0%}: {', '.join(failed)}")
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+Payload size check.
+
+Boots the app in-process against a throwaway SQLite file, logs in a user with
+--links saved links, and fetches the dashboard, chat page, stats JSON and the
+stylesheet the pages link to — once with no Accept-Encoding and once as a
+browser would send it. Prints the bytes on the wire, the encoding and the
+Cache-Control for each, and exits 1 if any HTML page came back uncompressed.
+
+Usage:
+  python benchmarks/payload_size.py
+  python benchmarks/payload_size.py --links 200
+"""
+import argparse
+import os
+import re
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+os.chdir(ROOT)   # templates and static dirs are relative to the repo root
+_tmp = tempfile.TemporaryDirectory()
+os.environ["SQLITE_PATH"] = os.path.join(_tmp.name, "payload.db")
+os.environ["REFRESH_ENABLED"] = "0"
+os.environ.pop("DATABASE_URL", None)
+
+from fastapi.testclient import TestClient  # noqa: E402
+
+from app.main import app  # noqa: E402
+from app import pipeline  # noqa: E402
+
+BROWSER = "gzip, deflate, br"
+CATEGORIES = ["Fitness", "Coding", "Tech", "Food", "Travel", "Design", "Business", "Gaming", "Other"]
+
+
+def _wire_size(client: TestClient, path: str, accept_encoding: str) -> tuple[int, str, str]:
+    with client.stream("GET", path, headers={"Accept-Encoding": accept_encoding}) as r:
+        size = sum(len(chunk) for chunk in r.iter_raw())
+        return size, r.headers.get("content-encoding", "identity"), r.headers.get("cache-control", "-")
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=60)
+    args = parser.parse_args()
+
+    with TestClient(app) as client:
+        client.post("/register", data={"name": "Bench", "whatsapp_number": "+15550000045", "password": "bench"})
+        pipeline.insert_links(1, [
+            {"url": f"https://www.youtube.com/watch?v={i:011d}", "platform": "youtube",
+             "extracted_text": f"Video number {i} — a description of what happens in video {i}",
+             "summary": f"A saved video about topic {i}.", "category": CATEGORIES[i % len(CATEGORIES)],
+             "tags": "video, tutorial, saved"}
+            for i in range(args.links)
+        ])
+        stylesheet = re.search(r'href="([^"]+\.css)"', client.get("/dashboard").text).group(1)
+
+        failed = False
+        print(f"{'path':<34} {'identity':>10} {'browser':>10}  encoding  cache-control")
+        for path in ("/dashboard", "/chat", "/dashboard/stats", stylesheet):
+            plain, _, _ = _wire_size(client, path, "identity")
+            packed, encoding, cache = _wire_size(client, path, BROWSER)
+            if path in ("/dashboard", "/chat") and encoding == "identity":
+                failed = True
+            print(f"{path:<34} {plain:>9,}B {packed:>9,}B  {encoding:<8}  {cache}")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,161 @@
+"""
+SQLite concurrency benchmark.
+
+Runs the same mixed workload against a fresh SQLite file once per
+SQLITE_MODE ("legacy": a rollback-journal connection per get_db() call;
+"wal": WAL journal, pooled query-only readers, one shared writer). Reader
+threads do what the dashboard does (the link list plus the stats rollup);
+writer threads save new links through pipeline.insert_link(). Each mode runs
+in its own process so the module-level connection state starts clean.
+
+Reports reads/s, writes/s, p95 latency and how many operations failed with
+"database is locked". Exits 1 if WAL mode has lock errors or serves fewer
+reads per second than legacy mode.
+
+Usage:
+  python benchmarks/sqlite_concurrency.py
+  python benchmarks/sqlite_concurrency.py --readers 16 --writers 4 --seconds 10
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+MODES = ("legacy", "wal")
+SEED_LINKS = 2000
+CATEGORIES = ["Fitness", "Coding", "Tech", "Food", "Travel", "Design", "Business", "Gaming", "Other"]
+
+
+def _p95(samples: list[float]) -> float:
+    if not samples:
+        return 0.0
+    samples = sorted(samples)
+    return samples[int(len(samples) * 0.95)] * 1000
+
+
+def _child(args) -> dict:
+    sys.path.insert(0, ROOT)
+    from app.database import init_db, get_db
+    from app import pipeline, stats
+
+    init_db()
+    conn = get_db()
+    conn.execute(
+        "INSERT INTO users (id, name, whatsapp_number, password_hash) VALUES (1, 'bench', '+15550000001', 'x')"
+    )
+    conn.commit()
+    conn.close()
+    pipeline.insert_links(1, [
+        {"url": f"https://example.com/seed/{i}", "platform": "blog", "extracted_text": "seed text " * 20,
+         "summary": f"Seed link {i}.", "category": CATEGORIES[i % len(CATEGORIES)], "tags": "seed"}
+        for i in range(SEED_LINKS)
+    ])
+
+    deadline = time.perf_counter() + args.seconds
+    results = {"reads": [], "writes": [], "read_errors": 0, "write_errors": 0, "locked": 0}
+    lock = threading.Lock()
+
+    def record(kind: str, elapsed: float | None, error: Exception | None = None):
+        with lock:
+            if error is None:
+                results[kind + "s"].append(elapsed)
+                return
+            results[kind + "_errors"] += 1
+            if "locked" in str(error):
+                results["locked"] += 1
+
+    def reader():
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            try:
+                conn = get_db(readonly=True)
+                conn.execute(
+                    "SELECT * FROM saved_links WHERE user_id = ? ORDER BY saved_at DESC LIMIT 50", (1,)
+                ).fetchall()
+                conn.close()
+                stats.get_stats(1)
+            except Exception as e:
+                record("read", None, e)
+                continue
+            record("read", time.perf_counter() - started)
+
+    def writer(n: int):
+        i = 0
+        while time.perf_counter() < deadline:
+            i += 1
+            started = time.perf_counter()
+            try:
+                pipeline.insert_link(
+                    1, f"https://example.com/w{n}/{i}", "blog", "written text " * 20,
+                    f"Written link {i}.", CATEGORIES[i % len(CATEGORIES)], None, "bench",
+                )
+            except Exception as e:
+                record("write", None, e)
+                continue
+            record("write", time.perf_counter() - started)
+
+    threads = [threading.Thread(target=reader) for _ in range(args.readers)]
+    threads += [threading.Thread(target=writer, args=(n,)) for n in range(args.writers)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    return {
+        "reads_per_s": len(results["reads"]) / args.seconds,
+        "writes_per_s": len(results["writes"]) / args.seconds,
+        "read_p95_ms": _p95(results["reads"]),
+        "write_p95_ms": _p95(results["writes"]),
+        "errors": results["read_errors"] + results["write_errors"],
+        "locked": results["locked"],
+    }
+
+
+def _run_mode(mode: str, args) -> dict:
+    with tempfile.TemporaryDirectory() as tmp:
+        env = {**os.environ, "SQLITE_MODE": mode, "SQLITE_PATH": os.path.join(tmp, "bench.db"),
+               "PYTHONPATH": ROOT}
+        env.pop("DATABASE_URL", None)
+        out = subprocess.run(
+            [sys.executable, __file__, "--child",
+             "--readers", str(args.readers), "--writers", str(args.writers), "--seconds", str(args.seconds)],
+            cwd=ROOT, env=env, capture_output=True, text=True, check=True,
+        ).stdout
+    return json.loads(out.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--readers", type=int, default=8)
+    parser.add_argument("--writers", type=int, default=2)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        # The app logs slow queries and migrations to stdout; the result is the last line
+        print(json.dumps(_child(args)))
+        return 0
+
+    print(f"{args.readers} readers + {args.writers} writers for {args.seconds:g}s per mode")
+    results = {}
+    for mode in MODES:
+        r = results[mode] = _run_mode(mode, args)
+        print(
+            f"{mode:<7} reads {r['reads_per_s']:>8.1f}/s (p95 {r['read_p95_ms']:>6.1f} ms)   "
+            f"writes {r['writes_per_s']:>7.1f}/s (p95 {r['write_p95_ms']:>6.1f} ms)   "
+            f"errors {r['errors']} ({r['locked']} locked)"
+        )
+    wal, legacy = results["wal"], results["legacy"]
+    ok = wal["locked"] == 0 and wal["reads_per_s"] >= legacy["reads_per_s"]
+    print("ok" if ok else "WAL mode regressed")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
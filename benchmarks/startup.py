@@ -0,0 +1,113 @@
+"""
+Cold-start benchmark.
+
+Launches the app under uvicorn with `python -X importtime`, polls /health and
+reports the wall time from process spawn until the first 200, followed by the
+slowest imports (self time summed per package, per module for app.*) taken
+from the interpreter's own import trace.
+
+Each run uses a fresh SQLite file, so the first boot includes the schema
+migrations; --runs N boots again against the same file to show the warm-schema
+case (only the schema_version check runs).
+
+Usage:
+  python benchmarks/startup.py
+  python benchmarks/startup.py --runs 3 --top 20
+"""
+import argparse
+import os
+import re
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_IMPORT_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+
+def _free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def _boot(db_path: str, timeout: float) -> tuple[float, str]:
+    """Start the app, wait for /health, stop it. Returns (seconds, importtime stderr)."""
+    port = _free_port()
+    env = {
+        **os.environ,
+        "SQLITE_PATH": db_path,
+        "REFRESH_ENABLED": "0",
+        "PYTHONPATH": ROOT,
+    }
+    env.pop("DATABASE_URL", None)
+    cmd = [sys.executable, "-X", "importtime", "-m", "uvicorn", "--log-level", "warning",
+           "--host", "127.0.0.1", "--port", str(port), "app.main:app"]
+    stderr = tempfile.TemporaryFile()
+    started = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=stderr)
+    try:
+        url = f"http://127.0.0.1:{port}/health"
+        while True:
+            if proc.poll() is not None:
+                stderr.seek(0)
+                raise RuntimeError(f"app exited during startup:\n{stderr.read().decode()[-2000:]}")
+            if time.perf_counter() - started > timeout:
+                raise RuntimeError(f"/health did not respond within {timeout}s")
+            try:
+                with urllib.request.urlopen(url, timeout=1) as resp:
+                    if resp.status == 200:
+                        elapsed = time.perf_counter() - started
+                        break
+            except OSError:
+                time.sleep(0.01)
+    finally:
+        proc.terminate()
+        proc.wait(timeout=10)
+    stderr.seek(0)
+    return elapsed, stderr.read().decode(errors="replace")
+
+
+def _import_breakdown(trace: str) -> dict[str, float]:
+    """Import seconds per package (per module for the app's own code), summed from
+    each module's self time so nested imports are not double counted."""
+    totals: dict[str, float] = {}
+    for line in trace.splitlines():
+        m = _IMPORT_LINE.match(line)
+        if not m:
+            continue
+        self_us, _, _, module = m.groups()
+        key = module if module.startswith("app.") else module.split(".")[0]
+        totals[key] = totals.get(key, 0.0) + int(self_us) / 1e6
+    return totals
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=2, help="boots against the same DB file (first one migrates)")
+    parser.add_argument("--top", type=int, default=15, help="imports to list")
+    parser.add_argument("--timeout", type=float, default=60.0)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = os.path.join(tmp, "startup.db")
+        for run in range(args.runs):
+            elapsed, trace = _boot(db_path, args.timeout)
+            label = "fresh schema" if run == 0 else "schema current"
+            print(f"run {run + 1} ({label}): /health after {elapsed * 1000:.0f} ms")
+            if run == 0:
+                breakdown = _import_breakdown(trace)
+                total = sum(breakdown.values())
+                print(f"\nimports: {total * 1000:.0f} ms total (self time per package)")
+                for name, secs in sorted(breakdown.items(), key=lambda kv: -kv[1])[:args.top]:
+                    print(f"  {name:<28} {secs * 1000:>8.1f} ms")
+                print()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
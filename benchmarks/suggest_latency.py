@@ -0,0 +1,97 @@
+"""
+Suggestion latency check.
+
+Seeds a throwaway SQLite database with one user's library (titles, summaries,
+tags), then measures app.suggest: the one-off index build on the first
+keystroke, and the per-keystroke lookup for every 1–3 letter prefix once the
+index is warm. Exits 1 if the p99 lookup exceeds --max-ms.
+
+Usage:
+  python benchmarks/suggest_latency.py
+  python benchmarks/suggest_latency.py --links 50000 --max-ms 2
+"""
+import argparse
+import os
+import random
+import statistics
+import string
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_tmp = tempfile.TemporaryDirectory()
+os.environ["SQLITE_PATH"] = os.path.join(_tmp.name, "suggest.db")
+os.environ.pop("DATABASE_URL", None)
+
+from app.database import init_db, get_db  # noqa: E402
+from app import pipeline, suggest  # noqa: E402
+
+CATEGORIES = ["Fitness", "Coding", "Tech", "Food", "Travel", "Design", "Business", "Gaming", "Other"]
+
+
+def _vocabulary(rng: random.Random, n: int) -> list[str]:
+    return ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(3, 10))) for _ in range(n)]
+
+
+def _seed(n: int):
+    rng = random.Random(7)
+    vocab = _vocabulary(rng, 5000)
+    conn = get_db()
+    conn.execute("INSERT INTO users (id, name, whatsapp_number, password_hash) VALUES (1, 'bench', '+15550000001', 'x')")
+    conn.commit()
+    conn.close()
+    batch = []
+    for i in range(n):
+        title = " ".join(rng.choices(vocab, k=6))
+        batch.append({
+            "url": f"https://www.youtube.com/watch?v={i:011d}",
+            "platform": "youtube",
+            "extracted_text": f"{title} — " + " ".join(rng.choices(vocab, k=40)),
+            "summary": " ".join(rng.choices(vocab, k=12)) + ".",
+            "category": CATEGORIES[i % len(CATEGORIES)],
+            "tags": ", ".join(rng.choices(vocab[:300], k=4)),
+        })
+        if len(batch) == 500:
+            pipeline.insert_links(1, batch)
+            batch = []
+    pipeline.insert_links(1, batch)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=10_000)
+    parser.add_argument("--max-ms", type=float, default=5.0, help="allowed p99 lookup time")
+    args = parser.parse_args()
+
+    init_db()
+    print(f"Seeding {args.links:,} links…")
+    _seed(args.links)
+
+    started = time.perf_counter()
+    suggest.suggest(1, "a")
+    build_ms = (time.perf_counter() - started) * 1000
+    index = suggest._cache[1]
+
+    prefixes = list(string.ascii_lowercase)
+    prefixes += [a + b for a in string.ascii_lowercase for b in string.ascii_lowercase]
+    prefixes += ["".join(random.Random(i).choices(string.ascii_lowercase, k=3)) for i in range(500)]
+    timings = []
+    for prefix in prefixes:
+        started = time.perf_counter()
+        suggest.suggest(1, f"some words {prefix}")
+        timings.append((time.perf_counter() - started) * 1000)
+    timings.sort()
+    p50 = statistics.median(timings)
+    p99 = timings[int(len(timings) * 0.99)]
+
+    print(f"index: {len(index.terms):,} terms, ~{index.size / 1e6:.1f} MB, built in {build_ms:.0f} ms")
+    print(f"lookup over {len(prefixes)} prefixes: p50 {p50:.3f} ms  p99 {p99:.3f} ms  max {timings[-1]:.3f} ms")
+    ok = p99 <= args.max_ms
+    print("ok" if ok else f"p99 above {args.max_ms} ms")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
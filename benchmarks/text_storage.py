@@ -0,0 +1,135 @@
+"""
+Text storage benchmark.
+
+Seeds a throwaway SQLite database with one user's library laid out the old way
+(full extracted_text inline in saved_links), then runs the link_text backfill
+and compares, before and after:
+
+  - on-disk size of saved_links and link_text (dbstat, after VACUUM)
+  - the dashboard listing query (all of a user's links, newest first) — median
+    wall time over --repeats runs
+
+Captions are random draws from a word list, so they compress about as well as
+real scraped text rather than as well as a repeated string would.
+
+Usage:
+  python benchmarks/text_storage.py
+  python benchmarks/text_storage.py --links 50000 --chars 3000
+"""
+import argparse
+import os
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+_tmp = tempfile.TemporaryDirectory()
+os.environ["SQLITE_PATH"] = os.path.join(_tmp.name, "text.db")
+os.environ.pop("DATABASE_URL", None)
+
+from app.database import init_db, DB_PATH  # noqa: E402
+from app import textstore  # noqa: E402
+
+CATEGORIES = ["Fitness", "Coding", "Tech", "Food", "Travel", "Design", "Business", "Gaming", "Other"]
+WORDS = (
+    "the a to and of in for on with this that your how why best new easy quick guide tips "
+    "workout routine morning python code tutorial recipe travel design startup game review "
+    "build learn watch thread video post photo day week year first last every more most "
+    "#fitness #coding #food #travel #design #tech @creator https://t.co/x1y2z3 🔥 ✨ 💪"
+).split()
+
+LISTING_SQL = "SELECT * FROM saved_links WHERE user_id = ? ORDER BY saved_at DESC"
+
+
+def _seed(n: int, chars: int):
+    rng = random.Random(42)
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("INSERT INTO users (id, name, whatsapp_number, password_hash) VALUES (1, 'bench', '+15550000001', 'x')")
+
+    def caption() -> str:
+        words, size = [], 0
+        target = rng.randint(chars // 4, chars)
+        while size < target:
+            w = rng.choice(WORDS)
+            words.append(w)
+            size += len(w) + 1
+        return " ".join(words)
+
+    conn.executemany(
+        """INSERT INTO saved_links
+           (user_id, original_url, platform, extracted_text, ai_summary, category, thumbnail_url, tags, saved_at)
+           VALUES (1, ?, 'instagram', ?, ?, ?, ?, 'fitness, morning', ?)""",
+        (
+            (
+                f"https://www.instagram.com/p/{i:08d}/",
+                caption(),
+                f"A saved post about topic number {i}.",
+                CATEGORIES[i % len(CATEGORIES)],
+                f"https://cdn.example.com/thumb/{i}.jpg",
+                f"2026-{1 + i % 12:02d}-{1 + i % 28:02d} 12:{i % 60:02d}:00",
+            )
+            for i in range(n)
+        ),
+    )
+    conn.commit()
+    conn.close()
+
+
+def _measure(repeats: int) -> dict:
+    conn = sqlite3.connect(DB_PATH)
+    conn.execute("VACUUM")
+    sizes = dict(conn.execute("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name").fetchall())
+    conn.close()
+
+    timings = []
+    for _ in range(repeats):
+        conn = sqlite3.connect(DB_PATH)   # cold connection each time, like a request
+        started = time.perf_counter()
+        conn.execute(LISTING_SQL, (1,)).fetchall()
+        timings.append(time.perf_counter() - started)
+        conn.close()
+    return {
+        "saved_links": sizes.get("saved_links", 0),
+        "link_text": sizes.get("link_text", 0),
+        "listing_ms": statistics.median(timings) * 1000,
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--links", type=int, default=20_000)
+    parser.add_argument("--chars", type=int, default=2000, help="max caption length")
+    parser.add_argument("--repeats", type=int, default=7)
+    args = parser.parse_args()
+
+    init_db()
+    print(f"Seeding {args.links:,} links with captions up to {args.chars} chars…")
+    _seed(args.links, args.chars)
+    before = _measure(args.repeats)
+
+    started = time.perf_counter()
+    moved = textstore.migrate_all()
+    backfill_s = time.perf_counter() - started
+    after = _measure(args.repeats)
+
+    mb = 1e6
+    print(f"backfill: {moved:,} rows in {backfill_s:.2f}s")
+    print(f"{'':<8} {'saved_links':>12} {'link_text':>10} {'total':>8} {'listing':>10}")
+    for label, r in (("inline", before), ("split", after)):
+        print(
+            f"{label:<8} {r['saved_links'] / mb:>9.1f} MB {r['link_text'] / mb:>7.1f} MB "
+            f"{(r['saved_links'] + r['link_text']) / mb:>5.1f} MB {r['listing_ms']:>7.1f} ms"
+        )
+    print(
+        f"saved_links {before['saved_links'] / after['saved_links']:.1f}x smaller, "
+        f"listing {before['listing_ms'] / after['listing_ms']:.1f}x faster"
+    )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
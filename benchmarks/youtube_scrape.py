@@ -0,0 +1,133 @@
+"""
+YouTube scrape cost: full watch page vs the oEmbed fast path.
+
+Starts the upstream fakes (benchmarks/fakes.py, whose watch pages are ~1.1 MB
+like YouTube's) in-process and scrapes --videos distinct video URLs three ways:
+
+  page         the full watch page + BeautifulSoup, as every save did before
+  oembed       the fast path for a title that needs no description
+  oembed+head  the fast path plus the byte-limited head read for the description
+
+For each it prints bytes downloaded per save (counted on the client) and the
+p50 / p95 latency per save, and exits 1 if the fast path isn't at least 10x
+smaller than the page.
+
+Usage:
+  python benchmarks/youtube_scrape.py
+  python benchmarks/youtube_scrape.py --videos 50 --latency-ms 80
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import sys
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+PORT = 9148
+FAKES = f"http://127.0.0.1:{PORT}"
+os.environ["YOUTUBE_OEMBED_URL"] = f"{FAKES}/youtube/oembed"
+os.environ["YOUTUBE_THUMBNAIL_URL"] = f"{FAKES}/img/{{id}}.gif"
+os.environ["OUTBOUND_LIMITS"] = f"127.0.0.1:{PORT}=10000:10000:1000"
+
+import httpx  # noqa: E402
+
+_responses: list[httpx.Response] = []
+
+
+class _CountingClient(httpx.AsyncClient):
+    """Remembers every response so the bytes actually pulled off the wire can be summed."""
+
+    async def send(self, request, **kwargs):
+        response = await super().send(request, **kwargs)
+        _responses.append(response)
+        return response
+
+
+httpx.AsyncClient = _CountingClient
+
+
+def _start_fakes(latency_ms: float):
+    os.environ["FAKE_CONFIG"] = json.dumps({"*": {"latency_ms": latency_ms, "jitter_ms": latency_ms / 5}})
+    import uvicorn
+    from benchmarks.fakes import app as fakes_app
+
+    server = uvicorn.Server(uvicorn.Config(fakes_app, port=PORT, log_level="error"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.05)
+    return server
+
+
+async def _measure(label: str, scrape, urls: list[str]) -> dict:
+    sizes, timings = [], []
+    for url in urls:
+        _responses.clear()
+        started = time.perf_counter()
+        result = await scrape(url)
+        timings.append((time.perf_counter() - started) * 1000)
+        sizes.append(sum(r.num_bytes_downloaded for r in _responses))
+        assert result["text"], f"{label}: no text for {url}"
+    timings.sort()
+    return {
+        "label": label,
+        "bytes": statistics.mean(sizes),
+        "p50": statistics.median(timings),
+        "p95": timings[int(len(timings) * 0.95)],
+    }
+
+
+async def _run(videos: int) -> list[dict]:
+    from app.scrapers import youtube
+
+    async def page(url):
+        async with httpx.AsyncClient(follow_redirects=True, timeout=10.0) as client:
+            return await youtube._page(client, url, None)
+
+    async def fast(url):
+        return await youtube.scrape_youtube(url)
+
+    async def fast_with_head(url):
+        youtube.YOUTUBE_DESCRIBE_BELOW_CHARS = 10_000
+        try:
+            return await youtube.scrape_youtube(url)
+        finally:
+            youtube.YOUTUBE_DESCRIBE_BELOW_CHARS = 30
+
+    def urls(tag: str) -> list[str]:
+        return [f"{FAKES}/site/youtube.com/watch?v={tag}{i:08d}" for i in range(videos)]
+
+    return [
+        await _measure("page", page, urls("pag")),
+        await _measure("oembed", fast, urls("oem")),
+        await _measure("oembed+head", fast_with_head, urls("hed")),
+    ]
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--videos", type=int, default=30)
+    parser.add_argument("--latency-ms", type=float, default=50, help="fake upstream latency per request")
+    args = parser.parse_args()
+
+    server = _start_fakes(args.latency_ms)
+    try:
+        rows = asyncio.run(_run(args.videos))
+    finally:
+        server.should_exit = True
+
+    print(f"{'path':<12} {'bytes/save':>12} {'p50 ms':>8} {'p95 ms':>8}")
+    for row in rows:
+        print(f"{row['label']:<12} {row['bytes']:>12,.0f} {row['p50']:>8.1f} {row['p95']:>8.1f}")
+    page, fast = rows[0], rows[1]
+    ok = fast["bytes"] * 10 <= page["bytes"]
+    print("ok" if ok else "fast path is not 10x smaller than the page")
+    return 0 if ok else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
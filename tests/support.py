@@ -0,0 +1,46 @@
+import os
+import sqlite3
+import tempfile
+from unittest import mock
+
+from app import database
+
+
+def temp_sqlite(case, init: bool = True) -> str:
+    """Point app.database at a fresh WAL-mode SQLite file for one test.
+
+    Everything is undone by the test's cleanups. Returns the database path.
+    """
+    tmp = tempfile.TemporaryDirectory()
+    case.addCleanup(tmp.cleanup)
+    path = os.path.join(tmp.name, "test.db")
+    writer, read_pool = database._Writer(), database._ReadPool(2)
+    for p in [
+        mock.patch.object(database, "DATABASE_URL", None),
+        mock.patch.object(database, "SQLITE_MODE", "wal"),
+        mock.patch.object(database, "DB_PATH", path),
+        mock.patch.object(database, "_writer", writer),
+        mock.patch.object(database, "_read_pool", read_pool),
+    ]:
+        p.start()
+        case.addCleanup(p.stop)
+    case.addCleanup(_close, writer, read_pool)
+    if init:
+        database.init_db()
+    return path
+
+
+def _close(writer, read_pool):
+    for conn in [writer._conn, *read_pool._idle]:
+        if conn is not None:
+            conn.close()
+
+
+def add_user(path: str, user_id: int = 1):
+    conn = sqlite3.connect(path)
+    conn.execute(
+        "INSERT INTO users (id, name, whatsapp_number, password_hash) VALUES (?, ?, ?, 'x')",
+        (user_id, f"user{user_id}", f"+1555{user_id:07d}"),
+    )
+    conn.commit()
+    conn.close()
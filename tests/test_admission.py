@@ -0,0 +1,70 @@
+import asyncio
+import unittest
+
+from app.admission import Busy, _Limiter
+
+
+class LimiterFairnessTest(unittest.TestCase):
+    def test_other_user_not_held_behind_a_burst(self):
+        """One user's queued burst must not keep another user out of idle slots."""
+
+        async def scenario():
+            limiter = _Limiter(8, 2, 64)
+            release = asyncio.Event()
+
+            async def save(user_id: int):
+                await limiter.acquire(user_id, None)
+                try:
+                    await release.wait()
+                finally:
+                    limiter.release(user_id)
+
+            burst = [asyncio.create_task(save(1)) for _ in range(7)]
+            await asyncio.sleep(0)
+            self.assertEqual((limiter.in_flight, limiter.queued), (2, 5))
+
+            await limiter.acquire(2, 0.5)       # Busy here would fail the test
+            self.assertEqual(limiter.in_flight, 3)
+            limiter.release(2)
+
+            release.set()
+            await asyncio.gather(*burst)
+            self.assertEqual((limiter.in_flight, limiter.queued, limiter.by_user), (0, 0, {}))
+
+        asyncio.run(scenario())
+
+    def test_round_robin_across_users(self):
+        async def scenario():
+            limiter = _Limiter(1, 1, 64)
+            order = []
+
+            async def save(user_id: int, n: int):
+                await limiter.acquire(user_id, None)
+                order.append((user_id, n))
+                await asyncio.sleep(0.01)
+                limiter.release(user_id)
+
+            tasks = [asyncio.create_task(save(1, n)) for n in range(3)]
+            await asyncio.sleep(0)
+            tasks += [asyncio.create_task(save(2, 0)), asyncio.create_task(save(3, 0))]
+            await asyncio.gather(*tasks)
+            self.assertLess(order.index((2, 0)), order.index((1, 2)))
+            self.assertLess(order.index((3, 0)), order.index((1, 2)))
+
+        asyncio.run(scenario())
+
+    def test_busy_when_no_slot_frees_up(self):
+        async def scenario():
+            limiter = _Limiter(1, 1, 64)
+            await limiter.acquire(1, None)
+            with self.assertRaises(Busy):
+                await limiter.acquire(2, 0.05)
+            self.assertEqual(limiter.queued, 0)
+            limiter.release(1)
+            self.assertEqual(limiter.in_flight, 0)
+
+        asyncio.run(scenario())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,122 @@
+import asyncio
+import sqlite3
+import threading
+import unittest
+from unittest import mock
+
+from app import database
+from support import temp_sqlite
+
+
+class WriterTest(unittest.TestCase):
+    """The shared SQLite write connection (WAL mode)."""
+
+    def setUp(self):
+        temp_sqlite(self, init=False)
+        busy = mock.patch.object(database, "SQLITE_BUSY_TIMEOUT_MS", 2000)
+        busy.start()
+        self.addCleanup(busy.stop)
+        with database.get_db() as conn:
+            conn.execute("CREATE TABLE t (v INTEGER)")
+            conn.commit()
+
+    def _values(self) -> list[int]:
+        conn = database.get_db(readonly=True)
+        rows = conn.execute("SELECT v FROM t ORDER BY v").fetchall()
+        conn.close()
+        return [r["v"] for r in rows]
+
+    def test_refused_on_the_event_loop(self):
+        async def on_loop():
+            with self.assertRaises(RuntimeError):
+                database.get_db()
+            # The same write through a worker thread is fine
+            await asyncio.to_thread(self._insert, 1)
+
+        asyncio.run(on_loop())
+        self.assertEqual(self._values(), [1])
+
+    def test_reads_allowed_on_the_event_loop(self):
+        async def on_loop():
+            return self._values()
+
+        self.assertEqual(asyncio.run(on_loop()), [])
+
+    def test_nested_write_on_same_thread_raises(self):
+        with database.get_db():
+            with self.assertRaises(RuntimeError):
+                database.get_db()
+        database.get_db().close()       # the outer close() released the lock
+
+    def test_threads_get_separate_transactions(self):
+        """A second thread waits for the first to close, and a rollback in one
+        never discards the other's writes."""
+        first_open = threading.Event()
+        release_first = threading.Event()
+        order = []
+
+        def first():
+            conn = database.get_db()
+            conn.execute("INSERT INTO t (v) VALUES (1)")
+            first_open.set()
+            release_first.wait(5)
+            order.append("first rolls back")
+            conn.close()                # uncommitted: rolled back
+
+        def second():
+            first_open.wait(5)
+            conn = database.get_db()    # blocks until first() closes
+            order.append("second writes")
+            conn.execute("INSERT INTO t (v) VALUES (2)")
+            conn.commit()
+            conn.close()
+
+        threads = [threading.Thread(target=first), threading.Thread(target=second)]
+        for t in threads:
+            t.start()
+        first_open.wait(5)
+        release_first.set()
+        for t in threads:
+            t.join(5)
+        self.assertEqual(order, ["first rolls back", "second writes"])
+        self.assertEqual(self._values(), [2])
+
+    def test_busy_timeout(self):
+        holder = database.get_db()
+        self.addCleanup(holder.close)
+        errors = []
+
+        def contender():
+            with mock.patch.object(database, "SQLITE_BUSY_TIMEOUT_MS", 50):
+                try:
+                    database.get_db()
+                except sqlite3.OperationalError as e:
+                    errors.append(e)
+
+        t = threading.Thread(target=contender)
+        t.start()
+        t.join(5)
+        self.assertEqual(len(errors), 1)
+
+    def test_close_from_another_thread_releases(self):
+        conn = database.get_db()
+        t = threading.Thread(target=conn.close)
+        t.start()
+        t.join(5)
+        self._insert(3)
+        self.assertEqual(self._values(), [3])
+
+    def test_context_manager_discards_uncommitted(self):
+        with database.get_db() as conn:
+            conn.execute("INSERT INTO t (v) VALUES (4)")
+        self.assertEqual(self._values(), [])
+
+    @staticmethod
+    def _insert(v: int):
+        with database.get_db() as conn:
+            conn.execute("INSERT INTO t (v) VALUES (?)", (v,))
+            conn.commit()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,70 @@
+import sqlite3
+import tracemalloc
+import unittest
+from unittest import mock
+
+from app import export
+from support import add_user, temp_sqlite
+
+
+class ExportTest(unittest.TestCase):
+    """Streaming /links/export generators against a throwaway SQLite database."""
+
+    def setUp(self):
+        self.path = temp_sqlite(self)
+        chunk = mock.patch.object(export, "EXPORT_CHUNK_SIZE", 50)
+        chunk.start()
+        self.addCleanup(chunk.stop)
+
+    def _seed(self, user_id: int, categories: list):
+        add_user(self.path, user_id)
+        conn = sqlite3.connect(self.path)
+        conn.executemany(
+            """INSERT INTO saved_links
+               (user_id, original_url, platform, extracted_text, ai_summary, category, tags, saved_at)
+               VALUES (?, ?, 'blog', ?, ?, ?, 'a, b', ?)""",
+            (
+                (
+                    user_id,
+                    f"https://example.com/post/{user_id}/{i}",
+                    "A fairly typical caption with a few hashtags #one #two " * 4,
+                    f"Summary of saved post number {i}.",
+                    category,
+                    f"2026-01-{1 + i % 28:02d} 12:00:00",
+                )
+                for i, category in enumerate(categories)
+            ),
+        )
+        conn.commit()
+        conn.close()
+
+    @staticmethod
+    def _peak(fmt: str, user_id: int) -> int:
+        tracemalloc.start()
+        try:
+            for _ in export.EXPORTERS[fmt](user_id):
+                pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_peak_memory_does_not_grow_with_library(self):
+        names = ["Fitness", "Coding", "Tech", "Food", "Other"]
+        self._seed(1, [names[i % len(names)] for i in range(200)])
+        self._seed(2, [names[i % len(names)] for i in range(2000)])
+        for fmt in export.EXPORTERS:
+            with self.subTest(fmt=fmt):
+                self._peak(fmt, 1)                      # warm caches and imports
+                small, big = self._peak(fmt, 1), self._peak(fmt, 2)
+                self.assertLess(big, small * 2, f"{fmt}: {small} B @ 200 → {big} B @ 2000")
+
+    def test_null_category_shares_the_other_folder(self):
+        self._seed(1, ["Tech", None, "Other", "Coding", None, "Other"])
+        html = "".join(export.export_html(1))
+        self.assertEqual(html.count("<H3>Other</H3>"), 1)
+        self.assertEqual(html.count("<H3>"), 3)
+        self.assertEqual(html.count("<DT><A "), 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,76 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from app import database, idempotency
+from support import temp_sqlite
+
+
+class IdempotencyTest(unittest.TestCase):
+    """WhatsApp webhook MessageSid claims and reply replay."""
+
+    def setUp(self):
+        temp_sqlite(self)
+
+    @staticmethod
+    def _age(message_sid: str, created_at: str = "2000-01-01 00:00:00"):
+        with database.get_db() as conn:
+            conn.execute(
+                "UPDATE webhook_messages SET created_at = ? WHERE message_sid = ?", (created_at, message_sid)
+            )
+            conn.commit()
+
+    def test_only_first_delivery_claims(self):
+        self.assertTrue(idempotency.claim("SM1"))
+        self.assertFalse(idempotency.claim("SM1"))
+        self.assertTrue(idempotency.claim("SM2"))
+
+    def test_completed_reply_is_replayed(self):
+        idempotency.claim("SM1")
+        idempotency.complete("SM1", "<Response>saved</Response>")
+        self.assertFalse(idempotency.claim("SM1"))
+        self.assertEqual(asyncio.run(idempotency.wait_for_reply("SM1")), "<Response>saved</Response>")
+
+    def test_repeat_waits_for_the_in_flight_reply(self):
+        idempotency.claim("SM1")
+
+        async def scenario():
+            waiting = asyncio.create_task(idempotency.wait_for_reply("SM1"))
+            await asyncio.sleep(0.05)
+            await asyncio.to_thread(idempotency.complete, "SM1", "<Response>late</Response>")
+            return await waiting
+
+        with mock.patch.object(idempotency, "IDEMPOTENCY_WAIT_SECONDS", 2):
+            self.assertEqual(asyncio.run(scenario()), "<Response>late</Response>")
+
+    def test_repeat_gives_up_while_still_processing(self):
+        idempotency.claim("SM1")
+        with mock.patch.object(idempotency, "IDEMPOTENCY_WAIT_SECONDS", 0.1):
+            self.assertIsNone(asyncio.run(idempotency.wait_for_reply("SM1")))
+
+    def test_stale_claim_is_taken_over_but_not_a_done_one(self):
+        idempotency.claim("SM1")
+        self._age("SM1")
+        self.assertTrue(idempotency.claim("SM1"))           # the first worker died
+        idempotency.complete("SM1", "<Response>ok</Response>")
+        self._age("SM1")
+        self.assertFalse(idempotency.claim("SM1"))
+
+    def test_release_lets_a_retry_start_over(self):
+        idempotency.claim("SM1")
+        idempotency.release("SM1")
+        self.assertTrue(idempotency.claim("SM1"))
+
+    def test_purge_removes_only_expired_keys(self):
+        for sid in ("SM1", "SM2", "SM3"):
+            idempotency.claim(sid)
+        self._age("SM1")
+        self._age("SM2")
+        with mock.patch.object(idempotency, "IDEMPOTENCY_SWEEP_BATCH", 1):
+            self.assertEqual(idempotency.purge_expired(), 2)
+        self.assertFalse(idempotency.claim("SM3"))
+        self.assertTrue(idempotency.claim("SM1"))
+
+
+if __name__ == "__main__":
+    unittest.main()
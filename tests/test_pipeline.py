@@ -0,0 +1,96 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from app import deadline, pipeline, stats
+from support import add_user, temp_sqlite
+
+
+class SingleFlightTest(unittest.TestCase):
+    """Concurrent scrapes of one URL share a single fetch."""
+
+    def test_concurrent_callers_share_one_scrape(self):
+        calls = []
+
+        async def fake_scrape(url, platform):
+            calls.append(url)
+            await asyncio.sleep(0.05)
+            return {"text": f"text of {url}", "thumbnail_url": None}
+
+        async def scenario():
+            return await asyncio.gather(
+                *(pipeline.scrape("https://e.com/viral", "blog") for _ in range(5)),
+                pipeline.scrape("https://e.com/other", "blog"),
+            )
+
+        with mock.patch.object(pipeline, "scrape_url", fake_scrape):
+            results = asyncio.run(scenario())
+        self.assertEqual(sorted(calls), ["https://e.com/other", "https://e.com/viral"])
+        self.assertEqual({r["text"] for r in results[:5]}, {"text of https://e.com/viral"})
+        self.assertEqual(pipeline._inflight, {})
+
+    def test_follower_gives_up_at_its_own_deadline(self):
+        async def slow_scrape(url, platform):
+            await asyncio.sleep(0.3)
+            return {"text": "late", "thumbnail_url": None}
+
+        async def follower():
+            await asyncio.sleep(0)
+            with deadline.budget(0.05):
+                return await pipeline.scrape("https://e.com/slow", "blog")
+
+        async def scenario():
+            return await asyncio.gather(pipeline.scrape("https://e.com/slow", "blog"), follower())
+
+        with mock.patch.object(pipeline, "scrape_url", slow_scrape):
+            leader, late = asyncio.run(scenario())
+        self.assertEqual(leader["text"], "late")            # the leader's work was not cancelled
+        self.assertEqual(late, {"text": "", "thumbnail_url": None})
+
+
+class InsertLinkTest(unittest.TestCase):
+    """insert_link()'s ON CONFLICT duplicate check."""
+
+    def setUp(self):
+        add_user(temp_sqlite(self))
+
+    @staticmethod
+    def _insert(url: str = "https://e.com/a") -> bool:
+        return pipeline.insert_link(1, url, "blog", "some text", "Summary.", "Tech", None, "a, b")
+
+    def test_second_insert_is_a_duplicate(self):
+        self.assertTrue(self._insert())
+        self.assertFalse(self._insert())
+        self.assertEqual(stats.get_stats(1)["total"], 1)
+
+    def test_racing_inserts_save_once(self):
+        start = threading.Barrier(4)
+        results = []
+
+        def racer():
+            start.wait(5)
+            results.append(self._insert())
+
+        threads = [threading.Thread(target=racer) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join(10)
+        self.assertEqual(sorted(results), [False, False, False, True])
+        self.assertEqual(stats.get_stats(1)["total"], 1)
+        self.assertFalse(pipeline.is_saved(1, "https://e.com/b"))
+        self.assertTrue(pipeline.is_saved(1, "https://e.com/a"))
+
+    def test_batch_skips_existing_urls(self):
+        self._insert()
+        links = [
+            {"url": url, "platform": "blog", "extracted_text": "t", "summary": "s", "category": "Tech"}
+            for url in ("https://e.com/a", "https://e.com/b", "https://e.com/b")
+        ]
+        self.assertEqual(pipeline.insert_links(1, links), 1)
+        self.assertEqual(stats.get_stats(1)["total"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
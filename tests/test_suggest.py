@@ -0,0 +1,53 @@
+import asyncio
+import threading
+import unittest
+from unittest import mock
+
+from app import suggest
+
+
+class SuggestCacheTest(unittest.TestCase):
+    """Per-user index caching; _build is stubbed, so no database is involved."""
+
+    def setUp(self):
+        patches = [
+            mock.patch.object(suggest, "_cache", suggest.OrderedDict()),
+            mock.patch.object(suggest, "_cache_bytes", 0),
+            mock.patch.object(suggest, "_generations", {}),
+        ]
+        for p in patches:
+            p.start()
+            self.addCleanup(p.stop)
+
+    def test_invalidate_during_build_is_not_cached(self):
+        def build(user_id):
+            suggest.invalidate(user_id)             # a save lands mid-build
+            return suggest._Index({"python": ("tag", 1)})
+
+        with mock.patch.object(suggest, "_build", side_effect=build):
+            self.assertEqual(suggest.suggest(1, "py")[0]["text"], "python")
+        self.assertNotIn(1, suggest._cache)
+
+    def test_built_off_the_loop_and_then_served_from_cache(self):
+        loop_thread = threading.get_ident()
+        built_on = []
+
+        def build(user_id):
+            built_on.append(threading.get_ident())
+            return suggest._Index({"python": ("tag", 2), "pytest": ("word", 1)})
+
+        async def lookups():
+            first = await suggest.suggest_async(1, "py")
+            second = await suggest.suggest_async(1, "pyte")
+            return first, second
+
+        with mock.patch.object(suggest, "_build", side_effect=build):
+            first, second = asyncio.run(lookups())
+        self.assertEqual([s["text"] for s in first], ["python", "pytest"])
+        self.assertEqual([s["text"] for s in second], ["pytest"])
+        self.assertEqual(len(built_on), 1)
+        self.assertNotEqual(built_on[0], loop_thread)
+
+
+if __name__ == "__main__":
+    unittest.main()